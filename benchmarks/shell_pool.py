@@ -0,0 +1,57 @@
+"""Per-command latency of `run()` with the shell pool turned on and off.
+
+Usage:
+
+    $ PYTHONPATH=. python benchmarks/shell_pool.py --runs 200 --pool-size 4
+"""
+import argparse
+import time
+
+from cli_bdd.core import settings
+from cli_bdd.core.pool import get_shell_pool
+from cli_bdd.core.steps.command import run
+
+
+def measure(command, runs, pause):
+    samples = []
+    for _ in range(runs):
+        # a step usually does something between commands, which gives the
+        # pool time to spawn a replacement
+        time.sleep(pause)
+        started_at = time.time()
+        run(command, timeout=30)
+        samples.append(time.time() - started_at)
+    return sorted(samples)
+
+
+def report(title, samples):
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000
+
+    print '%-10s mean %7.2f ms   median %7.2f ms   p95 %7.2f ms' % (
+        title,
+        sum(samples) / len(samples) * 1000,
+        percentile(0.5),
+        percentile(0.95),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--command', default='true')
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--pause', type=float, default=0.005)
+    args = parser.parse_args()
+
+    settings.SHELL_POOL_SIZE = 0
+    report('pool off', measure(args.command, args.runs, args.pause))
+
+    settings.SHELL_POOL_SIZE = args.pool_size
+    get_shell_pool()
+    time.sleep(1)  # let the pool warm up
+    report('pool on', measure(args.command, args.runs, args.pause))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,629 @@
+"""Runs behave scenarios in parallel.
+
+Usage:
+
+    cli-bdd [--processes N] [--shard I/N] [--history PATH]
+            [--update-baselines] [behave options] [paths]
+
+Scenarios are run by `--processes` worker processes, every scenario in its own
+temporary working directory and environment. The formatters and
+reporters of behave are run in the main process, which replays the results
+of the scenarios in the order of the features, so the report and the exit
+code are the same as the ones of `behave`.
+
+The wall times of the scenarios are recorded in a history file. The next run
+starts the longest scenarios first, and every worker which finishes takes the
+next one, so no worker is idle while another one runs a slow scenario at the
+end. `--shard I/N` runs only the I-th of N shards of about the same total
+time, e.g. on one of N nodes of a CI build which share the history.
+"""
+import argparse
+import errno
+import multiprocessing
+import os
+import select
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+from behave.configuration import Configuration
+from behave.formatter._registry import make_formatters
+from behave.model import Argument, Match, NoMatch
+from behave.runner import Runner
+from behave.runner_util import (
+    collect_feature_locations,
+    parse_features,
+    print_undefined_step_snippets
+)
+
+from cli_bdd.core import settings
+from cli_bdd.core.schedule import (
+    DurationHistory,
+    order_longest_first,
+    split_into_shards
+)
+
+# State of the main process which the forked workers read.
+_worker_state = {}
+
+
+class ScenarioRecorder(object):
+    """Formatter of a worker which records what the formatters are told
+    about one scenario, so the main process could replay it."""
+
+    def __init__(self, line):
+        self.line = line
+        self.scenario_ = None
+        self.steps = None
+        self.events = []
+        self._recording = False
+
+    def uri(self, uri):
+        pass
+
+    def feature(self, feature):
+        pass
+
+    def background(self, background):
+        pass
+
+    def scenario(self, scenario):
+        self._recording = scenario.line == self.line
+        if self._recording:
+            self.scenario_ = scenario
+            self.steps = list(scenario.all_steps)
+            self.events.append(('scenario',))
+
+    def step(self, step):
+        if self._recording:
+            self.events.append(('step', self._get_index(step)))
+
+    def match(self, match):
+        if not self._recording:
+            return
+        if match.func is None:
+            self.events.append(('match', None, None))
+            return
+        arguments = [
+            (
+                argument.start,
+                argument.end,
+                argument.original,
+                argument.value if _is_plain(argument.value)
+                else argument.original,
+                argument.name,
+            )
+            for argument in match.arguments or []
+        ]
+        self.events.append(('match', match.location, arguments))
+
+    def result(self, step):
+        if self._recording:
+            self.events.append((
+                'result',
+                self._get_index(step),
+                step.status,
+                step.duration,
+                step.error_message,
+            ))
+
+    def eof(self):
+        pass
+
+    def close(self):
+        pass
+
+    def get_result(self, undefined_steps):
+        """Returns the picklable result of the scenario."""
+        steps = self.steps or []
+        return {
+            # captured output of the scenario for the JUnit reporter
+            'stdout': getattr(self.scenario_, 'stdout', None),
+            'stderr': getattr(self.scenario_, 'stderr', None),
+            'events': self.events,
+            'steps': [
+                (step.status, step.duration, step.error_message)
+                for step in steps
+            ],
+            'undefined': [
+                index for index, step in enumerate(steps)
+                if any(step is undefined for undefined in undefined_steps)
+            ],
+        }
+
+    def _get_index(self, step):
+        for index, recorded in enumerate(self.steps):
+            if recorded is step:
+                return index
+        raise ValueError('Unknown step %r' % step)
+
+
+class WorkerRunner(Runner):
+    """Runner of a worker which runs the scenarios of the tasks from
+    `next_task` one by one, with the step definitions and hooks of the main
+    `base_dir`, and hands their results to `send_result`.
+
+    `before_all` and `after_all` are run once by the worker, the other hooks
+    around every scenario, since every scenario is run as a feature of its
+    own.
+    """
+
+    def __init__(self, config, base_dir, next_task, send_result):
+        super(WorkerRunner, self).__init__(config)
+        self._base_dir = base_dir
+        self._next_task = next_task
+        self._send_result = send_result
+        # the task of the scenario which runs now
+        self.task = None
+
+    def setup_paths(self):
+        self.base_dir = self.config.base_dir = self._base_dir
+        self.path_manager.add(self._base_dir)
+        if self._base_dir != os.getcwd():
+            self.path_manager.add(os.getcwd())
+
+    def run_model(self, features=None):
+        # the hooks are loaded, so a relative path of the settings still
+        # means the directory where the run was started
+        settings.BASELINES_PATH = os.path.abspath(settings.BASELINES_PATH)
+        return super(WorkerRunner, self).run_model(self._iter_features())
+
+    def _iter_features(self):
+        """Yields the feature of every task with only its scenario, in a
+        fresh working directory and a copy of the environment."""
+        cwd = os.getcwd()
+        for task in iter(self._next_task, None):
+            self.task = task
+            key, filename, line = task
+            started = time.time()
+            environ = os.environ.copy()
+            working_directory = tempfile.mkdtemp(prefix='cli_bdd_worker_')
+            try:
+                os.environ['TMPDIR'] = working_directory
+                tempfile.tempdir = working_directory
+                os.chdir(working_directory)
+                recorder = ScenarioRecorder(line)
+                self.formatters = [recorder]
+                locations = collect_feature_locations(
+                    ['%s:%s' % (filename, line)]
+                )
+                for feature in parse_features(locations, self.config.lang):
+                    yield feature
+                result = recorder.get_result(self.undefined_steps)
+                result['duration'] = time.time() - started
+                del self.undefined_steps[:]
+            finally:
+                os.chdir(cwd)
+                os.environ.clear()
+                os.environ.update(environ)
+                tempfile.tempdir = None
+                shutil.rmtree(working_directory, ignore_errors=True)
+            self.task = None
+            self._send_result(result)
+
+
+class ReplayRunner(Runner):
+    """Runner of the main process which replays the results of the
+    scenarios for the formatters and reporters instead of running them."""
+
+    def __init__(self, config, scenarios, results):
+        super(ReplayRunner, self).__init__(config)
+        self.scenarios = scenarios
+        self.results = results
+
+    def run_with_paths(self):
+        self.formatters = make_formatters(self.config, self.config.outputs)
+        for feature, scenarios in self.scenarios:
+            for scenario in scenarios:
+                # the instance attribute overrides `Scenario.run`
+                scenario.run = _make_replay(self, scenario)
+        return self.run_model(features=self._iter_finished_features())
+
+    def _iter_finished_features(self):
+        """Yields the features in their order, as soon as all their selected
+        scenarios are finished."""
+        for feature, scenarios in self.scenarios:
+            for scenario in scenarios:
+                self.results.wait_for(scenario)
+            yield feature
+
+
+class Results(object):
+    """Results of the scenarios which arrive from the workers in any order."""
+
+    def __init__(self, tasks, iterator):
+        self._keys = dict((id(scenario), key) for key, scenario in tasks)
+        self._iterator = iterator
+        self._results = {}
+        # wall times of the scenarios which were run, by their keys
+        self.durations = {}
+
+    def wait_for(self, scenario):
+        key = self._keys[id(scenario)]
+        while key not in self._results:
+            finished_key, result = next(self._iterator)
+            self._results[finished_key] = result
+            if 'duration' in result:
+                self.durations[finished_key] = result['duration']
+
+    def get(self, scenario):
+        return self._results[self._keys[id(scenario)]]
+
+
+def get_selected_scenarios(config, features):
+    """Returns the `(feature, scenarios)` pairs of the scenarios which behave
+    would run with the configuration."""
+    selected = []
+    for feature in features:
+        scenarios = [
+            scenario for scenario in feature.walk_scenarios()
+            if scenario.should_run(config)
+        ]
+        selected.append((feature, scenarios))
+    return selected
+
+
+def get_history_keys(base_dir, features):
+    """Returns the keys of the scenarios of the features in the history by
+    the ids of the scenarios.
+
+    A key is the path of the feature relative to `base_dir` and the name of
+    the scenario, which are the same on every node whatever the path of the
+    checkout is. The scenarios of a feature with the same name are told
+    apart by the number of the occurrence (from the second one), so the keys
+    don't change when the lines of the feature do.
+    """
+    keys = {}
+    occurrences = {}
+    for feature in features:
+        for scenario in feature.walk_scenarios():
+            key = '%s: %s' % (
+                os.path.relpath(os.path.abspath(scenario.filename), base_dir),
+                scenario.name
+            )
+            occurrences[key] = occurrences.get(key, 0) + 1
+            if occurrences[key] > 1:
+                key = '%s #%s' % (key, occurrences[key])
+            keys[id(scenario)] = key
+    return keys
+
+
+def schedule(tasks, durations, shard=None):
+    """Returns the tasks to run, from the longest to the shortest.
+
+    With a `(index, count)` shard, only the tasks of the shard are returned:
+    its part of `count` parts of about the same total run time.
+    """
+    if shard is None:
+        indexes = order_longest_first(durations)
+    else:
+        shard_index, count = shard
+        indexes = split_into_shards(durations, count)[shard_index]
+    return [tasks[index] for index in indexes]
+
+
+def run_scenarios(next_task, send_result):
+    """Runs the scenarios of the tasks from `next_task` in a worker, until it
+    returns `None`, and hands their results to `send_result`.
+
+    If the hooks or the step definitions fail outside of a scenario, this
+    and every next scenario of the worker gets the error as its result.
+    """
+    config = Configuration(command_args=_worker_state['behave_args'])
+    # the scenarios come from the tasks and the main process reports them
+    config.paths = []
+    config.format = []
+    config.outputs = []
+    config.reporters = []
+    runner = WorkerRunner(
+        config,
+        _worker_state['base_dir'],
+        next_task,
+        send_result
+    )
+    try:
+        runner.run()
+    except BaseException:
+        error = traceback.format_exc().decode('utf-8')
+        task = runner.task or next_task()
+        while task is not None:
+            send_result({'error': error})
+            task = next_task()
+
+
+def run_in_workers(tasks, processes):
+    """Runs the scenarios of the tasks in at most `processes` worker
+    processes and yields `(key, result)` as they finish.
+
+    Every worker loads the step definitions and hooks once and runs the
+    scenarios it is given one by one, so the global state of a scenario
+    could be seen by the next ones of the same worker. A worker which exits
+    without a result (e.g. by `os._exit` or a crash in a step) gives an
+    error result of its scenario instead, and a new worker takes the next
+    ones.
+    """
+    pending = list(reversed(tasks))
+    # keys of the running scenarios and the processes of the workers by
+    # their connections
+    running = {}
+    # workers which run `after_all`
+    finishing = []
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                connection, worker_connection = multiprocessing.Pipe()
+                process = multiprocessing.Process(
+                    target=_run_worker,
+                    args=(worker_connection,)
+                )
+                process.start()
+                # the connection gets EOF when the worker exits
+                worker_connection.close()
+                running[connection] = _send_task(
+                    connection,
+                    pending.pop()
+                ), process
+            for connection in _wait_for_any(list(running)):
+                key, process = running.pop(connection)
+                try:
+                    result = connection.recv()
+                except EOFError:
+                    connection.close()
+                    process.join()
+                    result = {
+                        'error': u'Worker exited with status %s while '
+                                 u'running the scenario\n' % process.exitcode
+                    }
+                else:
+                    if pending:
+                        running[connection] = _send_task(
+                            connection,
+                            pending.pop()
+                        ), process
+                    else:
+                        _send_task(connection, None)
+                        finishing.append((connection, process))
+                yield key, result
+    finally:
+        for connection, (key, process) in running.items():
+            process.terminate()
+            process.join()
+            connection.close()
+        for connection, process in finishing:
+            process.join()
+            connection.close()
+
+
+def _send_task(connection, task):
+    # returns the key of the task
+    try:
+        connection.send(task)
+    except IOError:
+        # the worker has exited, which the next receive tells
+        pass
+    return task and task[0]
+
+
+def _run_worker(connection):
+    run_scenarios(connection.recv, connection.send)
+    connection.close()
+
+
+def _wait_for_any(connections):
+    while True:
+        try:
+            return select.select(connections, [], [])[0]
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+
+
+def _make_replay(runner, scenario):
+    def replay(_):
+        return replay_scenario(runner, scenario, runner.results.get(scenario))
+    return replay
+
+
+def replay_scenario(runner, scenario, result):
+    """Tells the formatters what the worker's formatters were told about the
+    scenario. Returns `True` if the scenario failed."""
+    steps = list(scenario.all_steps)
+    if 'error' in result:
+        result = _get_error_result(steps, result['error'])
+
+    for event in result['events']:
+        kind = event[0]
+        if kind == 'scenario':
+            _notify(runner, 'scenario', scenario)
+        elif kind == 'step':
+            _notify(runner, 'step', steps[event[1]])
+        elif kind == 'match':
+            _notify(runner, 'match', _make_match(event[1], event[2]))
+        else:
+            step = steps[event[1]]
+            step.status, step.duration, step.error_message = event[2:]
+            _notify(runner, 'result', step)
+
+    for step, state in zip(steps, result['steps']):
+        step.status, step.duration, step.error_message = state
+    for index in result['undefined']:
+        runner.undefined_steps.append(steps[index])
+    scenario.stdout = result.get('stdout')
+    scenario.stderr = result.get('stderr')
+    return scenario.status == 'failed'
+
+
+def _get_error_result(steps, error):
+    # the worker couldn't run the scenario, so its first step fails
+    events = [('scenario',)] + [('step', index) for index in range(len(steps))]
+    states = [('skipped', 0, None)] * len(steps)
+    if steps:
+        events += [('match', None, None), ('result', 0, 'failed', 0, error)]
+        states[0] = ('failed', 0, error)
+    return {
+        'events': events,
+        'steps': states,
+        'undefined': [],
+        'stderr': error,
+    }
+
+
+def _make_match(location, arguments):
+    if location is None:
+        return NoMatch()
+    match = Match(None, [Argument(*argument) for argument in arguments])
+    match.location = location
+    return match
+
+
+def _notify(runner, method, *args):
+    for formatter in runner.formatters:
+        getattr(formatter, method)(*args)
+
+
+def _is_plain(value):
+    return value is None or isinstance(
+        value,
+        (basestring, int, long, float, bool)
+    )
+
+
+def parse_shard(value):
+    """Parses `I/N` (from 1) into `(index, count)` (index from 0)."""
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected I/N, got "%s"' % value)
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(
+            'expected 1 <= I <= N, got "%s"' % value
+        )
+    return index - 1, count
+
+
+def parse_args(args=None):
+    """Splits the command line into the options of the runner and the ones
+    which are passed to behave."""
+    parser = argparse.ArgumentParser(
+        prog='cli-bdd',
+        description='Runs behave scenarios in parallel processes.',
+        epilog='All the other arguments are passed to behave.'
+    )
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help='Number of the worker processes (default: number of CPUs).'
+    )
+    parser.add_argument(
+        '--shard',
+        type=parse_shard,
+        metavar='I/N',
+        help='Run only the I-th of N shards of about the same total time.'
+    )
+    parser.add_argument(
+        '--history',
+        default='.cli_bdd_history.json',
+        metavar='PATH',
+        help='File of the run times of the scenarios which the scheduling '
+             'is based on (default: .cli_bdd_history.json).'
+    )
+    parser.add_argument(
+        '--update-baselines',
+        action='store_true',
+        help='Store the run times of the baseline steps as new baselines.'
+    )
+    return parser.parse_known_args(args)
+
+
+def run(options, behave_args):
+    """Runs the scenarios and returns whether any of them failed."""
+    config = Configuration(command_args=behave_args)
+    if not config.format:
+        config.format = [config.default_format]
+    if options.update_baselines:
+        settings.UPDATE_BASELINES = True
+
+    runner = ReplayRunner(config, [], None)
+    with runner.path_manager:
+        runner.setup_paths()
+        locations = [
+            location for location in runner.feature_locations()
+            if not config.exclude(location)
+        ]
+    features = parse_features(locations, language=config.lang)
+    runner.features.extend(features)
+    runner.scenarios = get_selected_scenarios(config, features)
+
+    tasks = []
+    for feature, scenarios in runner.scenarios:
+        for scenario in scenarios:
+            tasks.append((len(tasks), scenario))
+    history = DurationHistory(options.history)
+    keys = get_history_keys(runner.base_dir, features)
+    history_keys = [keys[id(scenario)] for _, scenario in tasks]
+    scheduled = schedule(
+        tasks,
+        history.estimate(history_keys),
+        options.shard
+    )
+    if options.shard is not None:
+        _skip_other_shards(runner, scheduled)
+    _worker_state.update({
+        'behave_args': behave_args,
+        'base_dir': runner.base_dir,
+    })
+    workers = run_in_workers(
+        [
+            (key, os.path.abspath(scenario.filename), scenario.line)
+            for key, scenario in scheduled
+        ],
+        max(options.processes, 1)
+    )
+    try:
+        runner.results = Results(tasks, workers)
+        with runner.path_manager:
+            failed = runner.run_with_paths()
+    finally:
+        # stops the workers which still run, e.g. on KeyboardInterrupt
+        workers.close()
+    history.update(dict(
+        (history_keys[key], duration)
+        for key, duration in runner.results.durations.items()
+    ))
+
+    if config.show_snippets and runner.undefined_steps:
+        print_undefined_step_snippets(
+            runner.undefined_steps,
+            colored=config.color
+        )
+    return failed
+
+
+def _skip_other_shards(runner, scheduled):
+    # the scenarios of the other shards are reported as skipped, and the
+    # features without scenarios of the shard are not reported at all
+    in_shard = set(id(scenario) for _, scenario in scheduled)
+    selected = []
+    for feature, scenarios in runner.scenarios:
+        for scenario in scenarios:
+            if id(scenario) not in in_shard:
+                scenario.mark_skipped()
+        scenarios = [
+            scenario for scenario in scenarios if id(scenario) in in_shard
+        ]
+        if not scenarios:
+            feature.mark_skipped()
+        selected.append((feature, scenarios))
+    runner.scenarios = selected
+
+
+def main(args=None):
+    options, behave_args = parse_args(args)
+    return 1 if run(options, behave_args) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
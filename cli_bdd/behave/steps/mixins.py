@@ -1,6 +1,8 @@
 
 from behave import given, then, use_step_matcher, when
 
+from cli_bdd.core.steps.base import add_scenario_cleanup, run_scenario_cleanups
+
 DECORATORS_BY_TYPES = {
     'given': given,
     'when': when,
@@ -9,15 +11,17 @@ DECORATORS_BY_TYPES = {
 
 
 class BehaveStepMixin(object):
+    def __init__(self, context=None):
+        self.context = context
+
     def build_step_func(self):
         decorator = DECORATORS_BY_TYPES[self.type_]
         use_step_matcher('re')
 
         @decorator(self.sentence)
         def behave_step(context, *args, **kwargs):
-            self.context = context
             # args not used. Your regex must use named groups "(?P<name>...)"
-            return self.step(**kwargs)
+            return self.for_invocation(context).step(**kwargs)
 
         return behave_step
 
@@ -29,3 +33,34 @@ class BehaveStepMixin(object):
 
     def get_scenario_context(self):
         return self.context
+
+    def get_scenario_name(self):
+        return self.context.feature.name, self.context.scenario.name
+
+    def add_scenario_cleanup(self, cleanup):
+        if hasattr(self.context, 'add_cleanup'):
+            # behave 1.2.6 and later
+            self.context.add_cleanup(cleanup)
+            return
+        add_scenario_cleanup(self.context, cleanup)
+        runner = getattr(self.context, '_runner', None)
+        if runner is not None:
+            install_cleanup_hook(runner.hooks)
+
+
+def install_cleanup_hook(hooks):
+    """Wraps the `after_scenario` hook of the runner (if any), so the
+    cleanups of the scenario are called after it."""
+    hook = hooks.get('after_scenario')
+    if getattr(hook, 'runs_scenario_cleanups', False):
+        return
+
+    def after_scenario(context, scenario):
+        try:
+            if hook is not None:
+                hook(context, scenario)
+        finally:
+            run_scenario_cleanups(context)
+
+    after_scenario.runs_scenario_cleanups = True
+    hooks['after_scenario'] = after_scenario
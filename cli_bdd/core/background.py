@@ -0,0 +1,223 @@
+import atexit
+import errno
+import os
+import select
+import signal
+import threading
+import time
+
+import pexpect
+
+from cli_bdd.core.output import OutputBuffer
+from cli_bdd.core.process import CHUNK_SIZE, PipeProcess
+
+# Seconds which `BackgroundCommand.wait()` waits by default, the same as the
+# default timeout of pexpect.
+DEFAULT_TIMEOUT = 30
+# Seconds between the checks if a command which closed its output exited.
+REAP_INTERVAL = 0.01
+
+
+class BackgroundCommand(object):
+    """Command which runs in the background while the scenario goes on.
+
+    Wraps a spawned pexpect child or a `PipeProcess`, whose output is read by
+    the `BackgroundLoop`. Provides the same attributes which the steps read
+    from a spawned child.
+    """
+
+    def __init__(self, child, launch):
+        self.child = child
+        self.launch = launch
+        self.exitstatus = None
+        self.signalstatus = None
+        self.rusage = None
+        self.finished = False
+        if isinstance(child, PipeProcess):
+            self.logfile_read = child.logfile_read
+            self.logfile_stderr = child.logfile_stderr
+            self.buffers = {
+                child.stdout_fd: self.logfile_read,
+                child.stderr_fd: self.logfile_stderr,
+            }
+        else:
+            self.logfile_read = OutputBuffer()
+            self.buffers = {child.child_fd: self.logfile_read}
+        self.loop = get_background_loop()
+        self.loop.add(self)
+
+    def wait(self, timeout=DEFAULT_TIMEOUT):
+        """Waits for the command to finish and returns its exit status.
+
+        Raises `pexpect.TIMEOUT` if it does not finish in `timeout` seconds.
+        """
+        if not self.loop.wait(lambda: self.finished, timeout):
+            raise pexpect.TIMEOUT(
+                'Command did not finish in %s seconds' % timeout
+            )
+        return self.exitstatus
+
+    def wait_for_output(self, timeout):
+        """Waits up to `timeout` seconds for more output.
+
+        Returns `False` if the command finished without it.
+        """
+        version = self._get_output_version()
+        self.loop.wait(
+            lambda: (self.finished or
+                     self._get_output_version() != version),
+            timeout
+        )
+        return self._get_output_version() != version
+
+    def isalive(self):
+        return not self.finished
+
+    def kill(self):
+        """Kills the command. Its output is still read until all the
+        processes which share it exit."""
+        if self.finished:
+            return
+        try:
+            if isinstance(self.child, PipeProcess):
+                self.child._kill()
+            else:
+                # the spawned child leads its own process group
+                os.killpg(self.child.pid, signal.SIGKILL)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _get_output_version(self):
+        return sum(buffer_.version for buffer_ in self.buffers.values())
+
+    def _reap(self):
+        """Collects the exit status if the command exited."""
+        if isinstance(self.child, PipeProcess):
+            if self.child.isalive():
+                return False
+            self.child._finish()
+        else:
+            if self.child.isalive():
+                return False
+            self.child.ptyproc.delayafterclose = 0
+            self.child.close()
+        self.exitstatus = self.child.exitstatus
+        self.signalstatus = self.child.signalstatus
+        self.rusage = getattr(self.child, 'rusage', None)
+        self.finished = True
+        return True
+
+
+class BackgroundLoop(object):
+    """Thread which reads the output of all the background commands.
+
+    All the output descriptors are multiplexed by one `select` loop, so
+    there is a single thread no matter how many commands run. The loop is
+    woken up through a pipe when a command is added.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self._commands = {}  # by output descriptor
+        self._exited = set()  # commands which closed all their output
+        self._wakeup_fds = os.pipe()
+        self._thread = None
+
+    def add(self, command):
+        with self.condition:
+            for fd in command.buffers:
+                self._commands[fd] = command
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+        os.write(self._wakeup_fds[1], 'x')
+
+    def wait(self, predicate, timeout):
+        """Waits until the predicate is true, which is checked every time the
+        loop reads output or reaps a command.
+
+        Returns the last result of the predicate.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.condition:
+            while not predicate():
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                self.condition.wait(remaining)
+            return predicate()
+
+    def get_running_commands(self):
+        with self.condition:
+            return set(self._commands.values()) | self._exited
+
+    def _run(self):
+        wakeup_fd = self._wakeup_fds[0]
+        while True:
+            with self.condition:
+                fds = list(self._commands)
+                timeout = REAP_INTERVAL if self._exited else None
+            try:
+                ready = select.select([wakeup_fd] + fds, [], [], timeout)[0]
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            for fd in ready:
+                if fd == wakeup_fd:
+                    os.read(wakeup_fd, CHUNK_SIZE)
+                    continue
+                try:
+                    data = os.read(fd, CHUNK_SIZE)
+                except OSError as e:
+                    # closed terminal reports EIO instead of EOF
+                    if e.errno != errno.EIO:
+                        raise
+                    data = ''
+                with self.condition:
+                    command = self._commands[fd]
+                    if data:
+                        command.buffers[fd].write(data)
+                    else:
+                        del self._commands[fd]
+                        if command not in self._commands.values():
+                            self._exited.add(command)
+                    self.condition.notify_all()
+
+            with self.condition:
+                for command in list(self._exited):
+                    if command._reap():
+                        self._exited.discard(command)
+                        self.condition.notify_all()
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = BackgroundLoop()
+        return _loop
+
+
+def stop_background_commands(commands, timeout=DEFAULT_TIMEOUT):
+    """Kills the commands which are still running and waits for them."""
+    for command in commands:
+        command.kill()
+    for command in commands:
+        command.wait(timeout)
+
+
+@atexit.register
+def _stop_all_background_commands():
+    if _loop is not None:
+        for command in _loop.get_running_commands():
+            command.kill()
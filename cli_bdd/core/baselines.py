@@ -0,0 +1,164 @@
+import fcntl
+import json
+import math
+import os
+import tempfile
+import threading
+import warnings
+
+from cli_bdd.core import settings
+from cli_bdd.core.benchmark import format_duration, get_percentile
+
+# Scale of the median absolute deviation to the standard deviation of normally
+# distributed samples.
+MAD_SCALE = 1.4826
+# Standard error of the median in the standard deviations, times the square
+# root of the number of samples.
+MEDIAN_ERROR_SCALE = 1.2533
+# Number of the standard errors of the medians which are allowed on top of
+# the slowdown, so the noise of the runs doesn't fail the comparison.
+NOISE_ERRORS = 2
+
+
+class BaselineStore(object):
+    """Run times of the commands which are stored in a JSON file, by feature,
+    scenario and command.
+
+    Every baseline keeps the samples it was computed from, with their median
+    and median absolute deviation. The file is written on every change, with
+    sorted keys, so it could be kept under version control. Changes are made
+    under a lock of the directory of the file, and merged with the ones which
+    other processes (e.g. the workers of `cli-bdd`) have written meanwhile.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._baselines = None
+        self._lock = threading.Lock()
+
+    def get(self, feature, scenario, command):
+        """Returns the baseline of the command, or `None`."""
+        with self._lock:
+            return self._load().get(feature, {}).get(scenario, {}).get(
+                command
+            )
+
+    def set(self, feature, scenario, command, samples):
+        """Stores the samples (seconds) as the baseline of the command and
+        returns it."""
+        baseline = get_baseline(samples)
+        with self._lock:
+            # the file is replaced on save, so its directory is locked
+            directory_fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+            try:
+                fcntl.flock(directory_fd, fcntl.LOCK_EX)
+                # reload the changes of the other processes
+                self._baselines = None
+                baselines = self._load()
+                baselines.setdefault(feature, {}).setdefault(scenario, {})[
+                    command
+                ] = baseline
+                self._save(baselines)
+            finally:
+                os.close(directory_fd)
+        return baseline
+
+    def _load(self):
+        if self._baselines is None:
+            try:
+                with open(self.path) as baselines_file:
+                    self._baselines = json.load(baselines_file)
+            except IOError:
+                self._baselines = {}
+            except ValueError:
+                # e.g. a truncated file, whose baselines are recorded again
+                warnings.warn(
+                    'Baselines file %s is broken, starting from an empty one'
+                    % self.path
+                )
+                self._baselines = {}
+        return self._baselines
+
+    def _save(self, baselines):
+        # replace the file at once, so it is never left half-written
+        fd, temp_path = tempfile.mkstemp(
+            prefix='.baselines-',
+            dir=os.path.dirname(self.path)
+        )
+        with os.fdopen(fd, 'w') as baselines_file:
+            json.dump(baselines, baselines_file, indent=2, sort_keys=True)
+            baselines_file.write('\n')
+        os.rename(temp_path, self.path)
+
+
+def get_baseline(samples):
+    """Returns the baseline of the samples: `samples`, `median` and `mad`
+    (median absolute deviation)."""
+    ordered = sorted(samples)
+    median = get_percentile(ordered, 50)
+    return {
+        'samples': ordered,
+        'median': median,
+        'mad': get_percentile(
+            sorted(abs(sample - median) for sample in ordered),
+            50
+        ),
+    }
+
+
+def compare_to_baseline(samples, baseline, percent):
+    """Compares the median of the samples with the one of the baseline.
+
+    The median may be slower by `percent` and by the noise margin: two
+    standard errors of the difference of the medians, which are estimated
+    from the median absolute deviations. So a few noisy runs don't fail the
+    comparison, and more samples make it stricter.
+
+    Returns `None` if the samples are not slower than allowed, or the error
+    message otherwise.
+    """
+    current = get_baseline(samples)
+    noise = NOISE_ERRORS * math.sqrt(
+        _get_median_error(current) ** 2 + _get_median_error(baseline) ** 2
+    )
+    allowed = baseline['median'] * (1 + percent / 100.0) + noise
+    if current['median'] <= allowed:
+        return None
+    if baseline['median'] > 0:
+        slowdown = '%.1f%% slower than' % (
+            (current['median'] / baseline['median'] - 1) * 100
+        )
+    else:
+        slowdown = 'slower than'
+    return (
+        '%s the baseline: median %s against %s '
+        '(allowed %s%% and %s of noise, %s runs)' % (
+            slowdown,
+            format_duration(current['median']),
+            format_duration(baseline['median']),
+            percent,
+            format_duration(noise),
+            len(samples)
+        )
+    )
+
+
+def _get_median_error(baseline):
+    count = len(baseline['samples'])
+    return (
+        MEDIAN_ERROR_SCALE * MAD_SCALE * baseline['mad'] / math.sqrt(count)
+    )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_baseline_store():
+    """Returns the shared store of `settings.BASELINES_PATH`."""
+    global _store
+    path = os.path.abspath(settings.BASELINES_PATH)
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = BaselineStore(path)
+        return _store
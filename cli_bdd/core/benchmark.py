@@ -0,0 +1,98 @@
+import math
+
+# p-value under which the difference of the run times is significant.
+SIGNIFICANCE_LEVEL = 0.05
+
+
+def get_statistics(samples):
+    """Returns the statistics of the samples (e.g. run times in seconds) as a
+    dict of `runs`, `min`, `max`, `mean`, `median`, `p95`, `p99` and
+    `stddev` (of the sample)."""
+    ordered = sorted(samples)
+    count = len(ordered)
+    mean = sum(ordered) / float(count)
+    if count > 1:
+        variance = sum((sample - mean) ** 2 for sample in ordered) / (
+            count - 1
+        )
+    else:
+        variance = 0.0
+    return {
+        'runs': count,
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': mean,
+        'median': get_percentile(ordered, 50),
+        'p95': get_percentile(ordered, 95),
+        'p99': get_percentile(ordered, 99),
+        'stddev': math.sqrt(variance),
+    }
+
+
+def get_percentile(ordered, percent):
+    """Returns the percentile of the sorted samples, interpolated linearly
+    between the closest ranks."""
+    position = (len(ordered) - 1) * percent / 100.0
+    lower = int(math.floor(position))
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
+
+
+def get_mann_whitney_p_value(first, second):
+    """Returns the p-value of the one-sided Mann-Whitney U test that the
+    values of `first` tend to be greater than the ones of `second`.
+
+    Uses the normal approximation with the tie and continuity corrections,
+    which is fine for about 10 or more samples of each.
+    """
+    values = sorted(
+        [(value, 0) for value in first] + [(value, 1) for value in second]
+    )
+    count = len(values)
+    first_ranks = 0.0
+    ties = 0.0
+    start = 0
+    while start < count:
+        end = start
+        while end < count and values[end][0] == values[start][0]:
+            end += 1
+        # tied values share the average of their ranks (starting from 1)
+        rank = (start + end + 1) / 2.0
+        first_ranks += rank * sum(
+            1 for _, group in values[start:end] if group == 0
+        )
+        size = end - start
+        ties += size ** 3 - size
+        start = end
+
+    first_count = len(first)
+    second_count = len(second)
+    u = first_ranks - first_count * (first_count + 1) / 2.0
+    mean = first_count * second_count / 2.0
+    variance = first_count * second_count / 12.0 * (
+        count + 1 - ties / (count * (count - 1))
+    )
+    if variance <= 0:
+        # all the values are the same
+        return 1.0 if u <= mean else 0.0
+    z = (u - mean - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def format_duration(seconds):
+    if seconds < 1:
+        return '%.1f ms' % (seconds * 1000)
+    return '%.3f s' % seconds
+
+
+def format_statistics(statistics):
+    return '%s runs: min %s, median %s, p95 %s, p99 %s, stddev %s' % (
+        statistics['runs'],
+        format_duration(statistics['min']),
+        format_duration(statistics['median']),
+        format_duration(statistics['p95']),
+        format_duration(statistics['p99']),
+        format_duration(statistics['stddev'])
+    )
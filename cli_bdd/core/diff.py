@@ -0,0 +1,327 @@
+import bisect
+import difflib
+import time
+
+from cli_bdd.core import settings
+
+# Outputs with up to this number of lines (both sides together) are diffed by
+# `difflib.context_diff`, which gives the nicest diff for short texts.
+CONTEXT_DIFF_MAX_LINES = 2000
+# Edit distance after which the Myers algorithm gives up on a range and the
+# patience algorithm splits it by the unique common lines.
+MAX_EDITS = 500
+# Ranges with more lines (both sides together) are split by the patience
+# algorithm first, since the Myers algorithm takes time proportional to the
+# lines times the edits.
+MYERS_MAX_LINES = 20000
+# Number of unchanged lines around the changes in every hunk.
+CONTEXT_LINES = 3
+# Number of changed lines which are shown of every hunk.
+MAX_HUNK_LINES = 50
+
+
+def format_diff(actual_lines, expected_lines):
+    """Returns a diff of the actual lines against the expected ones for the
+    comparison error.
+
+    Long texts are diffed in about linear time for similar texts: common
+    prefix and suffix are skipped, long ranges are split by the patience
+    algorithm and the rest is diffed by the Myers algorithm. Once
+    `settings.DIFF_TIME_BUDGET` is spent, the rest is reported as replaced.
+    Only the first `settings.DIFF_MAX_HUNKS` hunks are shown after a summary
+    of all the changes.
+    """
+    if len(actual_lines) + len(expected_lines) <= CONTEXT_DIFF_MAX_LINES:
+        return 'Diff:\n' + '\n'.join(
+            difflib.context_diff(actual_lines, expected_lines)
+        )
+
+    matcher = _Matcher(actual_lines, expected_lines)
+    hunks = _group_opcodes(matcher.get_opcodes())
+    removed = added = 0
+    for hunk in hunks:
+        for tag, i1, i2, j1, j2 in hunk:
+            if tag != 'equal':
+                removed += i2 - i1
+                added += j2 - j1
+
+    summary = '%s lines removed and %s lines added in %s hunks' % (
+        removed,
+        added,
+        len(hunks)
+    )
+    if matcher.approximate:
+        summary += ' (at most, some ranges were not diffed line by line)'
+    lines = [summary]
+    max_hunks = settings.DIFF_MAX_HUNKS
+    if len(hunks) > max_hunks:
+        lines.append('First %s hunks:' % max_hunks)
+    for hunk in hunks[:max_hunks]:
+        lines.extend(_format_hunk(actual_lines, expected_lines, hunk))
+    return '\n'.join(lines)
+
+
+class _Matcher(object):
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+        self.approximate = False
+        self.deadline = time.time() + settings.DIFF_TIME_BUDGET
+
+    def get_opcodes(self):
+        blocks = []
+        self._match(0, len(self.a), 0, len(self.b), blocks)
+        blocks.append((len(self.a), len(self.b), 0))
+
+        opcodes = []
+        i = j = 0
+        for block_i, block_j, size in blocks:
+            if i < block_i and j < block_j:
+                opcodes.append(('replace', i, block_i, j, block_j))
+            elif i < block_i:
+                opcodes.append(('delete', i, block_i, j, block_j))
+            elif j < block_j:
+                opcodes.append(('insert', i, block_i, j, block_j))
+            if size:
+                opcodes.append((
+                    'equal',
+                    block_i,
+                    block_i + size,
+                    block_j,
+                    block_j + size
+                ))
+            i = block_i + size
+            j = block_j + size
+        return opcodes
+
+    def _match(self, a_start, a_end, b_start, b_end, blocks):
+        """Appends matching blocks `(i, j, size)` of the ranges to `blocks`
+        in order."""
+        prefix = self._common_size(a_start, a_end, b_start, b_end, 1)
+        if prefix:
+            _add_block(blocks, a_start, b_start, prefix)
+            a_start += prefix
+            b_start += prefix
+        suffix = self._common_size(a_start, a_end, b_start, b_end, -1)
+        a_end -= suffix
+        b_end -= suffix
+
+        if a_start < a_end and b_start < b_end:
+            short = a_end - a_start + b_end - b_start <= MYERS_MAX_LINES
+            if time.time() > self.deadline:
+                # report the rest of the range as replaced
+                self.approximate = True
+            elif short and self._myers(a_start, a_end, b_start, b_end,
+                                       blocks):
+                pass
+            elif not self._patience(a_start, a_end, b_start, b_end, blocks):
+                if short or not self._myers(a_start, a_end, b_start, b_end,
+                                            blocks):
+                    # nothing to split by, report the range as replaced
+                    self.approximate = True
+
+        if suffix:
+            _add_block(blocks, a_end, b_end, suffix)
+
+    def _common_size(self, a_start, a_end, b_start, b_end, direction):
+        """Returns the size of the common prefix (`direction` is `1`) or
+        suffix (`direction` is `-1`) of the ranges."""
+        a, b = self.a, self.b
+        limit = min(a_end - a_start, b_end - b_start)
+        size = 0
+        # compare by slices first, which is way faster for long texts
+        step = 1024
+        while step:
+            while size + step <= limit:
+                if direction > 0:
+                    equal = (a[a_start + size:a_start + size + step] ==
+                             b[b_start + size:b_start + size + step])
+                else:
+                    equal = (a[a_end - size - step:a_end - size] ==
+                             b[b_end - size - step:b_end - size])
+                if not equal:
+                    break
+                size += step
+            step //= 32
+        return size
+
+    def _myers(self, a_start, a_end, b_start, b_end, blocks):
+        a, b = self.a, self.b
+        n = a_end - a_start
+        m = b_end - b_start
+        max_edits = min(n + m, MAX_EDITS)
+        # `v[k]` is the furthest `x` on the diagonal `k = x - y`, negative
+        # diagonals are wrapped around the end of the list
+        v = [0] * (2 * max_edits + 2)
+        trace = []
+        for d in xrange(max_edits + 1):
+            if time.time() > self.deadline:
+                return False
+            trace.append(list(v))
+            for k in xrange(-d, d + 1, 2):
+                if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                    x = v[k + 1]
+                else:
+                    x = v[k - 1] + 1
+                y = x - k
+                while (x < n and y < m and
+                        a[a_start + x] == b[b_start + y]):
+                    x += 1
+                    y += 1
+                v[k] = x
+                if x >= n and y >= m:
+                    self._backtrack(trace, n, m, a_start, b_start, blocks)
+                    return True
+        return False
+
+    def _backtrack(self, trace, x, y, a_start, b_start, blocks):
+        snakes = []
+        for d in xrange(len(trace) - 1, -1, -1):
+            v = trace[d]
+            k = x - y
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                previous_k = k + 1
+            else:
+                previous_k = k - 1
+            previous_x = v[previous_k]
+            previous_y = previous_x - previous_k
+            if d == 0:
+                size = x
+            else:
+                # one edit and then the snake of equal lines
+                size = min(x - previous_x, y - previous_y)
+            if size > 0:
+                snakes.append((a_start + x - size, b_start + y - size, size))
+            x, y = previous_x, previous_y
+        for snake in reversed(snakes):
+            _add_block(blocks, *snake)
+
+    def _patience(self, a_start, a_end, b_start, b_end, blocks):
+        """Splits the ranges by the unique common lines and matches the
+        parts between them. Returns `False` if there are no such lines."""
+        a_counts = {}
+        for i in xrange(a_start, a_end):
+            a_counts[self.a[i]] = a_counts.get(self.a[i], 0) + 1
+        b_positions = {}
+        for j in xrange(b_start, b_end):
+            line = self.b[j]
+            if a_counts.get(line) == 1:
+                b_positions[line] = None if line in b_positions else j
+        unique = [
+            (i, b_positions[self.a[i]])
+            for i in xrange(a_start, a_end)
+            if a_counts[self.a[i]] == 1 and
+            b_positions.get(self.a[i]) is not None
+        ]
+        anchors = _longest_increasing_subsequence(unique)
+        if not anchors:
+            return False
+
+        i, j = a_start, b_start
+        expired = False
+        for anchor_i, anchor_j in anchors:
+            if i < anchor_i or j < anchor_j:
+                expired = expired or time.time() > self.deadline
+                if expired:
+                    # the parts between the anchors are reported as replaced
+                    self.approximate = True
+                else:
+                    self._match(i, anchor_i, j, anchor_j, blocks)
+            _add_block(blocks, anchor_i, anchor_j, 1)
+            i, j = anchor_i + 1, anchor_j + 1
+        self._match(i, a_end, j, b_end, blocks)
+        return True
+
+
+def _add_block(blocks, i, j, size):
+    # adjacent blocks are merged, so the unchanged lines between the changes
+    # are one block however they were matched
+    if blocks:
+        last_i, last_j, last_size = blocks[-1]
+        if last_i + last_size == i and last_j + last_size == j:
+            blocks[-1] = last_i, last_j, last_size + size
+            return
+    blocks.append((i, j, size))
+
+
+def _longest_increasing_subsequence(pairs):
+    """Returns the longest subsequence of `(i, j)` pairs (sorted by `i`) with
+    increasing `j`."""
+    tails = []
+    tail_indexes = []
+    previous = []
+    for index, (_, j) in enumerate(pairs):
+        if not tails or j > tails[-1]:
+            # the usual case for similar texts, which needs no search
+            position = len(tails)
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            position = bisect.bisect_left(tails, j)
+            tails[position] = j
+            tail_indexes[position] = index
+        previous.append(tail_indexes[position - 1] if position else None)
+
+    result = []
+    index = tail_indexes[-1] if tail_indexes else None
+    while index is not None:
+        result.append(pairs[index])
+        index = previous[index]
+    result.reverse()
+    return result
+
+
+def _group_opcodes(opcodes):
+    """Groups the changes with `CONTEXT_LINES` of the unchanged lines around
+    them, like `difflib.SequenceMatcher.get_grouped_opcodes` does."""
+    n = CONTEXT_LINES
+    codes = list(opcodes)
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    hunks = []
+    hunk = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == 'equal' and i2 - i1 > 2 * n:
+            hunk.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            hunks.append(hunk)
+            hunk = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        hunk.append((tag, i1, i2, j1, j2))
+    if hunk and not (len(hunk) == 1 and hunk[0][0] == 'equal'):
+        hunks.append(hunk)
+    return hunks
+
+
+def _format_hunk(a, b, hunk):
+    first, last = hunk[0], hunk[-1]
+    lines = ['@@ -%s,%s +%s,%s @@' % (
+        first[1] + 1,
+        last[2] - first[1],
+        first[3] + 1,
+        last[4] - first[3]
+    )]
+    shown = 0
+    hidden = 0
+    for tag, i1, i2, j1, j2 in hunk:
+        if tag == 'equal':
+            # the unchanged lines are shown only around the shown changes
+            if shown < MAX_HUNK_LINES:
+                lines.extend(' ' + line for line in a[i1:i2])
+            continue
+        room = max(MAX_HUNK_LINES - shown, 0)
+        changed = ['-' + line for line in a[i1:min(i2, i1 + room)]]
+        changed.extend(
+            '+' + line
+            for line in b[j1:min(j2, j1 + room - len(changed))]
+        )
+        lines.extend(changed)
+        shown += len(changed)
+        hidden += i2 - i1 + j2 - j1 - len(changed)
+    if hidden:
+        lines.append('... %s more changed lines' % hidden)
+    return lines
@@ -0,0 +1,505 @@
+import atexit
+import errno
+import fcntl
+import itertools
+import json
+import os
+import Queue
+import resource
+import select
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import termios
+import threading
+import traceback
+
+from pexpect.fdpexpect import fdspawn
+
+from cli_bdd.core import settings
+from cli_bdd.core.inprocess import call_entry_point, load_entry_point
+from cli_bdd.core.launch import split_simple_command
+from cli_bdd.core.output import OutputBuffer
+from cli_bdd.core.process import PipeProcess
+
+# the same terminal size as pexpect uses
+TERMINAL_DIMENSIONS = (24, 80)
+
+SERVER_SCRIPT = 'from cli_bdd.core.forkserver import serve; serve()'
+
+
+class ForkServerError(Exception):
+    pass
+
+
+class ForkServerChild(fdspawn):
+    """Command forked by the fork server and attached to a terminal."""
+
+    def __init__(self, server, pid, fd):
+        fdspawn.__init__(self, fd)
+        self.server = server
+        self.pid = pid
+        self.status = None
+        self.exitstatus = None
+        self.signalstatus = None
+        self.rusage = None
+
+    def wait(self):
+        if self.status is None:
+            self.status, self.rusage = self.server.wait(self.pid)
+            if os.WIFSIGNALED(self.status):
+                self.signalstatus = os.WTERMSIG(self.status)
+            else:
+                self.exitstatus = os.WEXITSTATUS(self.status)
+        return self.exitstatus
+
+    def __del__(self):
+        # closing the terminal hangs up the command if it still runs
+        if self.child_fd != -1:
+            os.close(self.child_fd)
+            self.child_fd = -1
+        if self.status is None:
+            self.server.forget(self.pid)
+
+
+class ForkServerPipeProcess(PipeProcess):
+    """Command forked by the fork server and attached to pipes."""
+
+    def __init__(self, server, pid, stdout_fd, stderr_fd):
+        self.logfile_read = OutputBuffer()
+        self.logfile_stderr = OutputBuffer()
+        self.exitstatus = None
+        self.signalstatus = None
+        self.rusage = None
+        self.server = server
+        self.pid = pid
+        self.stdout_fd = stdout_fd
+        self.stderr_fd = stderr_fd
+        self.finished = False
+
+    def isalive(self):
+        return not self.finished
+
+    def _kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _finish(self):
+        os.close(self.stdout_fd)
+        os.close(self.stderr_fd)
+        status, self.rusage = self.server.wait(self.pid)
+        if os.WIFSIGNALED(status):
+            self._set_returncode(-os.WTERMSIG(status))
+        else:
+            self._set_returncode(os.WEXITSTATUS(status))
+        self.finished = True
+
+
+class ForkServer(object):
+    """Python process which imports the entry points once and forks a child
+    for every command.
+
+    Every child gets fresh argv, environment and working directory, and its
+    own terminal or pipes. Since it is a separate process, `sys.exit`, global
+    state and signals behave as usual, but the interpreter startup and the
+    imports are paid only once.
+
+    Requests could be made from several threads. Every request has an id,
+    and a reader thread hands every response to the thread which waits for
+    it, so a thread which waits for a child doesn't hold up the others.
+    """
+
+    def __init__(self, entry_points):
+        self.entry_points = dict(entry_points)
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', SERVER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            env=env,
+            close_fds=True
+        )
+        self._fifos_dir = tempfile.mkdtemp(prefix='cli_bdd_fork_server_')
+        self._fifo_names = itertools.count()
+        # guards the writing of the requests and the pending responses
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._pending = {}
+        self._exited = False
+        self._reader = threading.Thread(target=self._read_responses)
+        self._reader.daemon = True
+        self._reader.start()
+        self._request({'entry_points': self.entry_points})
+
+    def spawn(self, argv, tty=True, env=None, cwd=None):
+        """Forks a child for the command, with the environment and the working
+        directory of the current process unless `env` and `cwd` are given.
+
+        Returns `ForkServerChild` attached to a terminal if `tty` is true, or
+        `ForkServerPipeProcess` attached to pipes otherwise.
+        """
+        if tty:
+            return self._spawn_with_terminal(argv, env, cwd)
+        return self._spawn_with_pipes(argv, env, cwd)
+
+    def wait(self, pid):
+        """Waits for the child to finish and returns its raw exit status and
+        resource usage."""
+        response = self._request({'wait': pid})
+        return response['status'], resource.struct_rusage(response['rusage'])
+
+    def forget(self, pid):
+        """Tells the server that nobody waits for the child, so its exit
+        status is dropped."""
+        with self._lock:
+            if self._exited:
+                return
+            try:
+                self.process.stdin.write(json.dumps({'forget': pid}) + '\n')
+                self.process.stdin.flush()
+            except (IOError, ValueError):
+                # the server has exited or was closed
+                pass
+
+    def isalive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.isalive():
+            self.process.stdin.close()
+            self.process.wait()
+        self._reader.join()
+        shutil.rmtree(self._fifos_dir, ignore_errors=True)
+
+    def _spawn_with_terminal(self, argv, env, cwd):
+        master_fd, slave_fd = os.openpty()
+        try:
+            attributes = termios.tcgetattr(slave_fd)
+            attributes[3] &= ~termios.ECHO
+            termios.tcsetattr(slave_fd, termios.TCSANOW, attributes)
+            fcntl.ioctl(
+                slave_fd,
+                termios.TIOCSWINSZ,
+                struct.pack('HHHH', TERMINAL_DIMENSIONS[0],
+                            TERMINAL_DIMENSIONS[1], 0, 0)
+            )
+            pid = self._request_spawn(
+                argv,
+                env,
+                cwd,
+                tty=os.ttyname(slave_fd)
+            )
+        except Exception:
+            os.close(master_fd)
+            raise
+        finally:
+            # the child has opened the terminal by now
+            os.close(slave_fd)
+        return ForkServerChild(self, pid, master_fd)
+
+    def _spawn_with_pipes(self, argv, env, cwd):
+        fds = []
+        paths = []
+        try:
+            for stream in ('stdout', 'stderr'):
+                path = os.path.join(
+                    self._fifos_dir,
+                    '%s-%s' % (next(self._fifo_names), stream)
+                )
+                os.mkfifo(path)
+                paths.append(path)
+                # opening the reading end first lets the server open the
+                # writing end without blocking
+                fds.append(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            pid = self._request_spawn(
+                argv,
+                env,
+                cwd,
+                stdout=paths[0],
+                stderr=paths[1]
+            )
+        except Exception:
+            for fd in fds:
+                os.close(fd)
+            raise
+        finally:
+            for path in paths:
+                os.remove(path)
+        return ForkServerPipeProcess(self, pid, *fds)
+
+    def _request_spawn(self, argv, env, cwd, **streams):
+        if env is None:
+            env = os.environ
+        request = {
+            'spawn': [_encode(arg) for arg in argv],
+            'cwd': _encode(os.getcwd() if cwd is None else cwd),
+            'env': dict(
+                (_encode(name), _encode(value))
+                for name, value in env.items()
+            ),
+        }
+        request.update(streams)
+        return self._request(request)['pid']
+
+    def _request(self, request):
+        responses = Queue.Queue(1)
+        with self._lock:
+            if self._exited:
+                raise ForkServerError('Fork server has exited')
+            request_id = next(self._request_ids)
+            line = json.dumps(dict(request, id=request_id)) + '\n'
+            self._pending[request_id] = responses
+            try:
+                self.process.stdin.write(line)
+                self.process.stdin.flush()
+            except (IOError, ValueError):
+                # the server has exited or was closed
+                del self._pending[request_id]
+                raise ForkServerError('Fork server has exited')
+        response = responses.get()
+        if response is None:
+            raise ForkServerError('Fork server has exited')
+        if 'error' in response:
+            raise ForkServerError(response['error'])
+        return response
+
+    def _read_responses(self):
+        for line in iter(self.process.stdout.readline, ''):
+            response = json.loads(line)
+            with self._lock:
+                responses = self._pending.pop(response.pop('id'))
+            responses.put(response)
+        with self._lock:
+            self._exited = True
+            for responses in self._pending.values():
+                responses.put(None)
+            self._pending.clear()
+
+
+def serve():
+    """Serves requests of `ForkServer` from stdin until it is closed.
+
+    Children are reaped as soon as they exit, so a request to wait for a
+    child which still runs is answered later, while the other requests are
+    served meanwhile.
+    """
+    # requests and responses use duplicates of stdin and stdout, so the
+    # forked children get untouched standard streams
+    requests_fd = os.dup(0)
+    responses = os.fdopen(os.dup(1), 'w')
+    devnull_fd = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull_fd, 0)
+    os.dup2(devnull_fd, 1)
+    os.close(devnull_fd)
+    # an exited child wakes up the select() below
+    wakeup_fds = os.pipe()
+    for fd in wakeup_fds:
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.siginterrupt(signal.SIGCHLD, False)
+    signal.set_wakeup_fd(wakeup_fds[1])
+    control_fds = [requests_fd, responses.fileno()] + list(wakeup_fds)
+
+    def respond(response):
+        responses.write(json.dumps(response) + '\n')
+        responses.flush()
+
+    lines = _read_lines(requests_fd, wakeup_fds[0])
+    request = next((line for line in lines if line is not None), None)
+    if request is None:
+        return
+    request = json.loads(request)
+    try:
+        entry_points = dict(
+            (name, load_entry_point(spec))
+            for name, spec in request['entry_points'].items()
+        )
+    except Exception:
+        respond({'id': request['id'], 'error': traceback.format_exc()})
+        return
+    respond({'id': request['id']})
+
+    finished = {}
+    # ids of the wait requests by the pids of the children
+    waiting = {}
+    # pids of the children which nobody waits for
+    forgotten = set()
+    for line in lines:
+        _reap_children(finished)
+        if line is not None:
+            request = json.loads(line)
+            if 'wait' in request:
+                waiting[request['wait']] = request['id']
+            elif 'forget' in request:
+                forgotten.add(request['forget'])
+            else:
+                respond(_spawn(entry_points, request, control_fds))
+        for pid in forgotten.intersection(finished):
+            forgotten.remove(pid)
+            del finished[pid]
+        for pid in [pid for pid in waiting if pid in finished]:
+            status, rusage = finished.pop(pid)
+            respond({
+                'id': waiting.pop(pid),
+                'status': status,
+                'rusage': list(rusage),
+            })
+
+
+def _read_lines(requests_fd, wakeup_fd):
+    # yields the lines of the requests, and `None` whenever a child exited
+    buffered = ''
+    while True:
+        try:
+            readable = select.select([requests_fd, wakeup_fd], [], [])[0]
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                continue
+            raise
+        if wakeup_fd in readable:
+            try:
+                while os.read(wakeup_fd, 1024):
+                    pass
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+            yield None
+        if requests_fd in readable:
+            data = os.read(requests_fd, 65536)
+            if not data:
+                return
+            buffered += data
+            lines = buffered.split('\n')
+            buffered = lines.pop()
+            for line in lines:
+                yield line
+
+
+def _spawn(entry_points, request, control_fds):
+    try:
+        pid = _fork_command(
+            entry_points[request['spawn'][0]],
+            request,
+            control_fds
+        )
+    except Exception:
+        return {'id': request['id'], 'error': traceback.format_exc()}
+    return {'id': request['id'], 'pid': pid}
+
+
+def _fork_command(entry_point, request, control_fds):
+    if 'tty' in request:
+        fd = os.open(request['tty'], os.O_RDWR | os.O_NOCTTY)
+        fds = [fd, fd, fd]
+    else:
+        fds = [
+            os.open(os.devnull, os.O_RDONLY),
+            os.open(request['stdout'], os.O_WRONLY),
+            os.open(request['stderr'], os.O_WRONLY),
+        ]
+
+    pid = os.fork()
+    if pid == 0:
+        exitstatus = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            os.setsid()
+            if 'tty' in request:
+                fcntl.ioctl(fds[0], termios.TIOCSCTTY, 0)
+            for target_fd, fd in enumerate(fds):
+                os.dup2(fd, target_fd)
+            for fd in set(fds + control_fds):
+                if fd > 2:
+                    os.close(fd)
+            os.chdir(_decode(request['cwd']))
+            os.environ.clear()
+            for name, value in request['env'].items():
+                os.environ[_decode(name)] = _decode(value)
+            sys.argv = [_decode(arg) for arg in request['spawn']]
+            exitstatus = call_entry_point(entry_point)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+            os._exit(exitstatus)
+
+    for fd in set(fds):
+        os.close(fd)
+    return pid
+
+
+def _encode(value):
+    # JSON carries only unicode, so bytes are mapped to the code points of
+    # the same value, which takes any bytes and round trips exactly
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return value.decode('latin-1')
+
+
+def _decode(value):
+    return value.encode('latin-1')
+
+
+def _reap_children(finished):
+    while True:
+        try:
+            pid, status, rusage = os.wait4(-1, os.WNOHANG)
+        except OSError as e:
+            if e.errno == errno.ECHILD:
+                return
+            raise
+        if pid == 0:
+            return
+        finished[pid] = status, rusage
+
+
+def get_fork_server_launch(command):
+    """Returns `(fork_server, argv)` if the command is configured in
+    `settings.FORK_SERVER_ENTRY_POINTS`, or `None` otherwise."""
+    if not settings.FORK_SERVER_ENTRY_POINTS:
+        return None
+    argv = split_simple_command(command)
+    if argv is None or argv[0] not in settings.FORK_SERVER_ENTRY_POINTS:
+        return None
+    return get_fork_server(), argv
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def get_fork_server():
+    """Returns the shared fork server for `settings.FORK_SERVER_ENTRY_POINTS`.
+
+    The server is restarted when the setting changes.
+    """
+    global _server
+    entry_points = settings.FORK_SERVER_ENTRY_POINTS
+    with _server_lock:
+        if _server is not None and (
+                _server.entry_points != entry_points or
+                not _server.isalive()):
+            _server.close()
+            _server = None
+        if _server is None and entry_points:
+            _server = ForkServer(entry_points)
+        return _server
+
+
+@atexit.register
+def _close_fork_server():
+    if _server is not None:
+        _server.close()
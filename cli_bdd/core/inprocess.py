@@ -0,0 +1,135 @@
+import importlib
+import os
+import resource
+import StringIO
+import sys
+import threading
+import traceback
+
+from cli_bdd.core import settings
+from cli_bdd.core.launch import split_simple_command
+from cli_bdd.core.output import OutputBuffer
+from cli_bdd.core.usage import make_rusage
+
+_entry_points = {}
+# entry points are called one at a time, since they share the standard
+# streams, argv, working directory and environment of the process
+_call_lock = threading.Lock()
+
+
+class InProcessCommand(object):
+    """Command which was run by calling its Python entry point in-process.
+
+    Provides the same attributes which the steps read from a spawned child.
+    `rusage` has the CPU time of the whole process during the call and its
+    peak memory so far.
+    """
+
+    def __init__(self, stdout, stderr, exitstatus, rusage=None):
+        self.logfile_read = stdout
+        self.logfile_stderr = stderr
+        self.exitstatus = exitstatus
+        self.rusage = rusage
+
+    def wait(self, timeout=None):
+        return self.exitstatus
+
+
+def load_entry_point(spec):
+    """Imports the entry point by the `module:attribute` spec, like the one
+    of `console_scripts`."""
+    if spec not in _entry_points:
+        module_name, _, attributes = spec.partition(':')
+        entry_point = importlib.import_module(module_name)
+        for attribute in attributes.split('.'):
+            entry_point = getattr(entry_point, attribute)
+        _entry_points[spec] = entry_point
+    return _entry_points[spec]
+
+
+def get_in_process_launch(command):
+    """Returns `(entry_point, argv)` if the command is configured in
+    `settings.IN_PROCESS_ENTRY_POINTS`, or `None` otherwise."""
+    if not settings.IN_PROCESS_ENTRY_POINTS:
+        return None
+    argv = split_simple_command(command)
+    if argv is None or argv[0] not in settings.IN_PROCESS_ENTRY_POINTS:
+        return None
+    spec = settings.IN_PROCESS_ENTRY_POINTS[argv[0]]
+    return load_entry_point(spec), argv
+
+
+def run_in_process(entry_point, argv, stdin='', env=None, cwd=None):
+    """Calls the entry point like the `console_scripts` wrapper does.
+
+    `sys.argv` and the standard streams are replaced while the entry point
+    runs, and so are the environment and the working directory if `env` and
+    `cwd` are given. The working directory and the environment are restored
+    afterwards, so the changes made by the entry point don't leak into the
+    next commands. Concurrent calls are run one after another.
+    """
+    with _call_lock:
+        return _run_in_process(entry_point, argv, stdin, env, cwd)
+
+
+def _run_in_process(entry_point, argv, stdin, env, cwd):
+    stdout = OutputBuffer()
+    stderr = OutputBuffer()
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_argv = sys.argv
+    saved_cwd = os.getcwd()
+    saved_environ = os.environ.copy()
+
+    sys.stdin = StringIO.StringIO(stdin)
+    sys.stdout = stdout
+    sys.stderr = stderr
+    sys.argv = list(argv)
+    if env is not None:
+        os.environ.clear()
+        os.environ.update(env)
+    if cwd is not None:
+        os.chdir(cwd)
+    started = resource.getrusage(resource.RUSAGE_SELF)
+    try:
+        exitstatus = call_entry_point(entry_point)
+    finally:
+        finished = resource.getrusage(resource.RUSAGE_SELF)
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        sys.argv = saved_argv
+        if os.getcwd() != saved_cwd:
+            os.chdir(saved_cwd)
+        if os.environ != saved_environ:
+            for variable in set(os.environ) - set(saved_environ):
+                del os.environ[variable]
+            os.environ.update(saved_environ)
+
+    rusage = make_rusage(
+        finished.ru_utime - started.ru_utime,
+        finished.ru_stime - started.ru_stime,
+        finished.ru_maxrss
+    )
+    return InProcessCommand(stdout, stderr, exitstatus, rusage)
+
+
+def call_entry_point(entry_point):
+    """Calls the entry point and returns its exit status.
+
+    Mimics `sys.exit(entry_point())` of the `console_scripts` wrapper.
+    """
+    try:
+        return get_exit_status(entry_point())
+    except SystemExit as e:
+        return get_exit_status(e.code)
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+
+def get_exit_status(code):
+    """Converts the code of `sys.exit(code)` to the exit status."""
+    if code is None:
+        return 0
+    if isinstance(code, (int, long)):
+        return code & 0xff
+    sys.stderr.write('%s\n' % code)
+    return 1
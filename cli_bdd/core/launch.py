@@ -0,0 +1,126 @@
+import collections
+import os
+
+# Characters which make the shell do something besides splitting words:
+# pipes, lists, redirections, subshells, expansions, globs and escapes.
+SHELL_SPECIAL_CHARS = frozenset('|&;<>()$`\\*?[\n')
+# Characters which are special inside double quotes.
+DOUBLE_QUOTED_SPECIAL_CHARS = frozenset('$`\\')
+# Characters which are special at the beginning of a word.
+WORD_START_SPECIAL_CHARS = frozenset('#~')
+# Commands which are reserved words or behave differently as builtins of the
+# shell (e.g. `echo` of dash interprets escapes and `/bin/echo` doesn't).
+SHELL_WORDS = frozenset([
+    '!', '{', '}', '[[', ']]', 'case', 'do', 'done', 'elif', 'else', 'esac',
+    'fi', 'for', 'function', 'if', 'in', 'select', 'then', 'time', 'until',
+    'while', '.', ':', '[', 'alias', 'bg', 'break', 'cd', 'command',
+    'continue', 'echo', 'eval', 'exec', 'exit', 'export', 'false', 'fc', 'fg',
+    'getopts', 'hash', 'jobs', 'kill', 'local', 'printf', 'pwd', 'read',
+    'readonly', 'return', 'set', 'shift', 'source', 'test', 'times', 'trap',
+    'true', 'type', 'ulimit', 'umask', 'unalias', 'unset', 'wait',
+])
+
+# How the commands were launched: `'exec'`, `'shell'`, `'pool'`,
+# `'session'`, `'in-process'` or `'fork-server'`. Useful to check the rate of
+# the fallbacks to the shell.
+launch_stats = collections.Counter()
+
+_executables = {}
+
+
+def split_simple_command(command):
+    """Splits the command into arguments like the shell does.
+
+    Returns `None` if the command uses any shell feature, so it must be
+    run by the shell.
+    """
+    argv = []
+    word = None
+    quote = None
+    for char in command:
+        if quote == "'":
+            if char == "'":
+                quote = None
+            else:
+                word += char
+        elif quote == '"':
+            if char == '"':
+                quote = None
+            elif char in DOUBLE_QUOTED_SPECIAL_CHARS:
+                return None
+            else:
+                word += char
+        elif char in '\'"':
+            quote = char
+            word = word or ''
+        elif char in ' \t':
+            if word is not None:
+                argv.append(word)
+                word = None
+        elif char in SHELL_SPECIAL_CHARS:
+            return None
+        elif word is None and char in WORD_START_SPECIAL_CHARS:
+            return None
+        else:
+            word = (word or '') + char
+
+    if quote is not None:
+        return None
+    if word is not None:
+        argv.append(word)
+    if not argv or '=' in argv[0] or argv[0] in SHELL_WORDS:
+        return None
+    return argv
+
+
+def find_executable(name, env=None, cwd=None):
+    """Looks up the executable in `PATH` of the environment (of the current
+    process by default) like the shell does.
+
+    Relative paths are resolved against `cwd` (the working directory of the
+    current process by default). Executables found in absolute directories
+    are cached per `PATH` value. Returns `None` if there is no such
+    executable.
+    """
+    if '/' in name:
+        name = _resolve(name, cwd)
+        return name if _is_executable(name) else None
+
+    if env is None:
+        env = os.environ
+    path = env.get('PATH', os.defpath)
+    key = (name, path)
+    if key in _executables:
+        return _executables[key]
+
+    for directory in path.split(os.pathsep):
+        candidate = _resolve(os.path.join(directory or os.curdir, name), cwd)
+        if _is_executable(candidate):
+            if os.path.isabs(directory):
+                _executables[key] = candidate
+            return candidate
+    return None
+
+
+def get_direct_launch(command, env=None, cwd=None):
+    """Returns `(executable, argv)` if the command could be executed without
+    the shell in the environment and the working directory, or `None`
+    otherwise."""
+    argv = split_simple_command(command)
+    if argv is None:
+        return None
+    executable = find_executable(argv[0], env, cwd)
+    if executable is None:
+        # let the shell report that the command was not found
+        return None
+    return executable, argv
+
+
+def _resolve(path, cwd):
+    if cwd is None:
+        return path
+    return os.path.join(cwd, path)
+
+
+def _is_executable(path):
+    return os.path.isfile(path) and os.access(path, os.X_OK)
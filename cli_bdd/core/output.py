@@ -0,0 +1,317 @@
+import array
+import bisect
+import mmap
+import string
+import tempfile
+import threading
+
+from cli_bdd.core import settings
+
+
+class OutputBuffer(object):
+    """File-like buffer for the output of a command.
+
+    Keeps the output in memory up to `memory_limit` bytes and spills it to an
+    anonymous temporary file after that, so chatty commands don't hold all
+    their output in memory. Spilled output is read through `mmap`.
+
+    Output beyond `max_size` bytes is dropped and `truncated` is set. `size`
+    is the number of bytes which were written, including the dropped ones.
+
+    Both limits default to `settings.OUTPUT_MEMORY_LIMIT` and
+    `settings.OUTPUT_MAX_SIZE`.
+
+    Offsets of the line feeds are indexed while the output is written, see
+    `OutputView`. The buffer could be written by one thread (e.g. for a
+    background command) and read by another.
+    """
+
+    def __init__(self, memory_limit=None, max_size=None):
+        if memory_limit is None:
+            memory_limit = settings.OUTPUT_MEMORY_LIMIT
+        if max_size is None:
+            max_size = settings.OUTPUT_MAX_SIZE
+        self.memory_limit = memory_limit
+        self.max_size = max_size
+        self.truncated = False
+        self.size = 0
+        self.softspace = 0  # used by `print`
+        # incremented on every change, so the cached views are invalidated
+        self.version = 0
+        self.line_ends = array.array('L')
+        self._chunks = []
+        self._length = 0
+        self._file = None
+        self._mmap = None
+        self._lock = threading.RLock()
+
+    @property
+    def spilled(self):
+        return self._file is not None
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode('utf-8')
+        with self._lock:
+            self._write(data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def truncate(self, size=0):
+        """Drops the output after `size` bytes, e.g. `truncate(0)` clears the
+        buffer. The following writes are appended at `size`."""
+        with self._lock:
+            self._truncate(size)
+
+    def view(self):
+        """Returns the output as a string, or as a read-only `mmap` if it was
+        spilled to disk. Both support `len()`, slicing and `find()`, so large
+        output could be searched without copying it into memory.
+        """
+        with self._lock:
+            return self._view()
+
+    def find(self, sub, start=0):
+        return self.view().find(sub, start)
+
+    def __contains__(self, sub):
+        return self.find(sub) != -1
+
+    def __len__(self):
+        return self._length
+
+    def getvalue(self):
+        with self._lock:
+            if self._file is not None:
+                return self._view()[:]
+            if len(self._chunks) > 1:
+                self._chunks = [''.join(self._chunks)]
+            return self._chunks[0] if self._chunks else ''
+
+    def describe_truncation(self):
+        """Returns a note about the dropped output for assertion messages, or
+        an empty string if nothing was dropped."""
+        if not self.truncated:
+            return ''
+        return '(output was truncated to %s of %s bytes)' % (
+            self._length,
+            self.size
+        )
+
+    def _write(self, data):
+        self.size += len(data)
+        if self.max_size is not None:
+            room = max(self.max_size - self._length, 0)
+            if len(data) > room:
+                data = data[:room]
+                self.truncated = True
+        if not data:
+            return
+        index_line_ends(data, self._length, self.line_ends)
+        self._length += len(data)
+        self.version += 1
+        if self._file is not None:
+            self._file.write(data)
+            self._mmap = None
+        elif self._length > self.memory_limit:
+            self._spill(data)
+        else:
+            self._chunks.append(data)
+
+    def _truncate(self, size):
+        if size >= self._length:
+            return
+        del self.line_ends[bisect.bisect_left(self.line_ends, size):]
+        self.version += 1
+        if self._file is not None:
+            self._mmap = None
+            self._file.truncate(size)
+            self._file.seek(size)
+        else:
+            self._chunks = [self.getvalue()[:size]]
+        self._length = size
+        self.size = size
+        self.truncated = False
+
+    def _view(self):
+        if self._file is None:
+            return self.getvalue()
+        if self._length == 0:
+            return ''
+        if self._mmap is None:
+            self._file.flush()
+            self._mmap = mmap.mmap(
+                self._file.fileno(),
+                self._length,
+                access=mmap.ACCESS_READ
+            )
+        return self._mmap
+
+    def _spill(self, data):
+        self._file = tempfile.TemporaryFile(prefix='cli_bdd_output_')
+        for chunk in self._chunks:
+            self._file.write(chunk)
+        self._file.write(data)
+        self._chunks = []
+
+
+class OutputView(object):
+    """Output of one or more buffers (e.g. stdout followed by stderr) as the
+    assertions see it: with `\r\n` of the terminal normalized to `\n`.
+
+    The normalized text is built once and cached until more output arrives.
+    Line counts, line lookups and substring checks of a single buffer are
+    answered from its raw data and line index without building it at all,
+    since the normalization doesn't move line boundaries.
+    """
+
+    def __init__(self, buffers):
+        self.buffers = list(buffers)
+        self._text = None
+        self._line_ends = None
+        self._version = None
+
+    @property
+    def text(self):
+        """The normalized output."""
+        self._refresh()
+        if self._text is None:
+            self._text = ''.join(
+                buffer_.getvalue() for buffer_ in self.buffers
+            ).replace('\r\n', '\n')
+        return self._text
+
+    def contains(self, sub):
+        """Checks if the normalized output contains the text."""
+        if len(self.buffers) == 1 and not ('\r' in sub or '\n' in sub):
+            # a match without line breaks is the same in the raw output
+            return sub in self.buffers[0]
+        return sub in self.text
+
+    def find_texts(self, texts):
+        """Returns the set of the texts which the normalized output contains.
+
+        The texts without line breaks are searched in the raw output, so the
+        output is normalized only for the others, see `find_texts`.
+        """
+        texts = set(texts)
+        if len(self.buffers) != 1:
+            return find_texts(self.text, texts)
+        # matches without line breaks are the same in the raw output
+        raw_texts = set(
+            text for text in texts
+            if not ('\r' in text or '\n' in text)
+        )
+        found = find_texts(self.buffers[0].view(), raw_texts)
+        if texts - raw_texts:
+            found |= find_texts(self.text, texts - raw_texts)
+        return found
+
+    def count_lines(self):
+        """Returns the number of lines of the output without the leading and
+        trailing whitespace."""
+        data, line_ends = self._get_indexed_data()
+        start = 0
+        while start < len(data) and data[start] in string.whitespace:
+            start += 1
+        end = len(data)
+        while end > start and data[end - 1] in string.whitespace:
+            end -= 1
+        if start == end:
+            return 0
+        return (
+            bisect.bisect_left(line_ends, end) -
+            bisect.bisect_left(line_ends, start) + 1
+        )
+
+    def line(self, number):
+        """Returns the normalized line by its number (starting from 1)
+        without the line break.
+
+        Raises `IndexError` if there is no such line.
+        """
+        data, line_ends = self._get_indexed_data()
+        if number < 1 or number > len(line_ends) + 1:
+            raise IndexError('There is no line %s' % number)
+        start = line_ends[number - 2] + 1 if number > 1 else 0
+        if number <= len(line_ends):
+            end = line_ends[number - 1]
+        else:
+            end = len(data)
+            if start == end:
+                # the output ends with a line break
+                raise IndexError('There is no line %s' % number)
+        if end > start and data[end - 1] == '\r':
+            end -= 1
+        return data[start:end]
+
+    def iter_mismatched_lines(self, pattern):
+        """Yields `(number, line)` of the lines which the compiled pattern
+        does not match.
+
+        Lines are matched in place by `pattern.match(data, start, end)`, so
+        only the mismatched ones are copied. `\Z` of the pattern matches at
+        the end of the line, and `^` does if the pattern is compiled with
+        `re.MULTILINE`.
+        """
+        data, line_ends = self._get_indexed_data()
+        start = 0
+        for number in xrange(1, len(line_ends) + 2):
+            if number <= len(line_ends):
+                end = line_ends[number - 1]
+            else:
+                end = len(data)
+                if start == end:
+                    # the output ends with a line break
+                    return
+            next_start = end + 1
+            if end > start and data[end - 1] == '\r':
+                end -= 1
+            if pattern.match(data, start, end) is None:
+                yield number, data[start:end]
+            start = next_start
+
+    def _get_indexed_data(self):
+        if len(self.buffers) == 1:
+            return self.buffers[0].view(), self.buffers[0].line_ends
+        text = self.text
+        if self._line_ends is None:
+            self._line_ends = index_line_ends(text, 0, array.array('L'))
+        return text, self._line_ends
+
+    def _refresh(self):
+        version = tuple(buffer_.version for buffer_ in self.buffers)
+        if version != self._version:
+            self._text = None
+            self._line_ends = None
+            self._version = version
+
+
+def index_line_ends(data, offset, line_ends):
+    """Appends the offsets of the line feeds of the data, which starts at
+    `offset` of the output, to `line_ends`."""
+    position = data.find('\n')
+    while position != -1:
+        line_ends.append(offset + position)
+        position = data.find('\n', position + 1)
+    return line_ends
+
+
+def find_texts(data, texts):
+    """Returns the set of the texts which the data (a string or `mmap`)
+    contains.
+
+    Every text is searched by `find` of its own, which scans the data at C
+    speed. An alternation of the texts would scan the data once, but `re`
+    tries its branches one by one at every position, which is slower unless
+    the texts start with rare characters.
+    """
+    return set(text for text in texts if data.find(text) != -1)
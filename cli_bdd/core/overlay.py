@@ -0,0 +1,86 @@
+import os
+import threading
+
+# marks a variable which was removed by the overlay
+_DELETED = object()
+
+
+class EnvironmentOverlay(object):
+    """Changes of the environment variables on top of the base environment
+    (`os.environ` by default), which is never modified.
+
+    Only the changed variables are stored, so the changes are reverted in
+    time proportional to their number, and the whole environment is copied
+    only for a command which is spawned with it (see `to_dict`). Every
+    scenario has its own overlay, so scenarios which run in threads of one
+    process don't see the changes of each other. An overlay could be used
+    from several threads as well.
+    """
+
+    def __init__(self, base=None):
+        self.base = os.environ if base is None else base
+        self._changes = {}
+        self._lock = threading.RLock()
+
+    def __getitem__(self, variable):
+        with self._lock:
+            value = self._changes.get(variable)
+            if value is None:
+                return self.base[variable]
+            if value is _DELETED:
+                raise KeyError(variable)
+            return value
+
+    def __setitem__(self, variable, value):
+        with self._lock:
+            self._changes[variable] = value
+
+    def __delitem__(self, variable):
+        with self._lock:
+            if variable not in self:
+                raise KeyError(variable)
+            self._changes[variable] = _DELETED
+
+    def __contains__(self, variable):
+        try:
+            self[variable]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, variable, default=None):
+        try:
+            return self[variable]
+        except KeyError:
+            return default
+
+    def append(self, variable, value):
+        """Appends the value to the variable, which is empty if not set."""
+        with self._lock:
+            self[variable] = self.get(variable, '') + value
+
+    def prepend(self, variable, value):
+        """Prepends the value to the variable, which is empty if not set."""
+        with self._lock:
+            self[variable] = value + self.get(variable, '')
+
+    @property
+    def changed(self):
+        return bool(self._changes)
+
+    def revert(self):
+        """Drops all the changes."""
+        with self._lock:
+            self._changes.clear()
+
+    def to_dict(self):
+        """Returns the whole environment with the changes, e.g. for `env` of
+        a spawned command."""
+        with self._lock:
+            environment = dict(self.base)
+            for variable, value in self._changes.items():
+                if value is _DELETED:
+                    environment.pop(variable, None)
+                else:
+                    environment[variable] = value
+            return environment
@@ -0,0 +1,39 @@
+import collections
+import re
+import threading
+
+# Number of compiled patterns which are kept by `compile_pattern`.
+PATTERN_CACHE_SIZE = 256
+
+_patterns = collections.OrderedDict()
+_patterns_lock = threading.Lock()
+
+
+def compile_pattern(pattern, flags=0):
+    """Compiles the regular expression, caching the least recently used
+    `PATTERN_CACHE_SIZE` patterns for the whole process.
+
+    Unlike the cache of `re`, which is cleared entirely once it is full, the
+    patterns of the steps which are used in every scenario stay compiled.
+    """
+    key = (pattern, flags)
+    with _patterns_lock:
+        compiled = _patterns.pop(key, None)
+        if compiled is None:
+            compiled = re.compile(pattern, flags)
+        _patterns[key] = compiled
+        while len(_patterns) > PATTERN_CACHE_SIZE:
+            _patterns.popitem(last=False)
+    return compiled
+
+
+def get_flags(letters):
+    """Converts the flag letters of `/pattern/ims` to `re` flags."""
+    flags = 0
+    for letter in letters or '':
+        flags |= {
+            'i': re.IGNORECASE,
+            'm': re.MULTILINE,
+            's': re.DOTALL,
+        }[letter]
+    return flags
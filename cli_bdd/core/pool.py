@@ -0,0 +1,186 @@
+import atexit
+import os
+import Queue
+import re
+import signal
+import threading
+
+from cli_bdd.core import settings
+from cli_bdd.core.usage import AccountedSpawn
+
+# The warm shell blocks on reading a single line from its terminal and then
+# evaluates it, so the command gets the same pty as a freshly spawned one.
+WARM_SHELL_SCRIPT = 'IFS= read -r cli_bdd_command && eval "$cli_bdd_command"'
+
+# Terminal in canonical mode can't deliver longer lines (4096 bytes on
+# linux) and interprets control characters, so such commands are not sent
+# to the warm shells.
+MAX_COMMAND_LENGTH = 4000
+UNSAFE_COMMAND_RE = re.compile(r'[\x00-\x1f\x7f]')
+
+# Seconds which `close` waits for a spawn in progress.
+CLOSE_TIMEOUT = 5
+
+
+def is_poolable(command):
+    return (
+        len(command) <= MAX_COMMAND_LENGTH and
+        not UNSAFE_COMMAND_RE.search(command)
+    )
+
+
+class ShellPool(object):
+    """Keeps pre-spawned shells waiting for a command.
+
+    Shells are spawned by a background thread, so `checkout` only sends the
+    command. The pool is refilled with the working directory and environment
+    of the last checkout, and a shell which was spawned with other ones is
+    never handed out.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._shells = Queue.Queue()
+        self._stale = Queue.Queue()
+        self._closed = False
+        self._snapshot = _take_snapshot() or ('/', os.environ.copy())
+        self._refill = threading.Event()
+        self._refill.set()
+        self._reaper = threading.Thread(target=self._reap)
+        self._reaper.daemon = True
+        self._reaper.start()
+        self._filler = threading.Thread(target=self._fill)
+        self._filler.daemon = True
+        self._filler.start()
+
+    def checkout(self, command, env=None, cwd=None):
+        """Sends the command to a warm shell and returns it.
+
+        Returns `None` if the command can't be sent or there is no ready
+        shell for the working directory and the environment (of the current
+        process by default).
+        """
+        if not is_poolable(command):
+            return None
+
+        snapshot = _take_snapshot(env, cwd)
+        if snapshot is None:
+            return None
+
+        child = None
+        while True:
+            try:
+                shell_snapshot, shell = self._shells.get_nowait()
+            except Queue.Empty:
+                break
+            if shell_snapshot == snapshot and shell.isalive():
+                child = shell
+                break
+            self._stale.put(shell)
+
+        if child is not None:
+            # sendline() sleeps for `delaybeforesend` which would eat the
+            # gain
+            delaybeforesend = child.delaybeforesend
+            child.delaybeforesend = None
+            child.sendline(command)
+            child.delaybeforesend = delaybeforesend
+        self._snapshot = snapshot
+        self._refill.set()
+        return child
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # a refill in progress stops after its current spawn
+        self._refill.set()
+        self._filler.join(CLOSE_TIMEOUT)
+        while True:
+            try:
+                self._stale.put(self._shells.get_nowait()[1])
+            except Queue.Empty:
+                break
+        self._stale.put(None)
+        self._reaper.join()
+
+    def _fill(self):
+        while True:
+            self._refill.wait()
+            self._refill.clear()
+            snapshot = self._snapshot
+            # a checkout with another snapshot starts the refill over
+            while (not self._closed and self._snapshot is snapshot and
+                   self._shells.qsize() < self.size):
+                try:
+                    child = AccountedSpawn(
+                        '/bin/sh',
+                        ['-c', WARM_SHELL_SCRIPT],
+                        cwd=snapshot[0],
+                        env=snapshot[1],
+                        echo=False
+                    )
+                except Exception:
+                    # e.g. the working directory was removed, so the next
+                    # checkout brings a new one
+                    break
+                if self._closed:
+                    # the pool was closed during the spawn
+                    _discard(child)
+                    break
+                self._shells.put((snapshot, child))
+            if self._closed:
+                break
+
+    def _reap(self):
+        while True:
+            child = self._stale.get()
+            if child is None:
+                break
+            _discard(child)
+
+
+def _discard(child):
+    # a warm shell has nothing to finish, so don't wait for it politely
+    if child.isalive():
+        child.kill(signal.SIGKILL)
+        child.wait()
+    child.ptyproc.delayafterclose = 0
+    child.close()
+
+
+def _take_snapshot(env=None, cwd=None):
+    try:
+        return (
+            os.getcwd() if cwd is None else cwd,
+            os.environ.copy() if env is None else dict(env)
+        )
+    except OSError:
+        # the working directory was removed
+        return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_shell_pool():
+    """Returns the shared pool sized by `settings.SHELL_POOL_SIZE`.
+
+    Returns `None` when the pool is disabled.
+    """
+    global _pool
+    size = settings.SHELL_POOL_SIZE
+    with _pool_lock:
+        if _pool is not None and _pool.size != size:
+            _pool.close()
+            _pool = None
+        if _pool is None and size > 0:
+            _pool = ShellPool(size)
+        return _pool
+
+
+@atexit.register
+def _close_shell_pool():
+    if _pool is not None:
+        _pool.close()
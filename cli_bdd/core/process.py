@@ -0,0 +1,130 @@
+import errno
+import os
+import select
+import signal
+import subprocess
+import time
+
+import pexpect
+
+from cli_bdd.core.output import OutputBuffer
+from cli_bdd.core.usage import wait4
+
+CHUNK_SIZE = 64 * 1024
+
+
+class PipeProcess(object):
+    """Command which is run with pipes instead of a terminal.
+
+    stdout and stderr are read concurrently into separate buffers, so they
+    are not merged and the output bypasses the terminal line discipline.
+    stdin is `/dev/null`. Like a spawned child, the command leads its own
+    session, so it is killed together with the processes it started.
+
+    The command is run by the shell unless `argv` and `executable` are given,
+    with the environment and the working directory of the current process
+    unless `env` and `cwd` are given. It is reaped by `wait4`, which keeps
+    its resource usage in `rusage`.
+    """
+
+    def __init__(self,
+                 command,
+                 argv=None,
+                 executable=None,
+                 env=None,
+                 cwd=None):
+        self.logfile_read = OutputBuffer()
+        self.logfile_stderr = OutputBuffer()
+        self.exitstatus = None
+        self.signalstatus = None
+        self.rusage = None
+        with open(os.devnull) as devnull:
+            self.process = subprocess.Popen(
+                argv or ['/bin/sh', '-c', command],
+                executable=executable,
+                env=env,
+                cwd=cwd,
+                stdin=devnull,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                close_fds=True,
+                preexec_fn=os.setsid
+            )
+        self.pid = self.process.pid
+        self.stdout_fd = self.process.stdout.fileno()
+        self.stderr_fd = self.process.stderr.fileno()
+        self.finished = False
+
+    def wait(self, timeout=None):
+        """Reads the output until the command finishes.
+
+        Raises `pexpect.TIMEOUT` and kills the command if it does not finish
+        in `timeout` seconds.
+        """
+        if not self.finished:
+            self._communicate(timeout)
+        return self.exitstatus
+
+    def isalive(self):
+        return not self._reap(os.WNOHANG)
+
+    def _communicate(self, timeout):
+        buffers = {
+            self.stdout_fd: self.logfile_read,
+            self.stderr_fd: self.logfile_stderr,
+        }
+        deadline = None if timeout is None else time.time() + timeout
+        while buffers:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self._kill()
+                    self._finish()
+                    raise pexpect.TIMEOUT(
+                        'Command did not finish in %s seconds' % timeout
+                    )
+            try:
+                ready = select.select(list(buffers), [], [], remaining)[0]
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+            for fd in ready:
+                data = os.read(fd, CHUNK_SIZE)
+                if data:
+                    buffers[fd].write(data)
+                else:
+                    del buffers[fd]
+        self._finish()
+
+    def _kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _finish(self):
+        self.process.stdout.close()
+        self.process.stderr.close()
+        self._reap(0)
+        self._set_returncode(self.process.returncode)
+        self.finished = True
+
+    def _reap(self, options):
+        """Returns `True` if the command has exited."""
+        if self.process.returncode is None:
+            pid, status, rusage = wait4(self.pid, options)
+            if pid == 0:
+                return False
+            self.process._handle_exitstatus(status)
+            self.rusage = rusage
+        return True
+
+    def _set_returncode(self, returncode):
+        # negative return code means the process was killed by a signal
+        if returncode < 0:
+            self.signalstatus = -returncode
+        else:
+            self.exitstatus = returncode
@@ -0,0 +1,115 @@
+import fcntl
+import heapq
+import json
+import os
+import tempfile
+
+from cli_bdd.core.benchmark import get_percentile
+
+# Number of the last run times of a scenario which are kept in the history.
+HISTORY_SAMPLES = 5
+# Estimate of a scenario (seconds) when there are no run times at all.
+DEFAULT_DURATION = 1.0
+
+
+class DurationHistory(object):
+    """Wall times of the last runs of the scenarios, which are stored in a
+    JSON file by the key of the scenario.
+
+    The file is written with sorted keys, so it could be cached or kept under
+    version control and shared by the nodes of a CI build. Changes are made
+    under a lock of the directory of the file, and merged with the ones which
+    other processes have written meanwhile.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._durations = None
+
+    def get(self, key):
+        """Returns the median of the last run times of the scenario, or
+        `None`."""
+        samples = self._load().get(key)
+        if not samples:
+            return None
+        return get_percentile(sorted(samples), 50)
+
+    def estimate(self, keys):
+        """Returns the expected run times of the scenarios. A scenario which
+        has no history is expected to take the median of the ones which
+        have."""
+        durations = [self.get(key) for key in keys]
+        known = sorted(
+            duration for duration in map(self.get, self._load())
+            if duration is not None
+        )
+        default = get_percentile(known, 50) if known else DEFAULT_DURATION
+        return [
+            default if duration is None else duration
+            for duration in durations
+        ]
+
+    def update(self, durations):
+        """Adds the run times (seconds) by the keys of the scenarios."""
+        if not durations:
+            return
+        # the file is replaced on save, so its directory is locked
+        directory_fd = os.open(os.path.dirname(self.path), os.O_RDONLY)
+        try:
+            fcntl.flock(directory_fd, fcntl.LOCK_EX)
+            self._durations = None
+            history = self._load()
+            for key, duration in durations.items():
+                samples = history.get(key, []) + [duration]
+                history[key] = samples[-HISTORY_SAMPLES:]
+            self._save(history)
+        finally:
+            os.close(directory_fd)
+
+    def _load(self):
+        if self._durations is None:
+            try:
+                with open(self.path) as history_file:
+                    self._durations = json.load(history_file)
+            except (IOError, ValueError):
+                # a missing or broken history just means no estimates
+                self._durations = {}
+        return self._durations
+
+    def _save(self, history):
+        # replace the file at once, so it is never left half-written
+        fd, temp_path = tempfile.mkstemp(
+            prefix='.history-',
+            dir=os.path.dirname(self.path)
+        )
+        with os.fdopen(fd, 'w') as history_file:
+            json.dump(history, history_file, indent=2, sort_keys=True)
+            history_file.write('\n')
+        os.rename(temp_path, self.path)
+
+
+def order_longest_first(durations):
+    """Returns the indexes of the run times from the longest to the shortest.
+    Equal run times keep their order, so the order is the same everywhere for
+    the same history."""
+    return sorted(
+        range(len(durations)),
+        key=lambda index: (-durations[index], index)
+    )
+
+
+def split_into_shards(durations, count):
+    """Splits the indexes of the run times into `count` shards of about the
+    same total run time.
+
+    Uses the longest processing time first rule: every run time, from the
+    longest, goes to the shard with the smallest total so far. The indexes of
+    every shard are from the longest run time to the shortest.
+    """
+    shards = [[] for _ in range(count)]
+    totals = [(0.0, shard) for shard in range(count)]
+    for index in order_longest_first(durations):
+        total, shard = heapq.heappop(totals)
+        shards[shard].append(index)
+        heapq.heappush(totals, (total + durations[index], shard))
+    return shards
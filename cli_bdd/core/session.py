@@ -0,0 +1,135 @@
+import os
+import pipes
+import re
+import uuid
+
+import pexpect
+
+from cli_bdd.core.output import OutputBuffer
+from cli_bdd.core.pool import is_poolable
+
+# Every line is evaluated by the same shell. Commands are run in a subshell
+# (fork without exec) so `exit`, `cd` or `set -e` of one command don't
+# affect the next one, just like with separately spawned shells.
+SESSION_SHELL_SCRIPT = (
+    'while IFS= read -r cli_bdd_line; do eval "$cli_bdd_line"; done'
+)
+VARIABLE_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class SessionCommand(object):
+    """Finished command of a shell session.
+
+    Provides the same attributes which the steps read from a spawned child.
+    """
+
+    def __init__(self, output, exitstatus):
+        self.logfile_read = OutputBuffer()
+        self.logfile_read.write(output)
+        self.exitstatus = exitstatus
+
+    def wait(self, timeout=None):
+        return self.exitstatus
+
+
+class ShellSession(object):
+    """Long-lived shell which runs commands one by one.
+
+    Output and exit status of every command are delimited by the sentinel
+    markers which are unique for the session. Working directory and
+    environment of the shell are synchronized before each command with the
+    current process, or with the ones which are given for the command.
+    """
+
+    def __init__(self):
+        token = uuid.uuid4().hex
+        self.begin_marker = '__cli_bdd_begin_%s__' % token
+        self.end_marker = '__cli_bdd_end_%s__' % token
+        self._end_re = re.compile(re.escape(self.end_marker) + r':(\d+)\r\n')
+        self.child = None
+        self._cwd = None
+        self._env = None
+
+    def can_run(self, command):
+        return is_poolable(self._build_line(command))
+
+    def run(self, command, timeout=30, env=None, cwd=None):
+        """Runs the command and returns `SessionCommand`.
+
+        Raises `pexpect.TIMEOUT` if the command does not finish in time. The
+        shell is closed then and the next command starts a new one.
+        """
+        env = os.environ.copy() if env is None else dict(env)
+        cwd = os.getcwd() if cwd is None else cwd
+        if self.child is None or not self.child.isalive():
+            self._spawn(env, cwd)
+        self._synchronize(env, cwd)
+        self.child.sendline(self._build_line(command))
+        try:
+            self.child.expect_exact(
+                self.begin_marker + '\r\n',
+                timeout=timeout
+            )
+            self.child.expect(self._end_re, timeout=timeout)
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            self.close()
+            raise
+        return SessionCommand(
+            output=self.child.before,
+            exitstatus=int(self.child.match.group(1))
+        )
+
+    def close(self):
+        if self.child is not None:
+            self.child.close(force=True)
+            self.child = None
+
+    def _spawn(self, env, cwd):
+        self._cwd = cwd
+        self._env = env
+        self.child = pexpect.spawn(
+            '/bin/sh',
+            ['-c', SESSION_SHELL_SCRIPT],
+            cwd=self._cwd,
+            env=self._env,
+            echo=False
+        )
+        # commands are sent right after the previous one has finished
+        self.child.delaybeforesend = None
+
+    def _synchronize(self, env, cwd):
+        statements = []
+        if cwd != self._cwd:
+            statements.append('cd %s' % pipes.quote(cwd))
+        if env != self._env:
+            # variables which the shell can't name are passed only to the
+            # shells spawned afterwards
+            for variable, value in env.items():
+                if (self._env.get(variable) != value and
+                        VARIABLE_NAME_RE.match(variable)):
+                    statements.append(
+                        'export %s=%s' % (variable, pipes.quote(value))
+                    )
+            for variable in set(self._env) - set(env):
+                if VARIABLE_NAME_RE.match(variable):
+                    statements.append('unset %s' % variable)
+
+        if not all(is_poolable(statement) for statement in statements):
+            self.close()
+            self._spawn(env, cwd)
+            return
+        for statement in statements:
+            self.child.sendline(statement + ' >/dev/null 2>&1')
+        self._cwd = cwd
+        self._env = env
+
+    def _build_line(self, command):
+        return (
+            "printf '%%s\\n' %(begin)s; "
+            "(eval %(command)s); "
+            "printf '%%s:%%s\\n' %(end)s \"$?\""
+        ) % {
+            'begin': self.begin_marker,
+            'command': pipes.quote(command),
+            'end': self.end_marker,
+        }
@@ -0,0 +1,68 @@
+"""Runtime settings of cli-bdd.
+
+Settings are plain module attributes. They are read on every step call, so
+you could change them at any time, e.g. from the `before_all` hook of
+behave:
+
+    from cli_bdd.core import settings
+
+    def before_all(context):
+        settings.SHELL_POOL_SIZE = 4
+"""
+
+# Number of pre-spawned shells which are kept warm and handed to `run()`.
+# `0` disables the pool.
+SHELL_POOL_SIZE = 0
+
+# How commands which are not run interactively are spawned:
+# - `'pty'` attaches stdin, stdout and stderr to a terminal, so stdout and
+#   stderr are merged
+# - `'pipe'` attaches stdout and stderr to separate pipes and stdin to
+#   `/dev/null`
+NON_INTERACTIVE_BACKEND = 'pty'
+
+# Execute simple commands (without pipes, redirections, globs, expansions,
+# etc.) directly instead of running them by `/bin/sh -c`.
+DIRECT_EXEC = False
+
+# Python entry points which are called in-process instead of spawning a
+# command, by the command name, e.g. `{'mytool': 'mypackage.cli:main'}`.
+IN_PROCESS_ENTRY_POINTS = {}
+
+# Python entry points which are run by the fork server, by the command name,
+# e.g. `{'mytool': 'mypackage.cli:main'}`. The server imports them once and
+# forks a child for every command.
+FORK_SERVER_ENTRY_POINTS = {}
+
+# Number of bytes of the output of a command (stdout and stderr separately)
+# which are kept in memory. The rest is spilled to a temporary file.
+OUTPUT_MEMORY_LIMIT = 1024 * 1024
+
+# Maximum number of bytes of the output of a command (stdout and stderr
+# separately) which are captured. The rest is dropped, and the assertion
+# errors tell that the output was truncated. `None` means no limit.
+OUTPUT_MAX_SIZE = None
+
+# Seconds which are spent on the diff of long outputs for the failed
+# `output should contain exactly` check. The rest of the output is reported
+# as replaced.
+DIFF_TIME_BUDGET = 1.0
+
+# Number of hunks of the diff of long outputs which are shown for the failed
+# `output should contain exactly` check.
+DIFF_MAX_HUNKS = 10
+
+# Number of worker threads which run the commands of the `I run the following
+# commands concurrently` step. `None` means the number of CPUs.
+CONCURRENT_COMMANDS_WORKERS = None
+
+# JSON file with the baseline run times of the commands, see the `slower than
+# baseline` step. Relative path is resolved against the working directory.
+BASELINES_PATH = 'performance_baselines.json'
+
+# Record the run times as the new baselines instead of comparing them.
+UPDATE_BASELINES = False
+
+# Number of runs of the command which are compared with its baseline (or
+# recorded as the baseline), unless it was benchmarked.
+BASELINE_SAMPLES = 5
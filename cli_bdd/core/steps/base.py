@@ -8,6 +8,16 @@ class StepBase(object):
     def build_step_func(self):
         raise NotImplementedError()
 
+    def for_invocation(self, *args):
+        """Returns a new instance of the step for one invocation, made with
+        the state of the invocation (e.g. the context of the framework).
+
+        The step functions are shared by all the scenarios, so the state is
+        never kept on the instance which built them, and concurrent
+        invocations don't see the state of each other.
+        """
+        return type(self)(*args)
+
     def get_table(self):
         raise NotImplementedError()
 
@@ -17,6 +27,39 @@ class StepBase(object):
     def get_scenario_context(self):
         raise NotImplementedError()
 
+    def get_scenario_name(self):
+        """Returns the names of the feature and the scenario."""
+        raise NotImplementedError()
+
+    def add_scenario_cleanup(self, cleanup):
+        """Calls `cleanup` without arguments when the scenario finishes."""
+        raise NotImplementedError()
+
+
+def add_scenario_cleanup(context, cleanup):
+    """Adds the cleanup to the ones of the scenario context, which are called
+    by `run_scenario_cleanups`."""
+    cleanups = getattr(context, 'scenario_cleanups', None)
+    if cleanups is None:
+        cleanups = context.scenario_cleanups = []
+    cleanups.append(cleanup)
+
+
+def run_scenario_cleanups(context):
+    """Calls the cleanups of the scenario context in the reverse order of
+    adding. All of them are called, and the first error is raised then."""
+    cleanups = getattr(context, 'scenario_cleanups', None) or []
+    context.scenario_cleanups = []
+    error = None
+    for cleanup in reversed(cleanups):
+        try:
+            cleanup()
+        except Exception as e:
+            if error is None:
+                error = e
+    if error is not None:
+        raise error
+
 
 def build_steps(mixin_class, base_steps):
     result = {}
@@ -1,5 +1,8 @@
-import difflib
-import StringIO
+import multiprocessing
+import os
+import re
+import time
+from multiprocessing.pool import ThreadPool
 
 import pexpect
 from hamcrest import (
@@ -13,35 +16,523 @@ from hamcrest import (
     less_than,
     less_than_or_equal_to
 )
+from pexpect.spawnbase import SpawnBase
 
+from cli_bdd.core import settings
+from cli_bdd.core.background import BackgroundCommand, stop_background_commands
+from cli_bdd.core.baselines import compare_to_baseline, get_baseline_store
+from cli_bdd.core.benchmark import (
+    SIGNIFICANCE_LEVEL,
+    format_duration,
+    format_statistics,
+    get_mann_whitney_p_value,
+    get_percentile,
+    get_statistics
+)
+from cli_bdd.core.diff import format_diff
+from cli_bdd.core.forkserver import get_fork_server_launch
+from cli_bdd.core.inprocess import get_in_process_launch, run_in_process
+from cli_bdd.core.launch import get_direct_launch, launch_stats
+from cli_bdd.core.output import OutputBuffer, OutputView
+from cli_bdd.core.patterns import compile_pattern, get_flags
+from cli_bdd.core.pool import get_shell_pool
+from cli_bdd.core.process import CHUNK_SIZE, PipeProcess
+from cli_bdd.core.session import ShellSession
 from cli_bdd.core.steps.base import StepBase
+from cli_bdd.core.steps.environment import get_command_env
+from cli_bdd.core.steps.file import get_command_cwd, resolve_path
+from cli_bdd.core.throughput import StreamedCommand, generate_input
+from cli_bdd.core.timeline import TimedOutputBuffer, Timeline
+from cli_bdd.core.usage import AccountedSpawn, get_resource_usage
 
+# Units of the sizes in the steps, which are powers of 1024.
+SIZE_UNITS = {
+    'bytes': 1,
+    'KB': 1024,
+    'MB': 1024 ** 2,
+    'GB': 1024 ** 3,
+}
 
-def run(command, fail_on_error=False, interactively=False, timeout=30):
-    child = pexpect.spawn('/bin/sh', ['-c', command], echo=False)
-    child.logfile_read = StringIO.StringIO()
-    child.logfile_send = StringIO.StringIO()
-    if not interactively:
-        child.expect(pexpect.EOF, timeout=timeout)
-        if fail_on_error and child.exitstatus > 0:
-            raise Exception(
-                '%s (exit code %s)' % (
-                    child.logfile_read.getvalue(),
-                    child.exitstatus
-                )
+
+def spawn(command, env=None, cwd=None):
+    """Spawns the command attached to a terminal, with the environment and
+    the working directory of the current process unless `env` and `cwd` are
+    given.
+
+    Returns the child and how it was launched.
+    """
+    pool = get_shell_pool()
+    if pool is not None:
+        child = pool.checkout(command, env, cwd)
+        if child is not None:
+            return child, 'pool'
+
+    direct_launch = (
+        settings.DIRECT_EXEC and get_direct_launch(command, env, cwd)
+    )
+    if direct_launch:
+        executable, argv = direct_launch
+
+        def exec_with_original_name():
+            # ptyprocess replaces argv[0] with the path of the executable,
+            # which the programs would show in their messages
+            if env is None:
+                os.execv(executable, argv)
+            os.execve(executable, argv, env)
+
+        try:
+            child = AccountedSpawn(
+                executable,
+                argv[1:],
+                env=env,
+                cwd=cwd,
+                echo=False,
+                preexec_fn=exec_with_original_name
+            )
+        except (OSError, pexpect.ExceptionPexpect):
+            # e.g. a script without shebang, which only the shell could run
+            pass
+        else:
+            return child, 'exec'
+
+    child = AccountedSpawn(
+        '/bin/sh',
+        ['-c', command],
+        env=env,
+        cwd=cwd,
+        echo=False
+    )
+    return child, 'shell'
+
+
+def spawn_with_pipes(command, env=None, cwd=None):
+    """Spawns the command attached to pipes, with the environment and the
+    working directory of the current process unless `env` and `cwd` are
+    given.
+
+    Returns the process and how it was launched.
+    """
+    direct_launch = (
+        settings.DIRECT_EXEC and get_direct_launch(command, env, cwd)
+    )
+    if direct_launch:
+        executable, argv = direct_launch
+        try:
+            return PipeProcess(command, argv, executable, env, cwd), 'exec'
+        except OSError:
+            pass
+    return PipeProcess(command, env=env, cwd=cwd), 'shell'
+
+
+def run(command,
+        fail_on_error=False,
+        interactively=False,
+        timeout=30,
+        session=None,
+        env=None,
+        cwd=None):
+    """Runs the command and returns the response: the `command`, the `child`
+    with the output and exit status, how it was `launch`ed and its resource
+    `usage`
+    (see `get_command_usage`), or the `timeline` of an interactive command
+    (see `cli_bdd.core.timeline.Timeline`).
+
+    The command gets the environment and the working directory of the
+    current process unless `env` and `cwd` are given (see
+    `cli_bdd.core.steps.environment.get_command_env` and
+    `cli_bdd.core.steps.file.get_command_cwd`)."""
+    if timeout is not None:
+        timeout = float(timeout)
+    started = time.time()
+
+    in_process_launch = not interactively and get_in_process_launch(command)
+    fork_server_launch = get_fork_server_launch(command)
+    if in_process_launch:
+        child = run_in_process(*in_process_launch, env=env, cwd=cwd)
+        launch = 'in-process'
+    elif fork_server_launch:
+        fork_server, argv = fork_server_launch
+        tty = interactively or settings.NON_INTERACTIVE_BACKEND != 'pipe'
+        child = fork_server.spawn(argv, tty=tty, env=env, cwd=cwd)
+        launch = 'fork-server'
+        if not tty:
+            child.wait(timeout=timeout)
+        else:
+            child.logfile_read = create_output_buffer(started, interactively)
+            child.logfile_send = OutputBuffer()
+            if not interactively:
+                ensure_command_finished(child, timeout=timeout)
+    elif (session is not None and
+            not interactively and
+            session.can_run(command)):
+        child = session.run(command, timeout=timeout, env=env, cwd=cwd)
+        launch = 'session'
+    elif not interactively and settings.NON_INTERACTIVE_BACKEND == 'pipe':
+        child, launch = spawn_with_pipes(command, env, cwd)
+        child.wait(timeout=timeout)
+    else:
+        child, launch = spawn(command, env, cwd)
+        child.logfile_read = create_output_buffer(started, interactively)
+        child.logfile_send = OutputBuffer()
+        if not interactively:
+            ensure_command_finished(child, timeout=timeout)
+    launch_stats[launch] += 1
+    child.started_at = started
+
+    if not interactively and fail_on_error and child.exitstatus > 0:
+        raise Exception(
+            '%s (exit code %s)' % (
+                get_output(child),
+                child.exitstatus
             )
-    return {
+        )
+    response = {
+        'command': command,
         'child': child,
+        'launch': launch,
     }
+    if interactively:
+        response['timeline'] = child.logfile_read.timeline
+    else:
+        response['usage'] = get_command_usage(child)
+    return response
+
+
+def create_output_buffer(started, interactively):
+    """Returns the buffer for the output of a spawned command, which records
+    the output on the timeline of an interactive command."""
+    if interactively:
+        return TimedOutputBuffer(Timeline(started))
+    return OutputBuffer()
+
+
+def ensure_command_finished(child, timeout=-1):
+    if not isinstance(child, SpawnBase):
+        # a command which is not attached to a terminal is finished by run()
+        return child.wait()
+    result = child.expect(pexpect.EOF, timeout=timeout)
+    # The terminal is closed a moment before the child can be reaped, so
+    # wait for the exit status. Closing the child from our side should not
+    # sleep for `delayafterclose` then (which happens on garbage collection
+    # of every finished command otherwise).
+    child.wait()
+    if isinstance(child, pexpect.spawn):
+        child.ptyproc.delayafterclose = 0
+    return result
+
+
+def get_command_usage(child):
+    """Returns the resource usage of the command which was run by `run()`:
+    `wall_time`, `user_time` and `system_time` (seconds) and `max_rss`
+    (bytes), see `cli_bdd.core.usage.get_resource_usage`.
+
+    Waits for the command to finish. CPU time and memory include the
+    descendants which the command waited for. They are `None` for a command
+    which was run by the shell session, which doesn't exit.
+    """
+    usage = getattr(child, 'usage', None)
+    if usage is None:
+        ensure_command_finished(child)
+        usage = child.usage = get_resource_usage(
+            time.time() - child.started_at,
+            getattr(child, 'rusage', None)
+        )
+    return usage
+
+
+def get_timeline(child):
+    """Returns the timeline of the command which was run interactively, or
+    `None` for other commands."""
+    return getattr(child.logfile_read, 'timeline', None)
+
+
+def check_response_time(child, since, seconds):
+    """Checks that the command output something in less than `seconds` after
+    the last `since` event (`spawn` or `input`) of its timeline.
+
+    Waits for the output if it did not come yet.
+    """
+    timeline = get_timeline(child)
+    if timeline is None:
+        raise AssertionError('The command was not run interactively')
+    started = [
+        timestamp for name, timestamp, _ in timeline.events if name == since
+    ]
+    if not started:
+        raise AssertionError('Nothing was typed into the command')
+
+    deadline = started[-1] + seconds
+    while timeline.awaiting_output and not child.flag_eof:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            # the read output is written to `logfile_read`
+            data = child.read_nonblocking(CHUNK_SIZE, timeout=remaining)
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            break
+        # keep the output for the next interactive dialogs
+        child.buffer += data
+
+    latency = timeline.get_latency(since)
+    if latency is None:
+        raise AssertionError(
+            'The command did not output anything in %s seconds' % seconds
+        )
+    if latency >= seconds:
+        raise AssertionError(
+            'The command responded in %.3f seconds, which is not less than '
+            '%s seconds' % (latency, seconds)
+        )
+
+
+def get_output(child, output='output'):
+    """Returns the captured `output`, `stdout` or `stderr` of the command.
+
+    stdout and stderr are the same text for a command which was run with a
+    terminal. Otherwise `output` means stdout followed by stderr.
+    """
+    return ''.join(
+        buffer_.getvalue()
+        for buffer_ in get_output_buffers(child, output)
+    )
+
+
+def get_output_buffers(child, output='output'):
+    stderr = getattr(child, 'logfile_stderr', None)
+    if stderr is None or output == 'stdout':
+        return [child.logfile_read]
+    elif output == 'stderr':
+        return [stderr]
+    return [child.logfile_read, stderr]
+
+
+def get_output_view(child, output='output'):
+    """Returns the `OutputView` of the captured `output`, `stdout` or
+    `stderr` of the command.
+
+    Views are cached on the child, so all the assertions of a command share
+    the normalized output and its line index.
+    """
+    buffers = get_output_buffers(child, output)
+    key = tuple(id(buffer_) for buffer_ in buffers)
+    views = getattr(child, 'output_views', None)
+    if views is None:
+        views = child.output_views = {}
+    if key not in views:
+        views[key] = OutputView(buffers)
+    return views[key]
+
+
+def wait_for_output(child, text, timeout, output='output'):
+    """Waits until the captured output contains the text, reading the output
+    of a running command as it arrives.
+
+    Every chunk is searched once, together with the tail of the previous
+    ones where a match could start. Returns `False` if the command finished
+    or `timeout` seconds passed without the text.
+    """
+    buffers = get_output_buffers(child, output)
+    scanned = [0] * len(buffers)
+    deadline = time.time() + timeout
+    while True:
+        for index, buffer_ in enumerate(buffers):
+            start = max(scanned[index] - len(text) + 1, 0)
+            if buffer_.find(text, start) != -1:
+                return True
+            scanned[index] = len(buffer_)
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return False
+        if isinstance(child, BackgroundCommand):
+            if not child.wait_for_output(remaining):
+                return False
+            continue
+        if not isinstance(child, SpawnBase) or child.flag_eof:
+            return False
+        try:
+            # the read output is written to `logfile_read`
+            data = child.read_nonblocking(CHUNK_SIZE, timeout=remaining)
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            continue
+        # keep the output for the next interactive dialogs
+        child.buffer += data
 
 
-def ensure_command_finished(child):
-    return child.expect(pexpect.EOF)
+def check_output(child, output, assertion):
+    """Calls the assertion and tells in its error if the checked output was
+    truncated (see `OUTPUT_MAX_SIZE` setting)."""
+    try:
+        assertion()
+    except AssertionError as e:
+        notes = [
+            buffer_.describe_truncation()
+            for buffer_ in get_output_buffers(child, output)
+            if getattr(buffer_, 'truncated', False)
+        ]
+        if not notes:
+            raise
+        raise AssertionError('\n'.join([str(e)] + notes))
+
+
+def run_in_background(command, env=None, cwd=None):
+    """Spawns the command and returns `BackgroundCommand` right away."""
+    if settings.NON_INTERACTIVE_BACKEND == 'pipe':
+        child, launch = spawn_with_pipes(command, env, cwd)
+    else:
+        child, launch = spawn(command, env, cwd)
+    launch_stats[launch] += 1
+    return BackgroundCommand(child, launch)
+
+
+def run_concurrently(commands, workers=None, env=None, cwd=None):
+    """Runs the commands by `run()` in a pool of `workers` threads.
+
+    `workers` defaults to `settings.CONCURRENT_COMMANDS_WORKERS`, or to the
+    number of CPUs if that is `None`. Returns a list of the results in the
+    order of the commands, each is the response of `run()` with `command` and
+    `duration` (seconds), or with `error` if the command couldn't be run.
+
+    The commands are spawned from the worker threads, the same way the shell
+    pool spawns its shells from its filler thread.
+    """
+    if workers is None:
+        workers = settings.CONCURRENT_COMMANDS_WORKERS
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    def run_one(command):
+        started = time.time()
+        try:
+            result = run(command, env=env, cwd=cwd)
+        except Exception as e:
+            result = {'error': e}
+        result['command'] = command
+        result['duration'] = time.time() - started
+        return result
+
+    pool = ThreadPool(max(min(int(workers), len(commands)), 1))
+    try:
+        return pool.map(run_one, commands)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def run_benchmark(command,
+                  runs,
+                  warmup_runs=0,
+                  session=None,
+                  env=None,
+                  cwd=None):
+    """Runs the command `warmup_runs` times and then `runs` times by `run()`.
+
+    Returns the wall times of the measured runs (seconds) and the response
+    of the last one.
+    """
+    samples = []
+    response = None
+    for index in xrange(warmup_runs + runs):
+        response = run(command, session=session, env=env, cwd=cwd)
+        if index >= warmup_runs:
+            samples.append(response['usage']['wall_time'])
+    return samples, response
+
+
+def run_comparison(old_command,
+                   new_command,
+                   runs,
+                   session=None,
+                   env=None,
+                   cwd=None):
+    """Runs both commands `runs` times by `run()`, interleaved, so a drift of
+    the machine load affects them alike. The order of the commands alternates
+    (old, new, new, old, ...), so neither of them always runs first.
+
+    Returns the wall times of the old and the new command (seconds) and the
+    response of the last run of the new one.
+    """
+    old_samples = []
+    new_samples = []
+    response = None
+    for index in xrange(runs):
+        pair = [(old_command, old_samples), (new_command, new_samples)]
+        if index % 2:
+            pair.reverse()
+        for command, samples in pair:
+            command_response = run(
+                command,
+                session=session,
+                env=env,
+                cwd=cwd
+            )
+            samples.append(command_response['usage']['wall_time'])
+            if samples is new_samples:
+                response = command_response
+    return old_samples, new_samples, response
+
+
+def get_background_commands(context):
+    """Returns the background commands of the scenario by their names."""
+    commands = getattr(context, 'background_commands', None)
+    if commands is None:
+        commands = context.background_commands = {}
+    return commands
+
+
+def _stop_background_command(commands, name, command):
+    stop_background_commands([command])
+    # the commands of the scenario context could outlive the scenario
+    if commands.get(name) is command:
+        del commands[name]
+
+
+def get_command_child(context, name=None):
+    """Returns the child of the background command by its name, or of the
+    last run command if the name is `None`."""
+    if name is None:
+        return context.command_response['child']
+    commands = get_background_commands(context)
+    if name not in commands:
+        raise AssertionError('There is no background command "%s"' % name)
+    return commands[name]
+
+
+def get_shell_session(context):
+    return getattr(context, 'shell_session', None)
+
+
+class StartShellSession(StepBase):
+    """Runs the next commands of the scenario in one long-lived shell.
+
+    Saves spawning of a terminal and a shell for every `I run` and
+    `I successfully run` command. Each command is still run in a subshell, so
+    `exit` or `cd` of one command doesn't affect the next ones. Interactive
+    commands are always spawned separately.
+
+    Examples:
+
+    ```gherkin
+    Given a shell session
+    ```
+    """
+    type_ = 'given'
+    sentence = 'a shell session'
+
+    def step(self):
+        context = self.get_scenario_context()
+        session = get_shell_session(context)
+        if session is not None:
+            session.close()
+        context.shell_session = ShellSession()
 
 
 class RunCommand(StepBase):
     """Runs a command.
 
+    Runs it in the shell session if the scenario has started one.
+
     Examples:
 
     ```gherkin
@@ -55,8 +546,14 @@ class RunCommand(StepBase):
     )
 
     def step(self, command, timeout):
-        self.get_scenario_context().command_response = run(command,
-                                                           timeout=timeout)
+        context = self.get_scenario_context()
+        context.command_response = run(
+            command,
+            timeout=timeout,
+            session=get_shell_session(context),
+            env=get_command_env(context),
+            cwd=get_command_cwd(context)
+        )
 
 
 class SuccessfullyRunCommand(StepBase):
@@ -73,9 +570,13 @@ class SuccessfullyRunCommand(StepBase):
     sentence = 'I successfully run `(?P<command>.*)`'  # todo: with timeout
 
     def step(self, command):
-        self.get_scenario_context().command_response = run(
+        context = self.get_scenario_context()
+        context.command_response = run(
             command,
-            fail_on_error=True
+            fail_on_error=True,
+            session=get_shell_session(context),
+            env=get_command_env(context),
+            cwd=get_command_cwd(context)
         )
 
 
@@ -92,9 +593,12 @@ class RunCommandInteractively(StepBase):
     sentence = 'I run `(?P<command>[^`]*)` interactively'
 
     def step(self, command):
-        self.get_scenario_context().command_response = run(
+        context = self.get_scenario_context()
+        context.command_response = run(
             command,
-            interactively=True
+            interactively=True,
+            env=get_command_env(context),
+            cwd=get_command_cwd(context)
         )
 
 
@@ -114,6 +618,9 @@ class TypeIntoCommand(StepBase):
         child = self.get_scenario_context().command_response['child']
         child.logfile_read.truncate(0)  # todo: test me
         child.sendline(input_)
+        timeline = get_timeline(child)
+        if timeline is not None:
+            timeline.record('input', input_)
 
 
 class GotInteractiveDialogCommand(StepBase):
@@ -141,9 +648,10 @@ class GotInteractiveDialogCommand(StepBase):
             timeout = 1
 
         timeout = float(timeout)
+        child = self.get_scenario_context().command_response['child']
         try:
-            self.get_scenario_context().command_response['child'].expect(
-                dialog_matcher,
+            child.expect(
+                compile_pattern(dialog_matcher, re.DOTALL),
                 timeout=timeout
             )
         except pexpect.exceptions.TIMEOUT:
@@ -151,11 +659,271 @@ class GotInteractiveDialogCommand(StepBase):
                 'Have been waiting for interactive dialog '
                 'for more than %s seconds' % timeout
             )
+        timeline = get_timeline(child)
+        if timeline is not None:
+            timeline.record('dialog', dialog_matcher)
+
+
+class RunCommandInBackground(StepBase):
+    """Runs the command in the background and goes on with the scenario.
+
+    The output of all the background commands is read concurrently, and
+    could be checked by the `the command "name" ...` steps. Commands which
+    are still running are killed when the scenario finishes, so they don't
+    keep their ports and files in the next scenarios.
+
+    Examples:
+
+    ```gherkin
+    When I run `python -m SimpleHTTPServer 8000` in the background as "server"
+    When I run `curl localhost:8000` in the background as "client"
+    ```
+    """
+    type_ = 'when'
+    sentence = (
+        'I run `(?P<command>[^`]*)` in the background as "(?P<name>[^"]*)"'
+    )
+
+    def step(self, command, name):
+        context = self.get_scenario_context()
+        commands = get_background_commands(context)
+        background = run_in_background(
+            command,
+            get_command_env(context),
+            get_command_cwd(context)
+        )
+        commands[name] = background
+        self.add_scenario_cleanup(
+            lambda: _stop_background_command(commands, name, background)
+        )
+
+
+class WaitForBackgroundCommands(StepBase):
+    """Waits for all the background commands to finish.
+
+    By default waits for 30 seconds. Timeout could be changed by providing
+    `in N seconds` information.
+
+    Examples:
+
+    ```gherkin
+    When I wait for all background commands
+    When I wait for all background commands in 5 seconds
+    ```
+    """
+    type_ = 'when'
+    sentence = (
+        'I wait for all background commands'
+        '( in (?P<timeout>(\d*[.])?\d+) seconds?)?'
+    )
+
+    def step(self, timeout=None):
+        timeout = float(timeout) if timeout else 30
+        deadline = time.time() + timeout
+        commands = get_background_commands(self.get_scenario_context())
+        running = []
+        for name, command in sorted(commands.items()):
+            try:
+                command.wait(max(deadline - time.time(), 0))
+            except pexpect.TIMEOUT:
+                running.append('"%s"' % name)
+        if running:
+            raise AssertionError(
+                'Background commands did not finish in %s seconds: %s' % (
+                    timeout,
+                    ', '.join(running)
+                )
+            )
+
+
+class RunCommandsConcurrently(StepBase):
+    """Runs the commands of the table at the same time.
+
+    The commands are run by a pool of worker threads, as many as the number
+    of CPUs by default (see `CONCURRENT_COMMANDS_WORKERS` setting). The
+    output, exit status and duration of every command are kept for the
+    `all commands should exit with` step.
+
+    Examples:
+
+    ```gherkin
+    When I run the following commands concurrently:
+        | command             |
+        | mytool build first  |
+        | mytool build second |
+
+    When I run the following commands concurrently with 2 workers:
+        | command             |
+        | mytool build first  |
+        | mytool build second |
+    ```
+    """
+    type_ = 'when'
+    sentence = (
+        'I run the following commands concurrently'
+        '( with (?P<workers>\d+) workers?)?'
+    )
+
+    def step(self, workers=None):
+        context = self.get_scenario_context()
+        commands = [row['command'] for row in self.get_table()]
+        results = run_concurrently(
+            commands,
+            workers=int(workers) if workers else None,
+            env=get_command_env(context),
+            cwd=get_command_cwd(context)
+        )
+        context.concurrent_commands = results
+        errors = [result for result in results if 'error' in result]
+        if errors:
+            raise AssertionError(
+                'Could not run %s of %s commands:\n%s' % (
+                    len(errors),
+                    len(results),
+                    '\n'.join(
+                        '`%s`: %s' % (result['command'], result['error'])
+                        for result in errors
+                    )
+                )
+            )
+
+
+class BenchmarkCommand(StepBase):
+    """Runs the command many times and keeps the statistics of its run time
+    for the `run time should be less than` steps.
+
+    Warmup runs (e.g. to fill the caches) are not measured. The last run is
+    checked by the other steps, like the one of `I run`, and the run times
+    are compared by the `slower than baseline` step.
+
+    Examples:
+
+    ```gherkin
+    When I benchmark `mytool --version` 50 times
+    When I benchmark `mytool --version` 50 times with 5 warmup runs
+    ```
+    """
+    type_ = 'when'
+    sentence = (
+        'I benchmark `(?P<command>[^`]*)` (?P<runs>\d+) times?'
+        '( with (?P<warmup_runs>\d+) warmup runs?)?'
+    )
+
+    def step(self, command, runs, warmup_runs=None):
+        if int(runs) < 1:
+            raise AssertionError(
+                'The command should be benchmarked at least once, got %s '
+                'runs' % runs
+            )
+        context = self.get_scenario_context()
+        samples, response = run_benchmark(
+            command,
+            int(runs),
+            warmup_runs=int(warmup_runs or 0),
+            session=get_shell_session(context),
+            env=get_command_env(context),
+            cwd=get_command_cwd(context)
+        )
+        response['samples'] = samples
+        context.command_response = response
+        context.benchmark = {
+            'command': command,
+            'samples': samples,
+            'statistics': get_statistics(samples),
+        }
+
+
+class CompareCommands(StepBase):
+    """Runs two commands (e.g. the old and the new build of a tool) in turns
+    and keeps their run times for the `the new command should be` step.
+
+    The last run of the new command is checked by the other steps, like the
+    one of `I run`.
+
+    Examples:
+
+    ```gherkin
+    When I compare `old/mytool` against `new/mytool` over 30 interleaved runs
+    ```
+    """
+    type_ = 'when'
+    sentence = (
+        'I compare `(?P<old_command>[^`]*)` against '
+        '`(?P<new_command>[^`]*)` over (?P<runs>\d+) interleaved runs?'
+    )
+
+    def step(self, old_command, new_command, runs):
+        if int(runs) < 1:
+            raise AssertionError(
+                'The commands should be compared over at least one run, got '
+                '%s runs' % runs
+            )
+        context = self.get_scenario_context()
+        old_samples, new_samples, context.command_response = run_comparison(
+            old_command,
+            new_command,
+            int(runs),
+            session=get_shell_session(context),
+            env=get_command_env(context),
+            cwd=get_command_cwd(context)
+        )
+        context.comparison = {
+            'old_command': old_command,
+            'new_command': new_command,
+            'old_samples': old_samples,
+            'new_samples': new_samples,
+        }
+
+
+class StreamThroughCommand(StepBase):
+    """Streams the input of the given size into stdin of the command and
+    measures its throughput for the `throughput should be at least` step.
+
+    The input is the content of the file (repeated as needed) or synthetic
+    lines of text. It is written in chunks through a pipe, and stdout is
+    counted and discarded, so the size is not limited by memory. stderr and
+    the exit status are kept as for `I run`.
+
+    Examples:
+
+    ```gherkin
+    When I stream 500 MB through `mytool convert`
+    When I stream 1 GB of "fixtures/sample.csv" through `mytool convert`
+    ```
+    """
+    type_ = 'when'
+    sentence = (
+        'I stream (?P<size>(\d*[.])?\d+) (?P<unit>(bytes|KB|MB|GB))'
+        '( of "(?P<path>[^"]*)")? through `(?P<command>[^`]*)`'
+    )
+
+    def step(self, size, unit, command, path=None):
+        context = self.get_scenario_context()
+        if path is not None:
+            path = resolve_path(context, path)
+        child = StreamedCommand(
+            command,
+            get_command_env(context),
+            get_command_cwd(context)
+        ).stream(
+            generate_input(int(float(size) * SIZE_UNITS[unit]), path)
+        )
+        child.usage = get_resource_usage(child.elapsed, child.rusage)
+        context.command_response = {
+            'command': command,
+            'child': child,
+            'launch': 'stream',
+            'usage': child.usage,
+        }
 
 
 class OutputShouldContainText(StepBase):
     '''Checks the command output (stdout, stderr).
 
+    stdout and stderr are checked separately only for commands which were run
+    with the `pipe` backend (see `NON_INTERACTIVE_BACKEND` setting). Otherwise
+    they are merged by the terminal.
+
     Examples:
 
     ```gherkin
@@ -181,105 +949,302 @@ class OutputShouldContainText(StepBase):
         'should( (?P<should_not>not))? contain( (?P<exactly>exactly))?'
     )
 
-    def step(self, output, should_not=False, exactly=False):
-        child = self.get_scenario_context().command_response['child']
+    def step(self, output, should_not=False, exactly=False, name=None):
+        child = get_command_child(self.get_scenario_context(), name)
         ensure_command_finished(child)
-        output = 'stdout' if output == 'output' else output
-
-        # todo: separate stdout and stderr
-        # todo: test replace
-        data = child.logfile_read.getvalue().replace('\r\n', '\n')
-        data_lines = data.splitlines()
-        if data.endswith('\n'):
-            data_lines.append('')
 
+        view = get_output_view(child, output)
         expected = self.get_text().encode('utf-8')  # todo: test encode
-        expected_lines = expected.splitlines()
-        if expected.endswith('\n'):
-            expected_lines.append('')
 
         bool_matcher = is_not if should_not else is_
         comparison_matcher = equal_to if exactly else contains_string
-        try:
-            assert_that(
-                data,
-                bool_matcher(
-                    comparison_matcher(expected)
-                )
-            )
-        except AssertionError:
-            if comparison_matcher == equal_to and bool_matcher == is_:
-                diff = '\n'.join(
-                    difflib.context_diff(
-                        data_lines,
-                        expected_lines
+        if not exactly and view.contains(expected) != bool(should_not):
+            # the check passed, so there is no need in the whole text
+            return
+
+        def assertion():
+            data = view.text
+            try:
+                assert_that(
+                    data,
+                    bool_matcher(
+                        comparison_matcher(expected)
                     )
                 )
-                raise AssertionError('Comparison error. Diff:\n' + diff)
-            else:
-                raise
+            except AssertionError:
+                if comparison_matcher == equal_to and bool_matcher == is_:
+                    data_lines = data.splitlines()
+                    if data.endswith('\n'):
+                        data_lines.append('')
+                    expected_lines = expected.splitlines()
+                    if expected.endswith('\n'):
+                        expected_lines.append('')
+                    raise AssertionError(
+                        'Comparison error. ' +
+                        format_diff(data_lines, expected_lines)
+                    )
+                else:
+                    raise
 
+        check_output(child, output, assertion)
 
-class OutputShouldContainLines(StepBase):
-    '''Checks the command output number of lines.
+
+class OutputShouldContainTextWithin(StepBase):
+    """Waits for the text in the command output (stdout, stderr).
+
+    Checks the output as it arrives and passes as soon as the text appears,
+    without waiting for the command to finish. Useful for long-running
+    commands which are run interactively, e.g. servers.
 
     Examples:
 
     ```gherkin
-    Then the output should contain 3 lines
-    Then the output should not contain 3 lines
-    Then the output should contain up to 3 lines
-    Then the output should contain less than 3 lines
-    Then the output should contain at least 1 line
-    Then the output should contain more than 1 line
+    When I run `python -m SimpleHTTPServer 8000` interactively
+    Then the output should contain "Serving HTTP" within 5 seconds
+    Then the stderr should contain "GET /" within 0.5 seconds
     ```
-    '''
+    """
     type_ = 'then'
     sentence = (
-        'the (?P<output>(output|stderr|stdout)) '
-        'should( (?P<should_not>not))? '
-        'contain( '
-        '(?P<comparison>(up to|at least|more than|less than)))? '
-        '(?P<count>\d+) lines?'
+        'the (?P<output>(output|stderr|stdout)) should contain '
+        '"(?P<text>[^"]*)" within (?P<timeout>(\d*[.])?\d+) seconds?'
     )
 
-    def step(self, output, should_not=False, comparison=None, count=None):
-        child = self.get_scenario_context().command_response['child']
-        ensure_command_finished(child)
-        output = 'stdout' if output == 'output' else output
-        comparison = (comparison or '').strip()
-        count = int(count)
+    def step(self, output, text, timeout, name=None):
+        child = get_command_child(self.get_scenario_context(), name)
+        timeout = float(timeout)
+        text = text.encode('utf-8')
+        found = wait_for_output(child, text, timeout, output=output)
 
-        # todo: separate stdout and stderr
-        # todo: test stderr
-        data = child.logfile_read.getvalue().strip()
-        number_of_lines = len(data.splitlines())
+        def assertion():
+            if not found:
+                raise AssertionError(
+                    'The %s does not contain "%s" within %s seconds' % (
+                        output,
+                        text,
+                        timeout
+                    )
+                )
 
-        bool_matcher = is_not if should_not else is_
-        comparison_matcher = {
-            '': equal_to,
-            'at least': greater_than_or_equal_to,
-            'up to': less_than_or_equal_to,
-            'less than': less_than,
-            'more than': greater_than,
-        }[comparison]
+        check_output(child, output, assertion)
 
-        assert_that(
-            number_of_lines,
-            bool_matcher(
-                comparison_matcher(count)
-            )
-        )
 
+class OutputShouldContainTexts(StepBase):
+    """Checks the command output (stdout, stderr) for many texts at once.
 
-class ExitStatusShouldBe(StepBase):
-    """Checks the command status code.
+    The output is normalized at most once for all the texts, and all the
+    missing (or found, for `none of`) texts are reported together.
 
     Examples:
 
     ```gherkin
-    Then the exit status should be 1
-    Then the exit status should not be 1
+    Then the output should contain all of:
+        | text           |
+        | Downloading    |
+        | Installing     |
+        | Done           |
+
+    Then the stderr should contain none of:
+        | text           |
+        | Traceback      |
+        | Warning        |
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the (?P<output>(output|stderr|stdout)) should contain '
+        '(?P<quantifier>(all|none)) of'
+    )
+
+    def step(self, output, quantifier, name=None):
+        child = get_command_child(self.get_scenario_context(), name)
+        ensure_command_finished(child)
+
+        texts = [row['text'].encode('utf-8') for row in self.get_table()]
+        found = get_output_view(child, output).find_texts(texts)
+        if quantifier == 'all':
+            unexpected = [text for text in texts if text not in found]
+            problem = 'does not contain'
+        else:
+            unexpected = [text for text in texts if text in found]
+            problem = 'contains'
+
+        def assertion():
+            if unexpected:
+                raise AssertionError(
+                    'The %s %s:\n%s' % (
+                        output,
+                        problem,
+                        '\n'.join(unexpected)
+                    )
+                )
+
+        check_output(child, output, assertion)
+
+
+class OutputShouldMatch(StepBase):
+    """Checks the command output (stdout, stderr) by a regular expression.
+
+    The expression is searched anywhere in the output, with `\r\n` of the
+    terminal normalized to `\n`. Flags `i` (ignore case), `m` (multiline)
+    and `s` (dot matches line breaks) could follow the expression.
+
+    Examples:
+
+    ```gherkin
+    Then the output should match /\d+ files? copied/
+    Then the output should match /^done$/m
+    Then the stderr should not match /error/i
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the (?P<output>(output|stderr|stdout)) should( (?P<should_not>not))? '
+        'match /(?P<pattern>.*)/(?P<flags>[ims]*)'
+    )
+
+    def step(self, output, pattern, should_not=False, flags=None,
+             name=None):
+        child = get_command_child(self.get_scenario_context(), name)
+        ensure_command_finished(child)
+
+        compiled = compile_pattern(pattern.encode('utf-8'), get_flags(flags))
+        matched = compiled.search(get_output_view(child, output).text)
+
+        def assertion():
+            if should_not and matched:
+                raise AssertionError(
+                    'The %s matches /%s/: "%s"' % (
+                        output,
+                        pattern,
+                        matched.group()
+                    )
+                )
+            elif not should_not and not matched:
+                raise AssertionError(
+                    'The %s does not match /%s/' % (output, pattern)
+                )
+
+        check_output(child, output, assertion)
+
+
+class EveryOutputLineShouldMatch(StepBase):
+    """Checks every line of the command output (stdout, stderr) by a regular
+    expression.
+
+    The expression must match the whole line, without the line break. Flags
+    `i` (ignore case) and `s` (dot matches line breaks) could follow the
+    expression. Up to 10 mismatched lines are reported.
+
+    Examples:
+
+    ```gherkin
+    Then every line of the output should match /\w+=\d+/
+    Then every line of the stderr should match /WARNING: .*/i
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'every line of the (?P<output>(output|stderr|stdout)) should '
+        'match /(?P<pattern>.*)/(?P<flags>[is]*)'
+    )
+    max_reported_lines = 10
+
+    def step(self, output, pattern, flags=None, name=None):
+        child = get_command_child(self.get_scenario_context(), name)
+        ensure_command_finished(child)
+
+        compiled = compile_pattern(
+            '(?:%s)\\Z' % pattern.encode('utf-8'),
+            get_flags(flags) | re.MULTILINE
+        )
+        view = get_output_view(child, output)
+        mismatched = []
+        count = 0
+        for number, line in view.iter_mismatched_lines(compiled):
+            if count < self.max_reported_lines:
+                mismatched.append('%s: %s' % (number, line))
+            count += 1
+
+        def assertion():
+            if count:
+                raise AssertionError(
+                    '%s lines of the %s do not match /%s/:\n%s' % (
+                        count,
+                        output,
+                        pattern,
+                        '\n'.join(mismatched)
+                    )
+                )
+
+        check_output(child, output, assertion)
+
+
+class OutputShouldContainLines(StepBase):
+    '''Checks the command output number of lines.
+
+    Examples:
+
+    ```gherkin
+    Then the output should contain 3 lines
+    Then the output should not contain 3 lines
+    Then the output should contain up to 3 lines
+    Then the output should contain less than 3 lines
+    Then the output should contain at least 1 line
+    Then the output should contain more than 1 line
+    ```
+    '''
+    type_ = 'then'
+    sentence = (
+        'the (?P<output>(output|stderr|stdout)) '
+        'should( (?P<should_not>not))? '
+        'contain( '
+        '(?P<comparison>(up to|at least|more than|less than)))? '
+        '(?P<count>\d+) lines?'
+    )
+
+    def step(self,
+             output,
+             should_not=False,
+             comparison=None,
+             count=None,
+             name=None):
+        child = get_command_child(self.get_scenario_context(), name)
+        ensure_command_finished(child)
+        comparison = (comparison or '').strip()
+        count = int(count)
+
+        number_of_lines = get_output_view(child, output).count_lines()
+
+        bool_matcher = is_not if should_not else is_
+        comparison_matcher = {
+            '': equal_to,
+            'at least': greater_than_or_equal_to,
+            'up to': less_than_or_equal_to,
+            'less than': less_than,
+            'more than': greater_than,
+        }[comparison]
+
+        check_output(
+            child,
+            output,
+            lambda: assert_that(
+                number_of_lines,
+                bool_matcher(
+                    comparison_matcher(count)
+                )
+            )
+        )
+
+
+class ExitStatusShouldBe(StepBase):
+    """Checks the command status code.
+
+    Examples:
+
+    ```gherkin
+    Then the exit status should be 1
+    Then the exit status should not be 1
     ```
     """
     type_ = 'then'
@@ -288,10 +1253,10 @@ class ExitStatusShouldBe(StepBase):
         'be (?P<exit_status>\d+)'
     )
 
-    def step(self, should_not=False, exit_status=None):
+    def step(self, should_not=False, exit_status=None, name=None):
         exit_status = int(exit_status)
         bool_matcher = is_not if should_not else is_
-        child = self.get_scenario_context().command_response['child']
+        child = get_command_child(self.get_scenario_context(), name)
 
         ensure_command_finished(child)
 
@@ -303,7 +1268,524 @@ class ExitStatusShouldBe(StepBase):
         )
 
 
+class AllCommandsShouldExitWith(StepBase):
+    """Checks the status codes of the commands which were run concurrently.
+
+    All the commands with another status code are reported together with
+    their output.
+
+    Examples:
+
+    ```gherkin
+    Then all commands should exit with 0
+    ```
+    """
+    type_ = 'then'
+    sentence = 'all commands should exit with (?P<exit_status>\d+)'
+
+    def step(self, exit_status):
+        exit_status = int(exit_status)
+        results = getattr(
+            self.get_scenario_context(),
+            'concurrent_commands',
+            None
+        )
+        if results is None:
+            raise AssertionError('No commands were run concurrently')
+
+        failed = [
+            result for result in results
+            if result['child'].exitstatus != exit_status
+        ]
+        if failed:
+            raise AssertionError(
+                '%s of %s commands did not exit with %s:\n%s' % (
+                    len(failed),
+                    len(results),
+                    exit_status,
+                    '\n'.join(
+                        '`%s` exited with %s in %.2f seconds:\n%s' % (
+                            result['command'],
+                            result['child'].exitstatus,
+                            result['duration'],
+                            get_output(result['child']).rstrip()
+                        )
+                        for result in failed
+                    )
+                )
+            )
+
+
+class CommandShouldFinishIn(StepBase):
+    """Checks the wall time of the command, from its start until it exited.
+
+    Examples:
+
+    ```gherkin
+    Then the command should finish in less than 2 seconds
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the command should finish in less than '
+        '(?P<seconds>(\d*[.])?\d+) seconds?'
+    )
+
+    def step(self, seconds):
+        seconds = float(seconds)
+        child = get_command_child(self.get_scenario_context())
+        wall_time = get_command_usage(child)['wall_time']
+        if wall_time >= seconds:
+            raise AssertionError(
+                'The command took %.3f seconds, which is not less than '
+                '%s seconds' % (wall_time, seconds)
+            )
+
+
+class CommandShouldUseCPUTime(StepBase):
+    """Checks the CPU time (user and system) of the command, including the
+    descendants which it waited for.
+
+    Examples:
+
+    ```gherkin
+    Then the command should use less than 0.5 seconds of CPU time
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the command should use less than '
+        '(?P<seconds>(\d*[.])?\d+) seconds? of CPU time'
+    )
+
+    def step(self, seconds):
+        seconds = float(seconds)
+        context = self.get_scenario_context()
+        usage = get_command_usage(get_command_child(context))
+        if usage['user_time'] is None:
+            raise AssertionError(
+                'CPU time of the command is not known (launched by %s)' % (
+                    context.command_response['launch']
+                )
+            )
+        cpu_time = usage['user_time'] + usage['system_time']
+        if cpu_time >= seconds:
+            raise AssertionError(
+                'The command used %.3f seconds of CPU time '
+                '(%.3f user, %.3f system), which is not less than '
+                '%s seconds' % (
+                    cpu_time,
+                    usage['user_time'],
+                    usage['system_time'],
+                    seconds
+                )
+            )
+
+
+class CommandShouldUseMemory(StepBase):
+    """Checks the peak memory (maximum resident set size) of the command, or
+    of the largest of the descendants which it waited for.
+
+    Units are powers of 1024, e.g. `MB` is 1048576 bytes.
+
+    Examples:
+
+    ```gherkin
+    Then the command should use less than 200 MB of memory
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the command should use less than '
+        '(?P<size>(\d*[.])?\d+) (?P<unit>(bytes|KB|MB|GB)) of memory'
+    )
+
+    def step(self, size, unit):
+        limit = float(size) * SIZE_UNITS[unit]
+        context = self.get_scenario_context()
+        max_rss = get_command_usage(get_command_child(context))['max_rss']
+        if max_rss is None:
+            raise AssertionError(
+                'Memory usage of the command is not known '
+                '(launched by %s)' % context.command_response['launch']
+            )
+        if max_rss >= limit:
+            raise AssertionError(
+                'The command used %.1f %s of memory, which is not less than '
+                '%s %s' % (max_rss / float(SIZE_UNITS[unit]), unit, size, unit)
+            )
+
+
+class CommandShouldStartRespondingIn(StepBase):
+    """Checks the startup latency of the command which was run
+    interactively: the time from its start until its first output.
+
+    Waits for the output if it did not come yet.
+
+    Examples:
+
+    ```gherkin
+    Then the command should start responding in less than 0.5 seconds
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the command should start responding in less than '
+        '(?P<seconds>(\d*[.])?\d+) seconds?'
+    )
+
+    def step(self, seconds):
+        child = get_command_child(self.get_scenario_context())
+        check_response_time(child, 'spawn', float(seconds))
+
+
+class CommandShouldRespondToInputIn(StepBase):
+    """Checks the response time of the command which was run interactively:
+    the time from the last `I type` until the following output.
+
+    Waits for the output if it did not come yet.
+
+    Examples:
+
+    ```gherkin
+    When I type "help"
+    Then the command should respond to the input in less than 0.1 seconds
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the command should respond to the input in less than '
+        '(?P<seconds>(\d*[.])?\d+) seconds?'
+    )
+
+    def step(self, seconds):
+        child = get_command_child(self.get_scenario_context())
+        check_response_time(child, 'input', float(seconds))
+
+
+class RunTimeShouldBeLessThan(StepBase):
+    """Checks a statistic of the run times of the benchmarked command:
+    `min`, `median`, `mean`, `p95`, `p99` or `max`.
+
+    Examples:
+
+    ```gherkin
+    Then the median run time should be less than 120 ms
+    Then the p95 run time should be less than 0.2 seconds
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the (?P<statistic>(min|median|mean|p95|p99|max)) run time should '
+        'be less than (?P<duration>(\d*[.])?\d+) (?P<unit>(ms|seconds?))'
+    )
+
+    def step(self, statistic, duration, unit):
+        limit = float(duration)
+        if unit == 'ms':
+            limit /= 1000
+        benchmark = getattr(self.get_scenario_context(), 'benchmark', None)
+        if benchmark is None:
+            raise AssertionError('No command was benchmarked')
+        statistics = benchmark['statistics']
+        if statistics[statistic] >= limit:
+            raise AssertionError(
+                'The %s run time of `%s` is %s, which is not less than '
+                '%s %s (%s)' % (
+                    statistic,
+                    benchmark['command'],
+                    format_duration(statistics[statistic]),
+                    duration,
+                    unit,
+                    format_statistics(statistics)
+                )
+            )
+
+
+class CommandShouldNotBeSlowerThanBaseline(StepBase):
+    """Compares the run time of the command with its baseline, which is
+    stored by the feature, scenario and command in the
+    `settings.BASELINES_PATH` file.
+
+    The command is run `settings.BASELINE_SAMPLES` times (including the run
+    of the previous step), unless it was benchmarked. Their median may be
+    slower by the given percentage, plus a noise margin which is estimated
+    from the spread of the runs (see
+    `cli_bdd.core.baselines.compare_to_baseline`).
+
+    If `settings.UPDATE_BASELINES` is set, the runs are stored as the new
+    baseline instead.
+
+    Examples:
+
+    ```gherkin
+    When I run `mytool build`
+    Then the command should not be more than 10% slower than baseline
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the command should not be more than (?P<percent>(\d*[.])?\d+)% '
+        'slower than( the)? baseline'
+    )
+
+    def step(self, percent):
+        context = self.get_scenario_context()
+        response = context.command_response
+        if 'usage' not in response:
+            raise AssertionError('The command was run interactively')
+        command = response['command']
+        samples = response.get('samples')
+        if samples is None:
+            samples, _ = run_benchmark(
+                command,
+                max(settings.BASELINE_SAMPLES - 1, 0),
+                session=get_shell_session(context),
+                env=get_command_env(context),
+                cwd=get_command_cwd(context)
+            )
+            samples.insert(0, response['usage']['wall_time'])
+
+        store = get_baseline_store()
+        feature, scenario = self.get_scenario_name()
+        if settings.UPDATE_BASELINES:
+            store.set(feature, scenario, command, samples)
+            return
+        baseline = store.get(feature, scenario, command)
+        if baseline is None:
+            raise AssertionError(
+                'There is no baseline of `%s` in %s '
+                '(set UPDATE_BASELINES to record it)' % (command, store.path)
+            )
+        error = compare_to_baseline(samples, baseline, float(percent))
+        if error is not None:
+            raise AssertionError('The command `%s` is %s' % (command, error))
+
+
+class NewCommandShouldBeFast(StepBase):
+    """Checks the run times of the compared commands by the one-sided
+    Mann-Whitney U test at the 5% significance level.
+
+    `at least as fast` fails if the new command is significantly slower,
+    `faster` fails unless it is significantly faster.
+
+    Examples:
+
+    ```gherkin
+    Then the new command should be at least as fast
+    Then the new command should be faster
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the new command should be (?P<comparison>(at least as fast|faster))'
+    )
+
+    def step(self, comparison):
+        results = getattr(self.get_scenario_context(), 'comparison', None)
+        if results is None:
+            raise AssertionError('No commands were compared')
+        old_samples = results['old_samples']
+        new_samples = results['new_samples']
+        if comparison == 'faster':
+            p_value = get_mann_whitney_p_value(old_samples, new_samples)
+            failed = p_value >= SIGNIFICANCE_LEVEL
+            problem = 'is not significantly faster than'
+        else:
+            p_value = get_mann_whitney_p_value(new_samples, old_samples)
+            failed = p_value < SIGNIFICANCE_LEVEL
+            problem = 'is slower than'
+        if failed:
+            raise AssertionError(
+                'The new command `%s` %s the old one `%s`: median %s '
+                'against %s over %s runs each (p = %.4f by the Mann-Whitney '
+                'U test)' % (
+                    results['new_command'],
+                    problem,
+                    results['old_command'],
+                    format_duration(get_percentile(sorted(new_samples), 50)),
+                    format_duration(get_percentile(sorted(old_samples), 50)),
+                    len(new_samples),
+                    p_value
+                )
+            )
+
+
+class ThroughputShouldBeAtLeast(StepBase):
+    """Checks the throughput of the command which the input was streamed
+    through: the size of the input per second of its run time.
+
+    Units are powers of 1024, e.g. `MB/s` is 1048576 bytes per second.
+
+    Examples:
+
+    ```gherkin
+    Then the throughput should be at least 200 MB/s
+    ```
+    """
+    type_ = 'then'
+    sentence = (
+        'the throughput should be at least (?P<rate>(\d*[.])?\d+) '
+        '(?P<unit>(bytes|KB|MB|GB))/s'
+    )
+
+    def step(self, rate, unit):
+        child = get_command_child(self.get_scenario_context())
+        if not isinstance(child, StreamedCommand):
+            raise AssertionError('No input was streamed through the command')
+        if child.throughput < float(rate) * SIZE_UNITS[unit]:
+            raise AssertionError(
+                'The throughput is %.1f %s/s, which is less than %s %s/s '
+                '(%s bytes in, %s bytes out in %.3f seconds)' % (
+                    child.throughput / SIZE_UNITS[unit],
+                    unit,
+                    rate,
+                    unit,
+                    child.input_size,
+                    child.output_size,
+                    child.elapsed
+                )
+            )
+
+
+class CommandOutputShouldContainText(OutputShouldContainText):
+    '''Checks the output (stdout, stderr) of the background command.
+
+    Waits for the command to finish.
+
+    Examples:
+
+    ```gherkin
+    Then the command "client" output should contain:
+        """
+        hello
+        """
+    ```
+    '''
+    sentence = (
+        'the command "(?P<name>[^"]*)" (?P<output>(output|stderr|stdout)) '
+        'should( (?P<should_not>not))? contain( (?P<exactly>exactly))?'
+    )
+
+
+class CommandOutputShouldContainTextWithin(OutputShouldContainTextWithin):
+    """Waits for the text in the output (stdout, stderr) of the background
+    command.
+
+    Examples:
+
+    ```gherkin
+    Then the command "server" output should contain "Serving" within 5 seconds
+    ```
+    """
+    sentence = (
+        'the command "(?P<name>[^"]*)" (?P<output>(output|stderr|stdout)) '
+        'should contain "(?P<text>[^"]*)" '
+        'within (?P<timeout>(\d*[.])?\d+) seconds?'
+    )
+
+
+class CommandOutputShouldContainTexts(OutputShouldContainTexts):
+    """Checks the output (stdout, stderr) of the background command for many
+    texts at once.
+
+    Waits for the command to finish.
+
+    Examples:
+
+    ```gherkin
+    Then the command "client" output should contain all of:
+        | text    |
+        | 200     |
+        | OK      |
+    ```
+    """
+    sentence = (
+        'the command "(?P<name>[^"]*)" (?P<output>(output|stderr|stdout)) '
+        'should contain (?P<quantifier>(all|none)) of'
+    )
+
+
+class CommandOutputShouldMatch(OutputShouldMatch):
+    """Checks the output (stdout, stderr) of the background command by a
+    regular expression.
+
+    Waits for the command to finish.
+
+    Examples:
+
+    ```gherkin
+    Then the command "client" output should match /HTTP\/1.\d 200/
+    ```
+    """
+    sentence = (
+        'the command "(?P<name>[^"]*)" (?P<output>(output|stderr|stdout)) '
+        'should( (?P<should_not>not))? '
+        'match /(?P<pattern>.*)/(?P<flags>[ims]*)'
+    )
+
+
+class EveryCommandOutputLineShouldMatch(EveryOutputLineShouldMatch):
+    """Checks every line of the output (stdout, stderr) of the background
+    command by a regular expression.
+
+    Waits for the command to finish.
+
+    Examples:
+
+    ```gherkin
+    Then every line of the command "client" output should match /\w+=\d+/
+    ```
+    """
+    sentence = (
+        'every line of the command "(?P<name>[^"]*)" '
+        '(?P<output>(output|stderr|stdout)) should '
+        'match /(?P<pattern>.*)/(?P<flags>[is]*)'
+    )
+
+
+class CommandOutputShouldContainLines(OutputShouldContainLines):
+    """Checks the number of lines of the output of the background command.
+
+    Waits for the command to finish.
+
+    Examples:
+
+    ```gherkin
+    Then the command "client" output should contain at least 1 line
+    ```
+    """
+    sentence = (
+        'the command "(?P<name>[^"]*)" (?P<output>(output|stderr|stdout)) '
+        'should( (?P<should_not>not))? '
+        'contain( '
+        '(?P<comparison>(up to|at least|more than|less than)))? '
+        '(?P<count>\d+) lines?'
+    )
+
+
+class CommandExitStatusShouldBe(ExitStatusShouldBe):
+    """Checks the status code of the background command.
+
+    Waits for the command to finish.
+
+    Examples:
+
+    ```gherkin
+    Then the command "client" exit status should be 0
+    ```
+    """
+    sentence = (
+        'the command "(?P<name>[^"]*)" exit status should'
+        '( (?P<should_not>not))? be (?P<exit_status>\d+)'
+    )
+
+
 base_steps = [
+    {
+        'func_name': 'start_shell_session',
+        'class': StartShellSession
+    },
     {
         'func_name': 'run_command',
         'class': RunCommand
@@ -324,10 +1806,50 @@ base_steps = [
         'func_name': 'got_interactive_dialog',
         'class': GotInteractiveDialogCommand
     },
+    {
+        'func_name': 'run_command_in_background',
+        'class': RunCommandInBackground
+    },
+    {
+        'func_name': 'wait_for_background_commands',
+        'class': WaitForBackgroundCommands
+    },
+    {
+        'func_name': 'run_commands_concurrently',
+        'class': RunCommandsConcurrently
+    },
+    {
+        'func_name': 'benchmark_command',
+        'class': BenchmarkCommand
+    },
+    {
+        'func_name': 'compare_commands',
+        'class': CompareCommands
+    },
+    {
+        'func_name': 'stream_through_command',
+        'class': StreamThroughCommand
+    },
     {
         'func_name': 'output_should_contain_text',
         'class': OutputShouldContainText
     },
+    {
+        'func_name': 'output_should_contain_text_within',
+        'class': OutputShouldContainTextWithin
+    },
+    {
+        'func_name': 'output_should_contain_texts',
+        'class': OutputShouldContainTexts
+    },
+    {
+        'func_name': 'output_should_match',
+        'class': OutputShouldMatch
+    },
+    {
+        'func_name': 'every_output_line_should_match',
+        'class': EveryOutputLineShouldMatch
+    },
     {
         'func_name': 'output_should_contain_lines',
         'class': OutputShouldContainLines
@@ -335,5 +1857,73 @@ base_steps = [
     {
         'func_name': 'exit_status_should_be',
         'class': ExitStatusShouldBe
+    },
+    {
+        'func_name': 'all_commands_should_exit_with',
+        'class': AllCommandsShouldExitWith
+    },
+    {
+        'func_name': 'command_should_finish_in',
+        'class': CommandShouldFinishIn
+    },
+    {
+        'func_name': 'command_should_use_cpu_time',
+        'class': CommandShouldUseCPUTime
+    },
+    {
+        'func_name': 'command_should_use_memory',
+        'class': CommandShouldUseMemory
+    },
+    {
+        'func_name': 'command_should_start_responding_in',
+        'class': CommandShouldStartRespondingIn
+    },
+    {
+        'func_name': 'command_should_respond_to_input_in',
+        'class': CommandShouldRespondToInputIn
+    },
+    {
+        'func_name': 'run_time_should_be_less_than',
+        'class': RunTimeShouldBeLessThan
+    },
+    {
+        'func_name': 'command_should_not_be_slower_than_baseline',
+        'class': CommandShouldNotBeSlowerThanBaseline
+    },
+    {
+        'func_name': 'new_command_should_be_fast',
+        'class': NewCommandShouldBeFast
+    },
+    {
+        'func_name': 'throughput_should_be_at_least',
+        'class': ThroughputShouldBeAtLeast
+    },
+    {
+        'func_name': 'command_output_should_contain_text',
+        'class': CommandOutputShouldContainText
+    },
+    {
+        'func_name': 'command_output_should_contain_text_within',
+        'class': CommandOutputShouldContainTextWithin
+    },
+    {
+        'func_name': 'command_output_should_contain_texts',
+        'class': CommandOutputShouldContainTexts
+    },
+    {
+        'func_name': 'command_output_should_match',
+        'class': CommandOutputShouldMatch
+    },
+    {
+        'func_name': 'every_command_output_line_should_match',
+        'class': EveryCommandOutputLineShouldMatch
+    },
+    {
+        'func_name': 'command_output_should_contain_lines',
+        'class': CommandOutputShouldContainLines
+    },
+    {
+        'func_name': 'command_exit_status_should_be',
+        'class': CommandExitStatusShouldBe
     }
 ]
@@ -1,18 +1,47 @@
-import os
-
+from cli_bdd.core.overlay import EnvironmentOverlay
 from cli_bdd.core.steps.base import StepBase
 
 
-def _append_to_the_environment_variable(variable, value):
-    if variable not in os.environ:
-        os.environ[variable] = ''
-    os.environ[variable] += value
+def get_environment(context):
+    """Returns the environment overlay of the scenario.
+
+    The steps change the environment of the commands of the scenario, and
+    not the one of the current process (see
+    `cli_bdd.core.overlay.EnvironmentOverlay`).
+    """
+    environment = getattr(context, 'environment', None)
+    if environment is None:
+        environment = context.environment = EnvironmentOverlay()
+    return environment
+
+
+def get_step_environment(step):
+    """Returns the environment overlay of the scenario of the step.
 
+    The overlay is reverted and dropped when the scenario finishes, since the
+    context could be shared by the scenarios (e.g. `world` of lettuce).
+    """
+    context = step.get_scenario_context()
+    if getattr(context, 'environment', None) is None:
+        step.add_scenario_cleanup(lambda: _drop_environment(context))
+    return get_environment(context)
+
+
+def _drop_environment(context):
+    environment = getattr(context, 'environment', None)
+    if environment is not None:
+        environment.revert()
+        context.environment = None
 
-def _prepend_to_the_environment_variable(variable, value):
-    if variable not in os.environ:
-        os.environ[variable] = ''
-    os.environ[variable] = '%s%s' % (value, os.environ[variable])
+
+def get_command_env(context):
+    """Returns the environment for the commands of the scenario, or `None` if
+    the scenario didn't change it, so the commands inherit the environment of
+    the current process."""
+    environment = getattr(context, 'environment', None)
+    if environment is None or not environment.changed:
+        return None
+    return environment.to_dict()
 
 
 # todo: a mocked home directory
@@ -22,6 +51,9 @@ def _prepend_to_the_environment_variable(variable, value):
 class SetTheEnvironmentVariableBase(StepBase):
     """Sets the environment variable.
 
+    The variable is set for the commands of the scenario, while the
+    environment of the current process stays the same.
+
     Examples:
 
     ```gherkin
@@ -35,7 +67,7 @@ class SetTheEnvironmentVariableBase(StepBase):
     )
 
     def step(self, variable, value):
-        os.environ[variable] = value
+        get_step_environment(self)[variable] = value
 
 
 class AppendToTheEnvironmentVariable(StepBase):
@@ -54,7 +86,7 @@ class AppendToTheEnvironmentVariable(StepBase):
     )
 
     def step(self, value, variable):
-        _append_to_the_environment_variable(variable, value)
+        get_step_environment(self).append(variable, value)
 
 
 class PrependToTheEnvironmentVariable(StepBase):
@@ -73,7 +105,7 @@ class PrependToTheEnvironmentVariable(StepBase):
     )
 
     def step(self, value, variable):
-        _prepend_to_the_environment_variable(variable, value)
+        get_step_environment(self).prepend(variable, value)
 
 
 class SetTheEnvironmentVariables(StepBase):
@@ -92,8 +124,9 @@ class SetTheEnvironmentVariables(StepBase):
     sentence = 'I set the environment variables to'
 
     def step(self):
+        environment = get_step_environment(self)
         for variable in self.get_table():
-            os.environ[variable['variable']] = variable['value']
+            environment[variable['variable']] = variable['value']
 
 
 class AppendTheValuesToTheEnvironmentVariables(StepBase):
@@ -111,11 +144,9 @@ class AppendTheValuesToTheEnvironmentVariables(StepBase):
     sentence = 'I append the values to the environment variables'
 
     def step(self):
+        environment = get_step_environment(self)
         for variable in self.get_table():
-            _append_to_the_environment_variable(
-                variable['variable'],
-                variable['value']
-            )
+            environment.append(variable['variable'], variable['value'])
 
 
 class PrependTheValuesToTheEnvironmentVariables(StepBase):
@@ -134,11 +165,9 @@ class PrependTheValuesToTheEnvironmentVariables(StepBase):
     sentence = 'I prepend the values to the environment variables'
 
     def step(self):
+        environment = get_step_environment(self)
         for variable in self.get_table():
-            _prepend_to_the_environment_variable(
-                variable['variable'],
-                variable['value']
-            )
+            environment.prepend(variable['variable'], variable['value'])
 
 
 base_steps = [
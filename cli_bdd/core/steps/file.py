@@ -1,3 +1,4 @@
+import errno
 import os
 import shutil
 
@@ -6,6 +7,33 @@ from hamcrest import assert_that, equal_to
 from cli_bdd.core.steps.base import StepBase
 
 
+def get_working_directory(context):
+    """Returns the working directory of the scenario.
+
+    It is the one of the current process until the scenario changes it by
+    `I cd to`, which never changes the working directory of the process.
+    """
+    directory = getattr(context, 'working_directory', None)
+    if directory is None:
+        return os.getcwd()
+    return directory
+
+
+def get_command_cwd(context):
+    """Returns the working directory for the commands of the scenario, or
+    `None` if the scenario didn't change it, so the commands inherit the
+    working directory of the current process."""
+    return getattr(context, 'working_directory', None)
+
+
+def resolve_path(context, path):
+    """Returns the path relative to the working directory of the scenario.
+    Absolute paths are returned as they are."""
+    if os.path.isabs(path):
+        return path
+    return os.path.join(get_working_directory(context), path)
+
+
 class CopyFileOrDirectory(StepBase):
     """Copies a file or directory.
 
@@ -24,6 +52,9 @@ class CopyFileOrDirectory(StepBase):
     )
 
     def step(self, file_or_directory, source, destination):
+        context = self.get_scenario_context()
+        source = resolve_path(context, source)
+        destination = resolve_path(context, destination)
         if file_or_directory == 'file':
             shutil.copyfile(source, destination)
         else:
@@ -48,7 +79,11 @@ class MoveFileOrDirectory(StepBase):
     )
 
     def step(self, file_or_directory, source, destination):
-        shutil.move(source, destination)
+        context = self.get_scenario_context()
+        shutil.move(
+            resolve_path(context, source),
+            resolve_path(context, destination)
+        )
 
 
 class CreateDirectory(StepBase):
@@ -68,6 +103,7 @@ class CreateDirectory(StepBase):
     )
 
     def step(self, dir_path):
+        dir_path = resolve_path(self.get_scenario_context(), dir_path)
         if not os.path.exists(dir_path):
             os.makedirs(dir_path)
 
@@ -75,6 +111,11 @@ class CreateDirectory(StepBase):
 class ChangeDirectory(StepBase):
     """Change directory.
 
+    Changes the working directory of the scenario: the next file steps
+    resolve relative paths against it, and the next commands are run in it.
+    The working directory of the current process stays the same, so the
+    scenarios which run in threads don't affect each other.
+
     Examples:
 
     ```gherkin
@@ -85,7 +126,18 @@ class ChangeDirectory(StepBase):
     sentence = 'I cd to "(?P<dir_path>[^"]*)"'
 
     def step(self, dir_path):
-        os.chdir(dir_path)
+        context = self.get_scenario_context()
+        path = os.path.abspath(resolve_path(context, dir_path))
+        if not os.path.isdir(path):
+            code = errno.ENOTDIR if os.path.exists(path) else errno.ENOENT
+            raise OSError(code, os.strerror(code), dir_path)
+        if getattr(context, 'working_directory', None) is None:
+            # the context could be shared by the scenarios (e.g. `world` of
+            # lettuce)
+            self.add_scenario_cleanup(
+                lambda: setattr(context, 'working_directory', None)
+            )
+        context.working_directory = path
 
 
 class CreateFileWithContent(StepBase):
@@ -105,6 +157,7 @@ class CreateFileWithContent(StepBase):
     )
 
     def step(self, file_path, file_content):
+        file_path = resolve_path(self.get_scenario_context(), file_path)
         with open(file_path, 'wt') as ff:
             ff.write(file_content)
 
@@ -137,6 +190,7 @@ class CreateFileWithMultilineContent(StepBase):
     )
 
     def step(self, file_path):
+        file_path = resolve_path(self.get_scenario_context(), file_path)
         with open(file_path, 'wt') as ff:
             ff.write(self.get_text())
 
@@ -161,7 +215,7 @@ class CheckFileOrDirectoryExist(StepBase):
 
     def step(self, file_or_directory, path, should_not=None):
         assert_that(
-            os.path.exists(path),
+            os.path.exists(resolve_path(self.get_scenario_context(), path)),
             equal_to(not should_not)
         )
 
@@ -0,0 +1,179 @@
+import errno
+import fcntl
+import os
+import select
+import signal
+import subprocess
+import time
+
+import pexpect
+
+from cli_bdd.core.output import OutputBuffer
+from cli_bdd.core.process import CHUNK_SIZE
+from cli_bdd.core.usage import wait4
+
+# Line which the synthetic input is made of.
+SYNTHETIC_LINE = (
+    'The quick brown fox jumps over the lazy dog 0123456789 abcdef\n'
+)
+
+
+class StreamedCommand(object):
+    """Command which was fed a stream of input and whose output was counted
+    instead of captured.
+
+    The input is written through a pipe chunk by chunk, while stdout is read
+    and counted, so neither of them is held in memory. Provides the same
+    attributes which the steps read from a spawned child, with empty stdout.
+    stderr is captured, since it tells why the command failed. The command
+    gets the environment and the working directory of the current process
+    unless `env` and `cwd` are given.
+    """
+
+    def __init__(self, command, env=None, cwd=None):
+        self.logfile_read = OutputBuffer()
+        self.logfile_stderr = OutputBuffer()
+        self.exitstatus = None
+        self.signalstatus = None
+        self.rusage = None
+        self.input_size = 0
+        self.output_size = 0
+        self.elapsed = None
+        self._started = time.time()
+        self.process = subprocess.Popen(
+            ['/bin/sh', '-c', command],
+            env=env,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=True,
+            preexec_fn=os.setsid
+        )
+        self.pid = self.process.pid
+
+    def stream(self, input_chunks, timeout=30):
+        """Writes the chunks to stdin and counts stdout until the command
+        exits. `elapsed` is the time from its start.
+
+        Raises `pexpect.TIMEOUT` and kills the command if it does not finish
+        in `timeout` seconds.
+        """
+        try:
+            self._stream(iter(input_chunks), timeout)
+        finally:
+            self._finish()
+            self.elapsed = time.time() - self._started
+        return self
+
+    def wait(self, timeout=None):
+        return self.exitstatus
+
+    def _stream(self, input_chunks, timeout):
+        stdin_fd = self.process.stdin.fileno()
+        stdout_fd = self.process.stdout.fileno()
+        stderr_fd = self.process.stderr.fileno()
+        flags = fcntl.fcntl(stdin_fd, fcntl.F_GETFL)
+        fcntl.fcntl(stdin_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
+        readers = set([stdout_fd, stderr_fd])
+        writers = set([stdin_fd])
+        pending = ''
+        deadline = time.time() + timeout
+        while readers:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                self._kill()
+                raise pexpect.TIMEOUT(
+                    'Command did not finish in %s seconds' % timeout
+                )
+            try:
+                readable, writable, _ = select.select(
+                    list(readers),
+                    list(writers),
+                    [],
+                    remaining
+                )
+            except select.error as e:
+                if e.args[0] == errno.EINTR:
+                    continue
+                raise
+
+            if writable:
+                if not pending:
+                    pending = next(input_chunks, '')
+                if pending:
+                    try:
+                        written = os.write(stdin_fd, pending)
+                    except OSError as e:
+                        # the command stopped reading its input
+                        if e.errno != errno.EPIPE:
+                            raise
+                        pending = ''
+                    else:
+                        self.input_size += written
+                        pending = pending[written:]
+                        continue
+                writers.clear()
+                self.process.stdin.close()
+
+            for fd in readable:
+                data = os.read(fd, CHUNK_SIZE)
+                if not data:
+                    readers.discard(fd)
+                elif fd == stdout_fd:
+                    # the output is only counted
+                    self.output_size += len(data)
+                else:
+                    self.logfile_stderr.write(data)
+
+    def _kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _finish(self):
+        for stream in (self.process.stdin, self.process.stdout,
+                       self.process.stderr):
+            if not stream.closed:
+                stream.close()
+        _, status, self.rusage = wait4(self.pid)
+        self.process._handle_exitstatus(status)
+        if self.process.returncode < 0:
+            self.signalstatus = -self.process.returncode
+        else:
+            self.exitstatus = self.process.returncode
+
+    @property
+    def throughput(self):
+        """Bytes of the input per second."""
+        if self.elapsed <= 0:
+            return float('inf')
+        return self.input_size / self.elapsed
+
+
+def generate_input(size, path=None, chunk_size=CHUNK_SIZE):
+    """Yields `size` bytes of input in chunks: the content of the file,
+    repeated as needed, or synthetic lines of text if there is no file."""
+    if path is None:
+        # whole lines, so the input is the same for any chunk size
+        chunk = SYNTHETIC_LINE * max(chunk_size // len(SYNTHETIC_LINE), 1)
+        while size > 0:
+            yield chunk[:size]
+            size -= len(chunk)
+        return
+
+    while size > 0:
+        read = 0
+        with open(path, 'rb') as input_file:
+            for data in iter(lambda: input_file.read(chunk_size), ''):
+                data = data[:size]
+                read += len(data)
+                size -= len(data)
+                yield data
+                if size <= 0:
+                    return
+        if not read:
+            raise ValueError('Input file "%s" is empty' % path)
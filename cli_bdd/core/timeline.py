@@ -0,0 +1,76 @@
+import threading
+import time
+
+from cli_bdd.core.output import OutputBuffer
+
+
+class Timeline(object):
+    """Timestamps of what happened to an interactive command.
+
+    Events are `(name, time, detail)` tuples:
+    - `spawn` when the command was started
+    - `output` when the first output was read after the start and after
+      every input
+    - `input` when a line was sent, with the line as the detail
+    - `dialog` when a dialog was matched, with the pattern as the detail
+
+    Output is timed when it is read, which the steps do as soon as it
+    arrives while they wait for it.
+    """
+
+    def __init__(self, spawn_time=None):
+        self.events = []
+        self._awaiting_output = False
+        self._lock = threading.Lock()
+        self.record('spawn', timestamp=spawn_time)
+
+    def record(self, name, detail=None, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            self.events.append((name, timestamp, detail))
+            if name in ('spawn', 'input'):
+                self._awaiting_output = True
+            elif name == 'output':
+                self._awaiting_output = False
+
+    def record_output(self):
+        """Records `output` unless the output since the last `spawn` or
+        `input` was already recorded."""
+        if self._awaiting_output:
+            self.record('output')
+
+    @property
+    def awaiting_output(self):
+        return self._awaiting_output
+
+    def get_latency(self, since):
+        """Returns the seconds from the last `since` event (e.g. `input`) to
+        the output which followed it, or `None` if there was no such event or
+        no output after it."""
+        with self._lock:
+            events = list(self.events)
+        start = None
+        for index, (name, timestamp, _) in enumerate(events):
+            if name == since:
+                start = index
+        if start is None:
+            return None
+        for name, timestamp, _ in events[start + 1:]:
+            if name == 'output':
+                return timestamp - events[start][1]
+        return None
+
+
+class TimedOutputBuffer(OutputBuffer):
+    """`OutputBuffer` which records the arrival of the output on the
+    timeline."""
+
+    def __init__(self, timeline, *args, **kwargs):
+        super(TimedOutputBuffer, self).__init__(*args, **kwargs)
+        self.timeline = timeline
+
+    def _write(self, data):
+        if data:
+            self.timeline.record_output()
+        super(TimedOutputBuffer, self)._write(data)
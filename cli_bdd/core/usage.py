@@ -0,0 +1,101 @@
+import errno
+import os
+import resource
+import sys
+
+import pexpect
+from ptyprocess import PtyProcess, PtyProcessError
+
+# `ru_maxrss` is in kilobytes on Linux and in bytes on macOS.
+MAX_RSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+class AccountedPtyProcess(PtyProcess):
+    """`PtyProcess` which reaps the child by `wait4`, so its resource usage
+    (together with the descendants which it waited for) is kept in
+    `rusage`."""
+
+    rusage = None
+
+    def isalive(self):
+        # the blocking wait is needed on Linux for a child which closed the
+        # terminal, see `PtyProcess.isalive`
+        return not self._reap(0 if self.flag_eof else os.WNOHANG)
+
+    def wait(self):
+        self._reap(0)
+        return self.exitstatus
+
+    def _reap(self, options):
+        """Returns `True` if the child has exited."""
+        if self.terminated:
+            return True
+        try:
+            pid, status, rusage = wait4(self.pid, options)
+        except OSError as e:
+            if e.errno == errno.ECHILD:
+                raise PtyProcessError(
+                    'Child process was reaped by someone else'
+                )
+            raise
+        if pid == 0:
+            return False
+        if os.WIFSIGNALED(status):
+            self.exitstatus = None
+            self.signalstatus = os.WTERMSIG(status)
+        else:
+            self.exitstatus = os.WEXITSTATUS(status)
+            self.signalstatus = None
+        self.status = status
+        self.rusage = rusage
+        self.terminated = True
+        return True
+
+
+class AccountedSpawn(pexpect.spawn):
+    """`pexpect.spawn` which keeps the resource usage of the finished child
+    in `rusage`."""
+
+    @property
+    def rusage(self):
+        return self.ptyproc.rusage
+
+    def _spawnpty(self, args, **kwargs):
+        return AccountedPtyProcess.spawn(args, **kwargs)
+
+
+def wait4(pid, options=0):
+    """`os.wait4` which is retried when interrupted by a signal."""
+    while True:
+        try:
+            return os.wait4(pid, options)
+        except OSError as e:
+            if e.errno != errno.EINTR:
+                raise
+
+
+def make_rusage(user_time, system_time, max_rss):
+    """Builds `resource.struct_rusage` with the given fields, e.g. for
+    a command which was not run by a separate process."""
+    return resource.struct_rusage(
+        (user_time, system_time, max_rss) + (0,) * 13
+    )
+
+
+def get_resource_usage(wall_time, rusage=None):
+    """Returns the resource usage of a command as a dict of `wall_time`,
+    `user_time` and `system_time` (seconds) and `max_rss` (bytes).
+
+    CPU time and memory are `None` if the command has no `rusage`.
+    """
+    usage = {
+        'wall_time': wall_time,
+        'user_time': None,
+        'system_time': None,
+        'max_rss': None,
+    }
+    if rusage is not None:
+        usage['user_time'] = rusage.ru_utime
+        usage['system_time'] = rusage.ru_stime
+        usage['max_rss'] = rusage.ru_maxrss * MAX_RSS_UNIT
+    return usage
@@ -1,12 +1,16 @@
-from lettuce import step, world
+from lettuce import after, step, world
+
+from cli_bdd.core.steps.base import add_scenario_cleanup, run_scenario_cleanups
 
 
 class LettuceStepMixin(object):
+    def __init__(self, step_context=None):
+        self.step_context = step_context
+
     def build_step_func(self):
         @step(self.sentence)
         def lettuce_step(step, *args, **kwargs):
-            self.step_context = step
-            return self.step(*args, **kwargs)
+            return self.for_invocation(step).step(*args, **kwargs)
 
         return lettuce_step
 
@@ -18,3 +22,15 @@ class LettuceStepMixin(object):
 
     def get_scenario_context(self):
         return world
+
+    def get_scenario_name(self):
+        scenario = self.step_context.scenario
+        return scenario.feature.name, scenario.name
+
+    def add_scenario_cleanup(self, cleanup):
+        add_scenario_cleanup(self.get_scenario_context(), cleanup)
+
+
+@after.each_scenario
+def _run_scenario_cleanups(scenario):
+    run_scenario_cleanups(world)
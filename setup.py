@@ -67,4 +67,9 @@ setup(
     ],
     packages=get_packages('cli_bdd'),
     package_data=get_package_data('cli_bdd'),
+    entry_points={
+        'console_scripts': [
+            'cli-bdd = cli_bdd.behave.runner:main',
+        ],
+    },
 )
@@ -0,0 +1,7 @@
+Feature: worker crash
+
+    Scenario: crash
+        When the worker dies
+
+    Scenario: after the crash
+        When I run `true`
@@ -0,0 +1,11 @@
+# flake8: noqa
+import os
+
+from behave import when
+
+from cli_bdd.behave.steps import *
+
+
+@when('the worker dies')
+def step_impl(context):
+    os._exit(3)
@@ -0,0 +1,40 @@
+Feature: parallel runner
+
+    Scenario: passing
+        When I run `echo hello`
+        Then the output should contain:
+            """
+            hello
+            """
+
+    Scenario: failing
+        When I run `echo hello`
+        Then the exit status should be 1
+        And the output should contain:
+            """
+            never
+            """
+
+    Scenario Outline: outline
+        When I run `echo <word>`
+        Then the output should contain:
+            """
+            <word>
+            """
+
+        Examples:
+            | word  |
+            | one   |
+            | two   |
+
+    Scenario: undefined
+        When I do something undefined
+
+    Scenario: isolated
+        Given a file "hello.txt" with "hi"
+        Then a file "hello.txt" should exist
+        When I run `cat hello.txt`
+        Then the output should contain:
+            """
+            hi
+            """
@@ -0,0 +1,30 @@
+import os
+
+
+def log_hook(name):
+    with open(os.environ['CLI_BDD_HOOKS_LOG'], 'a') as log:
+        log.write('%s\n' % name)
+
+
+def before_all(context):
+    log_hook('before_all')
+
+
+def after_all(context):
+    log_hook('after_all')
+
+
+def before_feature(context, feature):
+    log_hook('before_feature')
+
+
+def after_feature(context, feature):
+    log_hook('after_feature')
+
+
+def before_scenario(context, scenario):
+    log_hook('before_scenario')
+
+
+def after_scenario(context, scenario):
+    log_hook('after_scenario')
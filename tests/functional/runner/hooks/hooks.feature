@@ -0,0 +1,10 @@
+Feature: hooks
+
+    Scenario: first
+        When I run `true`
+
+    Scenario: second
+        When I run `true`
+
+    Scenario: third
+        When I run `true`
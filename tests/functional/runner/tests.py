@@ -0,0 +1,153 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from hamcrest import assert_that, equal_to, has_item, has_items
+
+from testutils import TestCase
+
+BASE_PATH = os.path.dirname(os.path.normpath(__file__))
+FEATURES_PATH = os.path.join(BASE_PATH, 'features/')
+CRASH_FEATURES_PATH = os.path.join(BASE_PATH, 'crash/')
+HOOKS_FEATURES_PATH = os.path.join(BASE_PATH, 'hooks/')
+
+
+class TestRunnerFunctional(TestCase):
+    def run_features(self, module, *args, **kwargs):
+        directory = kwargs.get('directory')
+        if directory is None:
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+        process = subprocess.Popen(
+            [sys.executable, '-m', module] + list(args) + [
+                '--format', 'plain',
+                '--no-timings',
+                kwargs.get('features', FEATURES_PATH),
+            ],
+            cwd=directory,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=kwargs.get('env'),
+        )
+        stdout = process.communicate()[0]
+        # the summary ends with the total duration of the steps
+        lines = [
+            line for line in stdout.split('\n')
+            if not line.startswith('Took ')
+        ]
+        return process.returncode, lines, sorted(os.listdir(directory))
+
+    def test_me(self):
+        behave_status, behave_lines, _ = self.run_features('behave')
+        status, lines, created = self.run_features(
+            'cli_bdd.behave.runner',
+            '--processes', '3'
+        )
+        assert_that(status, equal_to(1))
+        assert_that(behave_status, equal_to(1))
+        assert_that(lines, equal_to(behave_lines))
+        assert_that(
+            lines,
+            has_items(
+                '0 features passed, 1 failed, 0 skipped',
+                '4 scenarios passed, 2 failed, 0 skipped',
+                '11 steps passed, 1 failed, 1 skipped, 1 undefined'
+            )
+        )
+        # the scenarios are run in the working directories of the workers
+        assert_that(created, equal_to(['.cli_bdd_history.json']))
+
+    def test_shard(self):
+        history = {
+            'runner.feature: passing': [10.0],
+            'runner.feature: isolated': [9.0],
+            'runner.feature: failing': [1.0],
+            'runner.feature: outline -- @1.1 ': [1.0],
+            'runner.feature: outline -- @1.2 ': [1.0],
+            'runner.feature: undefined': [1.0],
+        }
+        scenarios = []
+        for shard in ('1/2', '2/2'):
+            # every node starts with the same history
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+            history_path = os.path.join(directory, '.cli_bdd_history.json')
+            with open(history_path, 'w') as history_file:
+                json.dump(history, history_file)
+            status, lines, _ = self.run_features(
+                'cli_bdd.behave.runner',
+                '--shard', shard,
+                '--no-skipped',
+                directory=directory
+            )
+            assert_that(status, equal_to(1))
+            scenarios.append([
+                line.strip() for line in lines if 'Scenario' in line
+            ])
+            with open(history_path) as history_file:
+                assert_that(
+                    len(json.load(history_file)['runner.feature: passing']),
+                    equal_to(2 if shard == '1/2' else 1)
+                )
+
+        assert_that(
+            scenarios,
+            equal_to([
+                [
+                    'Scenario: passing',
+                    'Scenario Outline: outline -- @1.1',
+                    'Scenario: undefined',
+                ],
+                [
+                    'Scenario: failing',
+                    'Scenario Outline: outline -- @1.2',
+                    'Scenario: isolated',
+                ],
+            ])
+        )
+
+    def test_worker_crash(self):
+        status, lines, _ = self.run_features(
+            'cli_bdd.behave.runner',
+            '--processes', '1',
+            features=CRASH_FEATURES_PATH
+        )
+        assert_that(status, equal_to(1))
+        assert_that(
+            lines,
+            has_item('Worker exited with status 3 while running the scenario')
+        )
+        assert_that(
+            lines,
+            has_item('1 scenario passed, 1 failed, 0 skipped')
+        )
+
+    def test_hooks(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        log_path = os.path.join(directory, 'hooks.log')
+        status, lines, _ = self.run_features(
+            'cli_bdd.behave.runner',
+            '--processes', '2',
+            features=HOOKS_FEATURES_PATH,
+            env=dict(os.environ, CLI_BDD_HOOKS_LOG=log_path)
+        )
+        assert_that(status, equal_to(0))
+        with open(log_path) as log:
+            hooks = log.read().split()
+        # every worker runs before_all and after_all once, and every
+        # scenario is run as a feature of its own
+        assert_that(
+            dict((name, hooks.count(name)) for name in set(hooks)),
+            equal_to({
+                'before_all': 2,
+                'after_all': 2,
+                'before_feature': 3,
+                'after_feature': 3,
+                'before_scenario': 3,
+                'after_scenario': 3,
+            })
+        )
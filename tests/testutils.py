@@ -4,6 +4,7 @@ import unittest
 from hamcrest import assert_that, equal_to
 
 from cli_bdd.behave import steps as behave_steps_root_module
+from cli_bdd.core.steps.base import run_scenario_cleanups
 from cli_bdd.lettuce import steps as lettuce_steps_root_module
 from cli_bdd.lettuce.steps.mixins import LettuceStepMixin
 from mock import Mock, patch
@@ -60,7 +61,7 @@ class StepsTestMixin(object):
             getattr(self.module, name),
             equal_to(getattr(self.root_module, name))
         )
-        context = context or Mock()
+        context = context or Mock(spec=[])
         return self._execute_module_step(
             name,
             context=context,
@@ -72,6 +73,10 @@ class StepsTestMixin(object):
     def _execute_module_step(self, name, context, kwargs, table, text):
         raise NotImplementedError()
 
+    def finish_scenario(self, context):
+        """Does what the framework does when the scenario finishes."""
+        raise NotImplementedError()
+
 
 class BehaveStepsTestMixin(StepsTestMixin):
     module = None
@@ -80,9 +85,16 @@ class BehaveStepsTestMixin(StepsTestMixin):
     def _execute_module_step(self, name, context, kwargs, table, text):
         context.table = table
         context.text = text
+        if not hasattr(context, '_runner'):
+            context._runner = Mock(hooks={})
         getattr(self.module, name)(context, **kwargs)
         return context
 
+    def finish_scenario(self, context):
+        hook = context._runner.hooks.get('after_scenario')
+        if hook is not None:
+            hook(context, getattr(context, 'scenario', None))
+
 
 class LettuceStepsTestMixin(StepsTestMixin):
     module = None
@@ -92,6 +104,7 @@ class LettuceStepsTestMixin(StepsTestMixin):
         step_context = Mock()
         step_context.hashes = table
         step_context.multiline = text
+        step_context.scenario = getattr(context, 'scenario', None)
 
         with patch.object(
             LettuceStepMixin,
@@ -100,3 +113,7 @@ class LettuceStepsTestMixin(StepsTestMixin):
         ):
             getattr(self.module, name)(step_context, **kwargs)
         return context
+
+    def finish_scenario(self, context):
+        # the cleanups of `world` are run by an `after.each_scenario` hook
+        run_scenario_cleanups(context)
@@ -0,0 +1,68 @@
+import threading
+
+import pexpect
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core.background import BackgroundCommand, stop_background_commands
+from cli_bdd.core.process import PipeProcess
+from testutils import TestCase
+
+
+class TestBackgroundCommand(TestCase):
+    def test_pty(self):
+        command = BackgroundCommand(
+            pexpect.spawn('/bin/sh', ['-c', 'echo hello; exit 3']),
+            'shell'
+        )
+        assert_that(command.wait(), equal_to(3))
+        assert_that(command.logfile_read.getvalue(), equal_to('hello\r\n'))
+
+    def test_concurrent_commands(self):
+        commands = [
+            BackgroundCommand(
+                PipeProcess(
+                    'sleep 0.2; seq %s; echo error >&2; exit %s' % (i, i)
+                ),
+                'shell'
+            )
+            for i in xrange(20)
+        ]
+        # all the commands are read by one thread
+        assert_that(
+            len([
+                thread for thread in threading.enumerate()
+                if thread.name.startswith('Thread-') and thread.daemon
+            ]) <= 2,
+            equal_to(True)
+        )
+        for i, command in enumerate(commands):
+            assert_that(command.wait(), equal_to(i))
+            assert_that(
+                command.logfile_read.getvalue(),
+                equal_to(''.join('%s\n' % j for j in xrange(1, i + 1)))
+            )
+            assert_that(
+                command.logfile_stderr.getvalue(),
+                equal_to('error\n')
+            )
+
+    def test_wait_timeout(self):
+        command = BackgroundCommand(PipeProcess('sleep 5'), 'shell')
+        with self.assertRaises(pexpect.TIMEOUT):
+            command.wait(0.1)
+        assert_that(command.isalive(), equal_to(True))
+
+        stop_background_commands([command])
+        assert_that(command.isalive(), equal_to(False))
+        assert_that(command.signalstatus, equal_to(9))
+
+    def test_wait_for_output(self):
+        command = BackgroundCommand(
+            PipeProcess('echo first; sleep 0.2; echo second'),
+            'shell'
+        )
+        command.wait_for_output(5)
+        while 'first' not in command.logfile_read.getvalue():
+            assert_that(command.wait_for_output(5), equal_to(True))
+        command.wait()
+        assert_that(command.wait_for_output(5), equal_to(False))
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import tempfile
+import warnings
+
+from hamcrest import assert_that, equal_to, starts_with
+
+from cli_bdd.core import settings
+from cli_bdd.core.baselines import (
+    BaselineStore,
+    compare_to_baseline,
+    get_baseline,
+    get_baseline_store
+)
+from testutils import TestCase
+
+
+class TestBaselineStore(TestCase):
+    def setUp(self):
+        super(TestBaselineStore, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'baselines.json')
+
+    def tearDown(self):
+        super(TestBaselineStore, self).tearDown()
+        shutil.rmtree(self.directory)
+        settings.BASELINES_PATH = 'performance_baselines.json'
+
+    def test_get_and_set(self):
+        store = BaselineStore(self.path)
+        assert_that(store.get('Feature', 'Scenario', 'ls'), equal_to(None))
+        store.set('Feature', 'Scenario', 'ls', [1.0, 0.25, 0.5])
+
+        store = BaselineStore(self.path)
+        assert_that(
+            store.get('Feature', 'Scenario', 'ls'),
+            equal_to({
+                'samples': [0.25, 0.5, 1.0],
+                'median': 0.5,
+                'mad': 0.25,
+            })
+        )
+        assert_that(store.get('Feature', 'Other', 'ls'), equal_to(None))
+        with open(self.path) as baselines_file:
+            assert_that(
+                json.load(baselines_file)['Feature']['Scenario']['ls'][
+                    'median'
+                ],
+                equal_to(0.5)
+            )
+        assert_that(os.listdir(self.directory), equal_to(['baselines.json']))
+
+    def test_broken_file(self):
+        with open(self.path, 'w') as baselines_file:
+            baselines_file.write('{"Feature": {')
+        store = BaselineStore(self.path)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            assert_that(store.get('Feature', 'Scenario', 'ls'), equal_to(None))
+        assert_that(len(caught), equal_to(1))
+        assert_that(str(caught[0].message), starts_with('Baselines file '))
+
+        store.set('Feature', 'Scenario', 'ls', [1.0])
+        assert_that(
+            BaselineStore(self.path).get('Feature', 'Scenario', 'ls')[
+                'median'
+            ],
+            equal_to(1.0)
+        )
+
+    def test_set__other_process(self):
+        # e.g. the stores of two workers of the runner
+        first = BaselineStore(self.path)
+        second = BaselineStore(self.path)
+        assert_that(first.get('Feature', 'First', 'ls'), equal_to(None))
+        assert_that(second.get('Feature', 'Second', 'ls'), equal_to(None))
+        first.set('Feature', 'First', 'ls', [1.0])
+        second.set('Feature', 'Second', 'ls', [2.0])
+
+        store = BaselineStore(self.path)
+        assert_that(
+            store.get('Feature', 'First', 'ls')['median'],
+            equal_to(1.0)
+        )
+        assert_that(
+            store.get('Feature', 'Second', 'ls')['median'],
+            equal_to(2.0)
+        )
+
+    def test_get_baseline_store(self):
+        settings.BASELINES_PATH = self.path
+        store = get_baseline_store()
+        assert_that(store.path, equal_to(self.path))
+        assert_that(get_baseline_store(), equal_to(store))
+
+
+class TestCompareToBaseline(TestCase):
+    def test_compare_to_baseline(self):
+        baseline = get_baseline([0.100] * 5)
+        assert_that(
+            compare_to_baseline([0.105] * 5, baseline, 10),
+            equal_to(None)
+        )
+        assert_that(
+            compare_to_baseline([0.125] * 5, baseline, 10),
+            equal_to(
+                '25.0% slower than the baseline: median 125.0 ms against '
+                '100.0 ms (allowed 10% and 0.0 ms of noise, 5 runs)'
+            )
+        )
+
+    def test_compare_to_baseline__noise(self):
+        baseline = get_baseline([0.08, 0.09, 0.10, 0.11, 0.12])
+        noisy = [0.09, 0.10, 0.12, 0.14, 0.15]
+        # the median is 20% slower, which is within the noise
+        assert_that(compare_to_baseline(noisy, baseline, 10), equal_to(None))
+        # more runs with the same spread make the comparison stricter
+        assert_that(
+            compare_to_baseline(
+                noisy * 20,
+                get_baseline(baseline['samples'] * 20),
+                10
+            ),
+            starts_with('20.0% slower than the baseline')
+        )
@@ -0,0 +1,70 @@
+from hamcrest import assert_that, close_to, equal_to, greater_than, less_than
+
+from cli_bdd.core.benchmark import (
+    format_statistics,
+    get_mann_whitney_p_value,
+    get_percentile,
+    get_statistics
+)
+from testutils import TestCase
+
+
+class TestStatistics(TestCase):
+    def test_get_statistics(self):
+        statistics = get_statistics([0.5, 0.1, 0.4, 0.2, 0.3])
+        assert_that(statistics['runs'], equal_to(5))
+        assert_that(statistics['min'], equal_to(0.1))
+        assert_that(statistics['max'], equal_to(0.5))
+        assert_that(statistics['mean'], close_to(0.3, 1e-9))
+        assert_that(statistics['median'], equal_to(0.3))
+        assert_that(statistics['p95'], close_to(0.48, 1e-9))
+        assert_that(statistics['p99'], close_to(0.496, 1e-9))
+        assert_that(statistics['stddev'], close_to(0.158114, 1e-6))
+        assert_that(
+            format_statistics(statistics),
+            equal_to(
+                '5 runs: min 100.0 ms, median 300.0 ms, p95 480.0 ms, '
+                'p99 496.0 ms, stddev 158.1 ms'
+            )
+        )
+
+    def test_get_statistics__single_sample(self):
+        statistics = get_statistics([2])
+        assert_that(statistics['median'], equal_to(2))
+        assert_that(statistics['p99'], equal_to(2))
+        assert_that(statistics['stddev'], equal_to(0))
+
+    def test_get_percentile(self):
+        assert_that(get_percentile([1, 2, 3, 4], 50), equal_to(2.5))
+        assert_that(get_percentile([1, 2, 3, 4], 0), equal_to(1))
+        assert_that(get_percentile([1, 2, 3, 4], 100), equal_to(4))
+
+
+class TestGetMannWhitneyPValue(TestCase):
+    def test_get_mann_whitney_p_value(self):
+        slower = range(20, 30)
+        faster = range(10)
+        assert_that(
+            get_mann_whitney_p_value(slower, faster),
+            less_than(0.001)
+        )
+        assert_that(
+            get_mann_whitney_p_value(faster, slower),
+            greater_than(0.999)
+        )
+
+        # overlapping samples are not significantly different
+        assert_that(
+            get_mann_whitney_p_value(range(2, 12), range(1, 11)),
+            close_to(0.2474, 1e-4)
+        )
+
+    def test_get_mann_whitney_p_value__ties(self):
+        assert_that(
+            get_mann_whitney_p_value([1] * 10, [1] * 10),
+            equal_to(1.0)
+        )
+        assert_that(
+            get_mann_whitney_p_value([1, 2, 2, 2, 3] * 2, [1, 1, 1, 2, 2] * 2),
+            less_than(0.05)
+        )
@@ -0,0 +1,123 @@
+import difflib
+import time
+
+from hamcrest import assert_that, contains_string, equal_to, less_than
+
+from cli_bdd.core import settings
+from cli_bdd.core.diff import format_diff
+from testutils import TestCase
+
+
+class TestFormatDiff(TestCase):
+    def setUp(self):
+        super(TestFormatDiff, self).setUp()
+        self.lines = ['line %s' % i for i in xrange(100000)]
+
+    def tearDown(self):
+        super(TestFormatDiff, self).tearDown()
+        settings.DIFF_TIME_BUDGET = 1.0
+        settings.DIFF_MAX_HUNKS = 10
+
+    def test_short_texts(self):
+        assert_that(
+            format_diff(['hello', 'world'], ['hello']),
+            equal_to('Diff:\n' + '\n'.join(
+                difflib.context_diff(['hello', 'world'], ['hello'])
+            ))
+        )
+
+    def test_long_texts(self):
+        expected = list(self.lines)
+        expected[10] = 'changed'
+        del expected[5000]
+        expected.insert(70000, 'new')
+
+        assert_that(
+            format_diff(self.lines, expected),
+            equal_to('\n'.join([
+                '2 lines removed and 2 lines added in 3 hunks',
+                '@@ -8,7 +8,7 @@',
+                ' line 7',
+                ' line 8',
+                ' line 9',
+                '-line 10',
+                '+changed',
+                ' line 11',
+                ' line 12',
+                ' line 13',
+                '@@ -4998,7 +4998,6 @@',
+                ' line 4997',
+                ' line 4998',
+                ' line 4999',
+                '-line 5000',
+                ' line 5001',
+                ' line 5002',
+                ' line 5003',
+                '@@ -69999,6 +69998,7 @@',
+                ' line 69998',
+                ' line 69999',
+                ' line 70000',
+                '+new',
+                ' line 70001',
+                ' line 70002',
+                ' line 70003',
+            ]))
+        )
+
+    def test_max_hunks(self):
+        settings.DIFF_MAX_HUNKS = 2
+        expected = list(self.lines)
+        for i in xrange(0, 100000, 1000):
+            expected[i] = 'changed'
+
+        diff = format_diff(self.lines, expected).splitlines()
+        assert_that(
+            diff[:2],
+            equal_to([
+                '100 lines removed and 100 lines added in 100 hunks',
+                'First 2 hunks:',
+            ])
+        )
+        assert_that(diff[-1], equal_to(' line 1003'))
+
+    def test_scattered_changes(self):
+        settings.DIFF_TIME_BUDGET = 10.0
+        expected = list(self.lines)
+        for i in xrange(0, 100000, 50):
+            expected[i] = 'changed'
+
+        started = time.time()
+        diff = format_diff(self.lines, expected).splitlines()
+        assert_that(time.time() - started, less_than(5.0))
+        assert_that(
+            diff[0],
+            equal_to('2000 lines removed and 2000 lines added in 2000 hunks')
+        )
+        assert_that(len(diff), less_than(200))
+
+    def test_many_changes(self):
+        expected = ['other line %s' % (i % 10) for i in xrange(100000)]
+
+        diff = format_diff(self.lines, expected).splitlines()
+        assert_that(
+            diff[0],
+            equal_to(
+                '100000 lines removed and 100000 lines added in 1 hunks '
+                '(at most, some ranges were not diffed line by line)'
+            )
+        )
+        assert_that(diff[-1], equal_to('... 199950 more changed lines'))
+
+    def test_time_budget(self):
+        settings.DIFF_TIME_BUDGET = 0
+        expected = list(self.lines)
+        expected[10] = 'changed'
+        expected[-10] = 'changed'
+
+        assert_that(
+            format_diff(self.lines, expected),
+            contains_string(
+                '99981 lines removed and 99981 lines added in 1 hunks '
+                '(at most, some ranges were not diffed line by line)'
+            )
+        )
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import threading
+
+import pexpect
+from hamcrest import (
+    assert_that,
+    contains_string,
+    equal_to,
+    greater_than,
+    is_not
+)
+
+from cli_bdd.core import settings
+from cli_bdd.core.forkserver import get_fork_server, get_fork_server_launch
+from cli_bdd.core.steps.command import get_output, run
+from testutils import TestCase
+
+ENTRY_POINTS = {
+    'greet': 'tests.unit.inprocess.entry_points:greet',
+    'env': 'tests.unit.inprocess.entry_points:env',
+    'fail': 'tests.unit.inprocess.entry_points:fail',
+    'ask': 'tests.unit.inprocess.entry_points:ask',
+}
+
+
+class TestForkServer(TestCase):
+    def setUp(self):
+        super(TestForkServer, self).setUp()
+        settings.FORK_SERVER_ENTRY_POINTS = ENTRY_POINTS
+
+    def tearDown(self):
+        super(TestForkServer, self).tearDown()
+        settings.FORK_SERVER_ENTRY_POINTS = {}
+        settings.NON_INTERACTIVE_BACKEND = 'pty'
+
+    def test_get_fork_server_launch(self):
+        assert_that(
+            get_fork_server_launch('greet "big world"'),
+            equal_to((get_fork_server(), ['greet', 'big world']))
+        )
+        assert_that(get_fork_server_launch('greet | wc'), equal_to(None))
+        assert_that(get_fork_server_launch('ls greet'), equal_to(None))
+
+        settings.FORK_SERVER_ENTRY_POINTS = {}
+        assert_that(get_fork_server_launch('greet world'), equal_to(None))
+
+    def test_run(self):
+        response = run('greet world --shout')
+        assert_that(response['launch'], equal_to('fork-server'))
+        assert_that(response['child'].exitstatus, equal_to(0))
+        assert_that(get_output(response['child']), equal_to('HELLO WORLD\r\n'))
+
+    def test_run__usage(self):
+        for backend in ('pty', 'pipe'):
+            settings.NON_INTERACTIVE_BACKEND = backend
+            usage = run('greet world')['usage']
+            assert_that(usage['wall_time'], greater_than(0))
+            assert_that(usage['max_rss'], greater_than(0))
+            assert_that(usage['user_time'], is_not(None))
+
+    def test_run__exit_status(self):
+        response = run('greet')
+        assert_that(response['child'].exitstatus, equal_to(2))
+        assert_that(
+            get_output(response['child']),
+            contains_string('greet: error: too few arguments')
+        )
+
+        response = run('fail')
+        assert_that(response['child'].exitstatus, equal_to(1))
+        assert_that(
+            get_output(response['child']),
+            contains_string('ValueError: broken')
+        )
+
+    def test_run__non_ascii(self):
+        response = run('greet h\xc3\xa9llo')
+        assert_that(
+            get_output(response['child']),
+            equal_to('hello h\xc3\xa9llo\r\n')
+        )
+
+        child = get_fork_server().spawn(
+            ['ask'],
+            env={'GREETING_PLACE': 'caf\xc3\xa9 \xff'}
+        )
+        child.expect('name\? ')
+        child.sendline('world')
+        child.expect(pexpect.EOF)
+        assert_that(child.wait(), equal_to(0))
+        assert_that(
+            child.before,
+            equal_to('hello world from caf\xc3\xa9 \xff\r\n')
+        )
+
+    def test_run__pipe_backend(self):
+        settings.NON_INTERACTIVE_BACKEND = 'pipe'
+        response = run('greet')
+        assert_that(response['launch'], equal_to('fork-server'))
+        assert_that(response['child'].exitstatus, equal_to(2))
+        assert_that(get_output(response['child'], 'stdout'), equal_to(''))
+        assert_that(
+            get_output(response['child'], 'stderr'),
+            contains_string('greet: error: too few arguments')
+        )
+
+    def test_run__isolation(self):
+        cwd = os.getcwd()
+        tmp_dir = tempfile.mkdtemp()
+        os.environ['GREETING_PLACE'] = 'fork'
+        try:
+            os.chdir(tmp_dir)
+            settings.NON_INTERACTIVE_BACKEND = 'pipe'
+            response = run('env')
+            assert_that(response['child'].exitstatus, equal_to(1))
+            assert_that(
+                get_output(response['child']),
+                equal_to('no inputexit message\n')
+            )
+            assert_that('CLI_BDD_IN_PROCESS' in os.environ, equal_to(False))
+            assert_that(os.getcwd(), equal_to(os.path.realpath(tmp_dir)))
+
+            # the environment of the runner is passed to every command
+            response = run('ask', interactively=True)
+            child = response['child']
+            child.expect('name\? ')
+            child.sendline('world')
+            child.expect(pexpect.EOF)
+            assert_that(child.wait(), equal_to(0))
+            assert_that(
+                child.logfile_read.getvalue(),
+                equal_to('name? hello world from fork\r\n')
+            )
+        finally:
+            del os.environ['GREETING_PLACE']
+            os.chdir(cwd)
+            shutil.rmtree(tmp_dir)
+
+    def test_wait__other_threads(self):
+        server = get_fork_server()
+        child = server.spawn(['ask'])
+        waiter = threading.Thread(target=child.wait)
+        waiter.start()
+        try:
+            # the child waits for input, which doesn't hold up other commands
+            runner = threading.Thread(target=run, args=('greet world',))
+            runner.start()
+            runner.join(5)
+            assert_that(runner.is_alive(), equal_to(False))
+        finally:
+            child.sendline('world')
+            waiter.join()
+        assert_that(child.exitstatus, equal_to(0))
+
+    def test_run__timeout(self):
+        with self.assertRaises(pexpect.TIMEOUT):
+            run('ask', timeout=0.2)
+
+    def test_restart_on_settings_change(self):
+        server = get_fork_server()
+        assert_that(get_fork_server(), equal_to(server))
+
+        settings.FORK_SERVER_ENTRY_POINTS = {
+            'greet': 'tests.unit.inprocess.entry_points:greet',
+        }
+        new_server = get_fork_server()
+        assert_that(new_server, is_not(equal_to(server)))
+        assert_that(server.isalive(), equal_to(False))
+        assert_that(run('ask')['launch'], is_not(equal_to('fork-server')))
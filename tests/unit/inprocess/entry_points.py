@@ -0,0 +1,28 @@
+import argparse
+import os
+import sys
+
+
+def greet():
+    parser = argparse.ArgumentParser(prog='greet')
+    parser.add_argument('name')
+    parser.add_argument('--shout', action='store_true')
+    args = parser.parse_args()
+    greeting = 'hello %s' % args.name
+    print greeting.upper() if args.shout else greeting
+
+
+def env():
+    os.environ['CLI_BDD_IN_PROCESS'] = 'changed'
+    os.chdir('/')
+    sys.stdout.write(sys.stdin.read() or 'no input')
+    return 'exit message'
+
+
+def fail():
+    raise ValueError('broken')
+
+
+def ask():
+    name = raw_input('name? ')
+    print 'hello %s from %s' % (name, os.environ.get('GREETING_PLACE'))
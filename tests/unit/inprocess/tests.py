@@ -0,0 +1,80 @@
+import os
+
+from hamcrest import assert_that, contains_string, equal_to
+
+from cli_bdd.core import settings
+from cli_bdd.core.inprocess import get_in_process_launch, run_in_process
+from cli_bdd.core.steps.command import run
+from testutils import TestCase
+
+from .entry_points import env, fail, greet
+
+ENTRY_POINTS = {
+    'greet': 'tests.unit.inprocess.entry_points:greet',
+    'env': 'tests.unit.inprocess.entry_points:env',
+}
+
+
+class TestRunInProcess(TestCase):
+    def test_me(self):
+        result = run_in_process(greet, ['greet', 'world', '--shout'])
+        assert_that(result.exitstatus, equal_to(0))
+        assert_that(result.logfile_read.getvalue(), equal_to('HELLO WORLD\n'))
+        assert_that(result.logfile_stderr.getvalue(), equal_to(''))
+
+    def test_system_exit(self):
+        result = run_in_process(greet, ['greet'])
+        assert_that(result.exitstatus, equal_to(2))
+        assert_that(
+            result.logfile_stderr.getvalue(),
+            contains_string('greet: error: too few arguments')
+        )
+
+    def test_isolation(self):
+        cwd = os.getcwd()
+        result = run_in_process(env, ['env'], stdin='some input')
+        assert_that(result.exitstatus, equal_to(1))
+        assert_that(result.logfile_read.getvalue(), equal_to('some input'))
+        assert_that(
+            result.logfile_stderr.getvalue(),
+            equal_to('exit message\n')
+        )
+        assert_that(os.getcwd(), equal_to(cwd))
+        assert_that('CLI_BDD_IN_PROCESS' in os.environ, equal_to(False))
+
+    def test_exception(self):
+        result = run_in_process(fail, ['fail'])
+        assert_that(result.exitstatus, equal_to(1))
+        assert_that(
+            result.logfile_stderr.getvalue(),
+            contains_string('ValueError: broken')
+        )
+
+
+class TestInProcessLaunch(TestCase):
+    def setUp(self):
+        super(TestInProcessLaunch, self).setUp()
+        settings.IN_PROCESS_ENTRY_POINTS = ENTRY_POINTS
+
+    def tearDown(self):
+        super(TestInProcessLaunch, self).tearDown()
+        settings.IN_PROCESS_ENTRY_POINTS = {}
+
+    def test_get_in_process_launch(self):
+        assert_that(
+            get_in_process_launch('greet "big world"'),
+            equal_to((greet, ['greet', 'big world']))
+        )
+        assert_that(get_in_process_launch('greet | wc'), equal_to(None))
+        assert_that(get_in_process_launch('ls greet'), equal_to(None))
+
+    def test_run(self):
+        response = run('greet world')
+        assert_that(response['launch'], equal_to('in-process'))
+        assert_that(
+            response['child'].logfile_read.getvalue(),
+            equal_to('hello world\n')
+        )
+
+        response = run('greet world', interactively=True)
+        assert_that(response['launch'], equal_to('shell'))
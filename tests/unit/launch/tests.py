@@ -0,0 +1,148 @@
+import os
+import shutil
+import stat
+import tempfile
+
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core import settings
+from cli_bdd.core.launch import (
+    find_executable,
+    get_direct_launch,
+    launch_stats,
+    split_simple_command
+)
+from cli_bdd.core.steps.command import run
+from testutils import TestCase
+
+
+class TestSplitSimpleCommand(TestCase):
+    def test_simple(self):
+        for command, expected in (
+            ('ls', ['ls']),
+            ('  ls   -la  /tmp ', ['ls', '-la', '/tmp']),
+            ('mytool --flag=value arg', ['mytool', '--flag=value', 'arg']),
+            ('grep "hello world" a.txt', ['grep', 'hello world', 'a.txt']),
+            ("grep 'a|b$' a.txt", ['grep', 'a|b$', 'a.txt']),
+            ('say hel"lo "wor\'ld\'', ['say', 'hello world']),
+            ('say ""', ['say', '']),
+            ('say a#b c~', ['say', 'a#b', 'c~']),
+        ):
+            assert_that(split_simple_command(command), equal_to(expected))
+
+    def test_shell_features(self):
+        for command in (
+            '',
+            'ls | wc -l',
+            'ls > out.txt',
+            'cat < in.txt',
+            'ls && ls',
+            'ls; ls',
+            'sleep 1 &',
+            'ls *.txt',
+            'ls file?.txt',
+            'ls [ab].txt',
+            'echo $HOME',
+            'say "$HOME"',
+            'say `date`',
+            'say "`date`"',
+            'say a\\ b',
+            '(ls)',
+            'ls ~',
+            'ls # comment',
+            'ls "unclosed',
+            'HELLO=world env',
+            'echo hello',
+            'cd /tmp',
+            'exit 1',
+            'ls\nls',
+        ):
+            assert_that(split_simple_command(command), equal_to(None))
+
+
+class TestFindExecutable(TestCase):
+    def setUp(self):
+        super(TestFindExecutable, self).setUp()
+        self.original_path = os.environ.get('PATH')
+        self.bin_path = tempfile.mkdtemp()
+        os.environ['PATH'] = self.bin_path + os.pathsep + self.original_path
+
+    def tearDown(self):
+        super(TestFindExecutable, self).tearDown()
+        os.environ['PATH'] = self.original_path
+        shutil.rmtree(self.bin_path)
+
+    def create_executable(self, name):
+        path = os.path.join(self.bin_path, name)
+        with open(path, 'wt') as ff:
+            ff.write('#!/bin/sh\necho "hello from %s"\n' % name)
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+        return path
+
+    def test_me(self):
+        assert_that(find_executable('cli-bdd-tool'), equal_to(None))
+
+        # not found executables are not cached
+        path = self.create_executable('cli-bdd-tool')
+        assert_that(find_executable('cli-bdd-tool'), equal_to(path))
+
+        # found executables are cached
+        os.remove(path)
+        assert_that(find_executable('cli-bdd-tool'), equal_to(path))
+
+        # paths are checked directly
+        assert_that(find_executable(path), equal_to(None))
+        assert_that(find_executable('/bin/sh'), equal_to('/bin/sh'))
+
+    def test_get_direct_launch(self):
+        path = self.create_executable('cli-bdd-launch')
+        assert_that(
+            get_direct_launch('cli-bdd-launch --flag "a b"'),
+            equal_to((path, ['cli-bdd-launch', '--flag', 'a b']))
+        )
+        assert_that(get_direct_launch('cli-bdd-unknown'), equal_to(None))
+        assert_that(get_direct_launch('cli-bdd-launch | wc'), equal_to(None))
+
+
+class TestRunLaunch(TestCase):
+    def setUp(self):
+        super(TestRunLaunch, self).setUp()
+        settings.DIRECT_EXEC = True
+
+    def tearDown(self):
+        super(TestRunLaunch, self).tearDown()
+        settings.DIRECT_EXEC = False
+        settings.NON_INTERACTIVE_BACKEND = 'pty'
+
+    def test_me(self):
+        for backend in ('pty', 'pipe'):
+            settings.NON_INTERACTIVE_BACKEND = backend
+            launch_stats.clear()
+
+            response = run('cat /')
+            assert_that(response['launch'], equal_to('exec'))
+            assert_that(response['child'].exitstatus, equal_to(1))
+
+            response = run('cat / | wc -l')
+            assert_that(response['launch'], equal_to('shell'))
+
+            assert_that(
+                launch_stats,
+                equal_to({'exec': 1, 'shell': 1})
+            )
+
+    def test_script_without_shebang(self):
+        dir_path = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dir_path, 'script')
+            with open(path, 'wt') as ff:
+                ff.write('echo "hello"\n')
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+            for backend in ('pty', 'pipe'):
+                settings.NON_INTERACTIVE_BACKEND = backend
+                response = run(path)
+                assert_that(response['launch'], equal_to('shell'))
+                assert_that(response['child'].exitstatus, equal_to(0))
+        finally:
+            shutil.rmtree(dir_path)
@@ -0,0 +1,165 @@
+import mmap
+import re
+
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core.output import OutputBuffer, OutputView, find_texts
+from testutils import TestCase
+
+
+class TestOutputBuffer(TestCase):
+    def test_in_memory(self):
+        buffer_ = OutputBuffer(memory_limit=10)
+        buffer_.write('hello')
+        buffer_.write(u'\u0439')
+        assert_that(buffer_.spilled, equal_to(False))
+        assert_that(buffer_.getvalue(), equal_to('hello\xd0\xb9'))
+        assert_that(buffer_.view(), equal_to('hello\xd0\xb9'))
+        assert_that(len(buffer_), equal_to(7))
+
+    def test_spill(self):
+        buffer_ = OutputBuffer(memory_limit=10)
+        buffer_.write('hello ')
+        buffer_.write('world')
+        assert_that(buffer_.spilled, equal_to(True))
+        buffer_.write('!')
+        assert_that(isinstance(buffer_.view(), mmap.mmap), equal_to(True))
+        assert_that(buffer_.getvalue(), equal_to('hello world!'))
+        assert_that(buffer_.find('world'), equal_to(6))
+        assert_that('world!' in buffer_, equal_to(True))
+        assert_that('worlds' in buffer_, equal_to(False))
+
+    def test_max_size(self):
+        buffer_ = OutputBuffer(memory_limit=4, max_size=8)
+        buffer_.write('hello ')
+        assert_that(buffer_.truncated, equal_to(False))
+        assert_that(buffer_.describe_truncation(), equal_to(''))
+        buffer_.write('world')
+        buffer_.write('!')
+        assert_that(buffer_.getvalue(), equal_to('hello wo'))
+        assert_that(buffer_.truncated, equal_to(True))
+        assert_that(buffer_.size, equal_to(12))
+        assert_that(
+            buffer_.describe_truncation(),
+            equal_to('(output was truncated to 8 of 12 bytes)')
+        )
+
+    def test_line_ends(self):
+        buffer_ = OutputBuffer(memory_limit=4)
+        buffer_.write('a\nb')
+        buffer_.write('c\n\nd')
+        assert_that(list(buffer_.line_ends), equal_to([1, 4, 5]))
+        buffer_.truncate(5)
+        assert_that(list(buffer_.line_ends), equal_to([1, 4]))
+
+    def test_truncate(self):
+        for memory_limit in (100, 4):
+            buffer_ = OutputBuffer(memory_limit=memory_limit)
+            buffer_.write('hello')
+            buffer_.getvalue()
+            buffer_.truncate(0)
+            assert_that(buffer_.getvalue(), equal_to(''))
+            buffer_.write('world')
+            assert_that(buffer_.getvalue(), equal_to('world'))
+            buffer_.truncate(2)
+            assert_that(buffer_.getvalue(), equal_to('wo'))
+
+
+class TestFindTexts(TestCase):
+    def test_me(self):
+        assert_that(
+            find_texts(
+                'abcd',
+                ['', 'abc', 'bcd', 'ab', 'b', 'e', 'abcde']
+            ),
+            equal_to(set(['', 'abc', 'bcd', 'ab', 'b']))
+        )
+        assert_that(find_texts('', ['a']), equal_to(set()))
+
+    def test_absent_texts(self):
+        data = 'abcdefghij\n' * 10000
+        texts = ['%sq%s' % (data[i], i) for i in range(100)]
+        assert_that(find_texts(data, texts), equal_to(set()))
+        assert_that(
+            find_texts(data, texts + ['j\nab']),
+            equal_to(set(['j\nab']))
+        )
+
+
+class TestOutputView(TestCase):
+    def get_buffer(self, data, memory_limit=1024):
+        buffer_ = OutputBuffer(memory_limit=memory_limit)
+        buffer_.write(data)
+        return buffer_
+
+    def test_text(self):
+        stdout = self.get_buffer('hello\r\n')
+        stderr = self.get_buffer('world\r\n')
+        view = OutputView([stdout, stderr])
+        assert_that(view.text, equal_to('hello\nworld\n'))
+        assert_that(view.text is view.text, equal_to(True))
+
+        stderr.write('!')
+        assert_that(view.text, equal_to('hello\nworld\n!'))
+
+    def test_contains(self):
+        for memory_limit in (1024, 4):
+            buffer_ = self.get_buffer('hello\r\nworld', memory_limit)
+            view = OutputView([buffer_])
+            assert_that(view.contains('lo'), equal_to(True))
+            assert_that(view.contains('lo\nwo'), equal_to(True))
+            assert_that(view.contains('lo\r\nwo'), equal_to(False))
+            assert_that(view.contains('low'), equal_to(False))
+
+        view = OutputView([self.get_buffer('hel'), self.get_buffer('lo')])
+        assert_that(view.contains('hello'), equal_to(True))
+
+    def test_count_lines(self):
+        for data, count in (
+            ('', 0),
+            (' \r\n', 0),
+            ('hello', 1),
+            ('\r\nhello\r\n\r\nworld\r\n\r\n', 3),
+        ):
+            for memory_limit in (1024, 4):
+                view = OutputView([self.get_buffer(data, memory_limit)])
+                assert_that(view.count_lines(), equal_to(count), data)
+
+        view = OutputView([self.get_buffer('a\n'), self.get_buffer('b\n')])
+        assert_that(view.count_lines(), equal_to(2))
+
+    def test_line(self):
+        buffer_ = self.get_buffer('hello\r\n\r\nworld', memory_limit=4)
+        for view in (
+            OutputView([buffer_]),
+            OutputView([buffer_, self.get_buffer('')]),
+        ):
+            assert_that(view.line(1), equal_to('hello'))
+            assert_that(view.line(2), equal_to(''))
+            assert_that(view.line(3), equal_to('world'))
+            for number in (0, 4):
+                with self.assertRaises(IndexError):
+                    view.line(number)
+
+        view = OutputView([self.get_buffer('hello\n')])
+        with self.assertRaises(IndexError):
+            view.line(2)
+
+    def test_find_texts(self):
+        for memory_limit in (1024, 4):
+            buffer_ = self.get_buffer('hello\r\nworld', memory_limit)
+            view = OutputView([buffer_])
+            assert_that(
+                view.find_texts(['lo', 'lo\nwo', 'lo\r\nwo', 'low']),
+                equal_to(set(['lo', 'lo\nwo']))
+            )
+
+    def test_iter_mismatched_lines(self):
+        pattern = re.compile(r'(?:^\d+)\Z', re.MULTILINE)
+        for memory_limit in (1024, 4):
+            buffer_ = self.get_buffer('1\r\nx2\r\n33\r\n\r\n', memory_limit)
+            view = OutputView([buffer_])
+            assert_that(
+                list(view.iter_mismatched_lines(pattern)),
+                equal_to([(2, 'x2'), (4, '')])
+            )
@@ -0,0 +1,72 @@
+import threading
+
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core.overlay import EnvironmentOverlay
+from testutils import TestCase
+
+
+class TestEnvironmentOverlay(TestCase):
+    def setUp(self):
+        super(TestEnvironmentOverlay, self).setUp()
+        self.base = {'HOME': '/home/gena', 'PATH': '/bin'}
+        self.overlay = EnvironmentOverlay(self.base)
+
+    def test_changes(self):
+        self.overlay['NAME'] = 'gena'
+        self.overlay.append('PATH', ':/usr/bin')
+        self.overlay.prepend('EMPTY', 'value')
+        del self.overlay['HOME']
+
+        assert_that(self.overlay['PATH'], equal_to('/bin:/usr/bin'))
+        assert_that(self.overlay.get('EMPTY'), equal_to('value'))
+        assert_that('HOME' in self.overlay, equal_to(False))
+        assert_that(self.overlay.get('HOME'), equal_to(None))
+        self.assertRaises(KeyError, lambda: self.overlay['HOME'])
+        assert_that(
+            self.overlay.to_dict(),
+            equal_to({
+                'PATH': '/bin:/usr/bin',
+                'NAME': 'gena',
+                'EMPTY': 'value',
+            })
+        )
+        # the base is never changed
+        assert_that(
+            self.base,
+            equal_to({'HOME': '/home/gena', 'PATH': '/bin'})
+        )
+
+    def test_set_deleted_variable(self):
+        del self.overlay['HOME']
+        self.overlay['HOME'] = '/root'
+        assert_that(self.overlay['HOME'], equal_to('/root'))
+        self.assertRaises(KeyError, self.overlay.__delitem__, 'MISSING')
+
+    def test_revert(self):
+        assert_that(self.overlay.changed, equal_to(False))
+        self.overlay['PATH'] = '/usr/bin'
+        del self.overlay['HOME']
+        assert_that(self.overlay.changed, equal_to(True))
+
+        self.overlay.revert()
+        assert_that(self.overlay.changed, equal_to(False))
+        assert_that(self.overlay.to_dict(), equal_to(self.base))
+
+    def test_concurrent_appends(self):
+        def append(index):
+            for _ in xrange(100):
+                self.overlay.append('COUNTER', str(index))
+
+        threads = [
+            threading.Thread(target=append, args=(index,))
+            for index in xrange(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter = self.overlay['COUNTER']
+        assert_that(len(counter), equal_to(500))
+        for index in xrange(5):
+            assert_that(counter.count(str(index)), equal_to(100))
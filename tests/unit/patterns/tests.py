@@ -0,0 +1,46 @@
+import re
+
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core import patterns
+from cli_bdd.core.patterns import compile_pattern, get_flags
+from testutils import TestCase
+
+
+class TestCompilePattern(TestCase):
+    def setUp(self):
+        super(TestCompilePattern, self).setUp()
+        patterns._patterns.clear()
+        self.cache_size = patterns.PATTERN_CACHE_SIZE
+        patterns.PATTERN_CACHE_SIZE = 2
+
+    def tearDown(self):
+        super(TestCompilePattern, self).tearDown()
+        patterns.PATTERN_CACHE_SIZE = self.cache_size
+
+    def test_me(self):
+        first = compile_pattern('a+')
+        assert_that(first.match('aa').group(), equal_to('aa'))
+        assert_that(compile_pattern('a+') is first, equal_to(True))
+        assert_that(
+            compile_pattern('a+', re.IGNORECASE) is first,
+            equal_to(False)
+        )
+
+        # the least recently used pattern is dropped
+        compile_pattern('a+')
+        compile_pattern('b+')
+        assert_that(
+            list(patterns._patterns),
+            equal_to([('a+', 0), ('b+', 0)])
+        )
+        assert_that(compile_pattern('a+') is first, equal_to(True))
+
+
+class TestGetFlags(TestCase):
+    def test_me(self):
+        assert_that(get_flags(None), equal_to(0))
+        assert_that(
+            get_flags('is'),
+            equal_to(re.IGNORECASE | re.DOTALL)
+        )
@@ -0,0 +1,88 @@
+import os
+import time
+
+import pexpect
+from hamcrest import assert_that, equal_to, is_, is_not, none
+
+from cli_bdd.core import settings
+from cli_bdd.core.pool import ShellPool, get_shell_pool, is_poolable
+from testutils import TestCase
+
+
+def wait_for_shells(pool, count=1, timeout=5):
+    deadline = time.time() + timeout
+    while pool._shells.qsize() < count and time.time() < deadline:
+        time.sleep(0.01)
+
+
+class TestShellPool(TestCase):
+    def setUp(self):
+        super(TestShellPool, self).setUp()
+        self.pool = ShellPool(2)
+        wait_for_shells(self.pool, 2)
+
+    def tearDown(self):
+        super(TestShellPool, self).tearDown()
+        self.pool.close()
+
+    def test_checkout(self):
+        child = self.pool.checkout('echo hello; exit 3')
+        assert_that(child, is_not(none()))
+        child.expect(pexpect.EOF)
+        child.close()
+        assert_that(child.before, equal_to('hello\r\n'))
+        assert_that(child.exitstatus, equal_to(3))
+
+    def test_checkout__refills(self):
+        for i in range(3):
+            wait_for_shells(self.pool)
+            child = self.pool.checkout('echo %s' % i)
+            child.expect(pexpect.EOF)
+            assert_that(child.before, equal_to('%s\r\n' % i))
+
+    def test_checkout__not_poolable_command(self):
+        assert_that(self.pool.checkout('echo "one\ntwo"'), is_(none()))
+        assert_that(self.pool.checkout('x' * 5000), is_(none()))
+
+    def test_checkout__changed_environment(self):
+        os.environ['CLI_BDD_POOL_TEST'] = 'changed'
+        try:
+            # shells spawned with previous environment are discarded
+            assert_that(
+                self.pool.checkout('echo $CLI_BDD_POOL_TEST'),
+                is_(none())
+            )
+            wait_for_shells(self.pool)
+            child = self.pool.checkout('echo $CLI_BDD_POOL_TEST')
+            child.expect(pexpect.EOF)
+            assert_that(child.before, equal_to('changed\r\n'))
+        finally:
+            del os.environ['CLI_BDD_POOL_TEST']
+
+
+class TestIsPoolable(TestCase):
+    def test_me(self):
+        assert_that(is_poolable('echo "hello" | wc -l'), equal_to(True))
+        assert_that(is_poolable('echo "one\ntwo"'), equal_to(False))
+        assert_that(is_poolable('printf "\x03"'), equal_to(False))
+
+
+class TestGetShellPool(TestCase):
+    def tearDown(self):
+        super(TestGetShellPool, self).tearDown()
+        settings.SHELL_POOL_SIZE = 0
+        get_shell_pool()
+
+    def test_me(self):
+        assert_that(get_shell_pool(), is_(none()))
+
+        settings.SHELL_POOL_SIZE = 1
+        pool = get_shell_pool()
+        assert_that(pool.size, equal_to(1))
+        assert_that(get_shell_pool(), is_(pool))
+
+        settings.SHELL_POOL_SIZE = 2
+        assert_that(get_shell_pool().size, equal_to(2))
+
+        settings.SHELL_POOL_SIZE = 0
+        assert_that(get_shell_pool(), is_(none()))
@@ -0,0 +1,48 @@
+import time
+
+import pexpect
+from hamcrest import assert_that, calling, equal_to, less_than, raises
+
+from cli_bdd.core.process import PipeProcess
+from testutils import TestCase
+
+
+class TestPipeProcess(TestCase):
+    def test_wait(self):
+        process = PipeProcess('echo "hello"; echo "world" >&2; exit 3')
+        assert_that(process.wait(), equal_to(3))
+        assert_that(process.exitstatus, equal_to(3))
+        assert_that(process.logfile_read.getvalue(), equal_to('hello\n'))
+        assert_that(process.logfile_stderr.getvalue(), equal_to('world\n'))
+        assert_that(process.isalive(), equal_to(False))
+
+    def test_wait__large_output_on_both_streams(self):
+        # would dead lock if the streams were read one after another
+        process = PipeProcess(
+            'head -c 1000000 /dev/zero; head -c 1000000 /dev/zero >&2'
+        )
+        process.wait(timeout=10)
+        assert_that(len(process.logfile_read.getvalue()), equal_to(1000000))
+        assert_that(
+            len(process.logfile_stderr.getvalue()),
+            equal_to(1000000)
+        )
+
+    def test_wait__stdin_is_empty(self):
+        process = PipeProcess('cat')
+        assert_that(process.wait(timeout=5), equal_to(0))
+
+    def test_wait__timeout(self):
+        process = PipeProcess('sleep 5')
+        started_at = time.time()
+        assert_that(
+            calling(process.wait).with_args(timeout=0.1),
+            raises(pexpect.TIMEOUT)
+        )
+        assert_that(time.time() - started_at, less_than(1))
+        assert_that(process.isalive(), equal_to(False))
+
+    def test_wait__signal(self):
+        process = PipeProcess('kill -9 $$')
+        assert_that(process.wait(), equal_to(None))
+        assert_that(process.signalstatus, equal_to(9))
@@ -0,0 +1,35 @@
+from behave.parser import parse_feature
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.behave.runner import get_history_keys
+from testutils import TestCase
+
+
+FEATURE = u'''Feature: history
+
+    Scenario: same
+        When I run `true`
+
+    Scenario: other
+        When I run `true`
+
+    Scenario: same
+        When I run `false`
+'''
+
+
+class TestGetHistoryKeys(TestCase):
+    def test_me(self):
+        feature = parse_feature(
+            FEATURE,
+            filename='/project/features/history.feature'
+        )
+        keys = get_history_keys('/project/features', [feature])
+        assert_that(
+            [keys[id(scenario)] for scenario in feature.walk_scenarios()],
+            equal_to([
+                'history.feature: same',
+                'history.feature: other',
+                'history.feature: same #2',
+            ])
+        )
@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import tempfile
+
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core.schedule import (
+    DEFAULT_DURATION,
+    HISTORY_SAMPLES,
+    DurationHistory,
+    order_longest_first,
+    split_into_shards
+)
+from testutils import TestCase
+
+
+class TestDurationHistory(TestCase):
+    def setUp(self):
+        super(TestDurationHistory, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'history.json')
+
+    def tearDown(self):
+        super(TestDurationHistory, self).tearDown()
+        shutil.rmtree(self.directory)
+
+    def test_get_and_update(self):
+        history = DurationHistory(self.path)
+        assert_that(history.get('a.feature: first'), equal_to(None))
+        history.update({'a.feature: first': 1.0})
+        history.update({'a.feature: first': 3.0, 'a.feature: second': 0.5})
+
+        history = DurationHistory(self.path)
+        assert_that(history.get('a.feature: first'), equal_to(2.0))
+        assert_that(history.get('a.feature: second'), equal_to(0.5))
+        assert_that(os.listdir(self.directory), equal_to(['history.json']))
+
+    def test_update__keeps_last_samples(self):
+        history = DurationHistory(self.path)
+        for duration in range(HISTORY_SAMPLES + 2):
+            history.update({'first': float(duration)})
+        with open(self.path) as history_file:
+            assert_that(
+                json.load(history_file)['first'],
+                equal_to([
+                    float(duration)
+                    for duration in range(2, HISTORY_SAMPLES + 2)
+                ])
+            )
+
+    def test_update__other_process(self):
+        # e.g. the runners of two nodes which share the file
+        first = DurationHistory(self.path)
+        second = DurationHistory(self.path)
+        assert_that(first.get('first'), equal_to(None))
+        assert_that(second.get('second'), equal_to(None))
+        first.update({'first': 1.0})
+        second.update({'second': 2.0})
+
+        history = DurationHistory(self.path)
+        assert_that(history.get('first'), equal_to(1.0))
+        assert_that(history.get('second'), equal_to(2.0))
+
+    def test_broken_file(self):
+        with open(self.path, 'w') as history_file:
+            history_file.write('{')
+        history = DurationHistory(self.path)
+        assert_that(history.get('first'), equal_to(None))
+        history.update({'first': 1.0})
+        assert_that(DurationHistory(self.path).get('first'), equal_to(1.0))
+
+    def test_estimate(self):
+        history = DurationHistory(self.path)
+        assert_that(
+            history.estimate(['first', 'second']),
+            equal_to([DEFAULT_DURATION, DEFAULT_DURATION])
+        )
+        history.update({'first': 1.0, 'second': 2.0, 'third': 6.0})
+        # the unknown scenario is expected to take the median of all
+        assert_that(
+            history.estimate(['third', 'unknown', 'first']),
+            equal_to([6.0, 2.0, 1.0])
+        )
+
+
+class TestOrderLongestFirst(TestCase):
+    def test_me(self):
+        assert_that(
+            order_longest_first([1.0, 5.0, 1.0, 3.0]),
+            equal_to([1, 3, 0, 2])
+        )
+
+
+class TestSplitIntoShards(TestCase):
+    def test_me(self):
+        durations = [2.0, 7.0, 3.0, 5.0, 4.0, 6.0, 3.0]
+        shards = split_into_shards(durations, 3)
+        assert_that(shards, equal_to([[1, 6], [5, 2, 0], [3, 4]]))
+        assert_that(
+            [sum(durations[index] for index in shard) for shard in shards],
+            equal_to([10.0, 11.0, 9.0])
+        )
+
+    def test_more_shards_than_durations(self):
+        assert_that(
+            split_into_shards([1.0, 2.0], 3),
+            equal_to([[1], [0], []])
+        )
+
+    def test_equal_durations(self):
+        # without a history the scenarios are dealt out in turn
+        assert_that(
+            split_into_shards([1.0] * 5, 2),
+            equal_to([[0, 2, 4], [1, 3]])
+        )
@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+import pexpect
+from hamcrest import assert_that, calling, equal_to, raises
+
+from cli_bdd.core.session import ShellSession
+from testutils import TestCase
+
+
+class TestShellSession(TestCase):
+    def setUp(self):
+        super(TestShellSession, self).setUp()
+        self.session = ShellSession()
+
+    def tearDown(self):
+        super(TestShellSession, self).tearDown()
+        self.session.close()
+
+    def test_run(self):
+        result = self.session.run('echo "hello"')
+        assert_that(result.logfile_read.getvalue(), equal_to('hello\r\n'))
+        assert_that(result.exitstatus, equal_to(0))
+        pid = self.session.child.pid
+
+        # output without new line and exit status of the latest command only
+        result = self.session.run('printf "world"; exit 2')
+        assert_that(result.logfile_read.getvalue(), equal_to('world'))
+        assert_that(result.exitstatus, equal_to(2))
+
+        # the same shell is used
+        assert_that(self.session.child.pid, equal_to(pid))
+
+    def test_run__commands_are_isolated(self):
+        self.session.run('cd / && hello=world')
+        result = self.session.run('pwd; echo "[$hello]"')
+        assert_that(
+            result.logfile_read.getvalue(),
+            equal_to('%s\r\n[]\r\n' % os.getcwd())
+        )
+
+    def test_run__synchronizes_environment_and_working_directory(self):
+        old_path = os.getcwd()
+        self.session.run('true')
+        os.environ['CLI_BDD_SESSION_TEST'] = "it's me"
+        os.chdir(os.path.realpath(tempfile.gettempdir()))
+        try:
+            result = self.session.run('echo $CLI_BDD_SESSION_TEST; pwd')
+            assert_that(
+                result.logfile_read.getvalue(),
+                equal_to("it's me\r\n%s\r\n" % os.getcwd())
+            )
+        finally:
+            os.chdir(old_path)
+            del os.environ['CLI_BDD_SESSION_TEST']
+
+        result = self.session.run('echo "[$CLI_BDD_SESSION_TEST]"')
+        assert_that(result.logfile_read.getvalue(), equal_to('[]\r\n'))
+
+    def test_run__timeout(self):
+        assert_that(
+            calling(self.session.run).with_args('sleep 1', timeout=0.1),
+            raises(pexpect.TIMEOUT)
+        )
+        assert_that(self.session.child, equal_to(None))
+
+        # the next command starts a new shell
+        result = self.session.run('echo "hello"')
+        assert_that(result.logfile_read.getvalue(), equal_to('hello\r\n'))
+
+    def test_can_run(self):
+        assert_that(self.session.can_run('echo "hello"'), equal_to(True))
+        assert_that(self.session.can_run('echo "one\ntwo"'), equal_to(False))
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from hamcrest import assert_that, equal_to
+from mock import Mock
+
+from cli_bdd.behave.steps import environment as behave_environment
+from cli_bdd.behave.steps import file as behave_file
+from cli_bdd.core.steps.environment import get_environment
+from cli_bdd.lettuce.steps import file as lettuce_file
+from testutils import TestCase
+
+INVOCATIONS = 2000
+THREADS = 16
+
+
+class TestConcurrentSteps(TestCase):
+    """Steps are shared by all the scenarios, so concurrent invocations must
+    not see the state of each other."""
+
+    def setUp(self):
+        super(TestConcurrentSteps, self).setUp()
+        self.dir_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir_path)
+
+    def run_concurrently(self, invoke):
+        pool = ThreadPool(THREADS)
+        try:
+            return pool.map(invoke, xrange(INVOCATIONS), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+    def test_behave_steps(self):
+        def invoke(index):
+            context = Mock(spec=[])
+            context.table = [{'variable': 'INDEX', 'value': str(index)}]
+            context.text = None
+            behave_environment.set_the_environment_variables(context)
+            return get_environment(context)['INDEX']
+
+        assert_that(
+            self.run_concurrently(invoke),
+            equal_to([str(index) for index in xrange(INVOCATIONS)])
+        )
+
+    def test_behave_file_steps(self):
+        def create_file(file_path, text):
+            context = Mock(spec=[])
+            context.table = None
+            context.text = text
+            behave_file.create_file_with_multiline_content(
+                context,
+                file_path=file_path
+            )
+
+        self.check_file_steps(create_file)
+
+    def test_lettuce_steps(self):
+        def create_file(file_path, text):
+            step_context = Mock()
+            step_context.multiline = text
+            lettuce_file.create_file_with_multiline_content(
+                step_context,
+                file_path=file_path
+            )
+
+        self.check_file_steps(create_file)
+
+    def check_file_steps(self, create_file):
+        def invoke(index):
+            file_path = os.path.join(self.dir_path, '%s.txt' % index)
+            create_file(file_path, str(index))
+            with open(file_path) as created:
+                return created.read()
+
+        assert_that(
+            self.run_concurrently(invoke),
+            equal_to([str(index) for index in xrange(INVOCATIONS)])
+        )
@@ -1,11 +1,31 @@
 import os
+import shutil
+import signal
+import sys
 import tempfile
+import time
 
 import pexpect
-from hamcrest import assert_that, equal_to
+from hamcrest import (
+    assert_that,
+    contains_string,
+    ends_with,
+    equal_to,
+    greater_than,
+    is_not,
+    less_than,
+    starts_with
+)
+from mock import Mock
 
 from cli_bdd.behave.steps import command as behave_command
-from cli_bdd.core.steps.command import base_steps
+from cli_bdd.core import settings
+from cli_bdd.core.background import stop_background_commands
+from cli_bdd.core.baselines import get_baseline_store
+from cli_bdd.core.pool import get_shell_pool
+from cli_bdd.core.session import ShellSession
+from cli_bdd.core.steps.command import base_steps, get_output
+from cli_bdd.core.steps.environment import get_environment
 from cli_bdd.lettuce.steps import command as lettuce_command
 from testutils import (
     BehaveStepsTestMixin,
@@ -16,6 +36,34 @@ from testutils import (
 
 
 class CommandStepsMixin(object):
+    def test_start_shell_session(self):
+        context = self.execute_module_step('start_shell_session')
+        session = context.shell_session
+        assert_that(isinstance(session, ShellSession), equal_to(True))
+
+        self.execute_module_step(
+            'run_command',
+            context=context,
+            kwargs={
+                'command': 'echo "hello"; exit 3',
+                'timeout': 30
+            }
+        )
+        self.execute_module_step(
+            'exit_status_should_be',
+            context=context,
+            kwargs={
+                'exit_status': '3'
+            }
+        )
+        assert_that(session.child.isalive(), equal_to(True))
+
+        # starting again replaces the session
+        self.execute_module_step('start_shell_session', context=context)
+        assert_that(context.shell_session, is_not(session))
+        assert_that(session.child, equal_to(None))
+        context.shell_session.close()
+
     def test_command_run(self):
         file_path = os.path.join(tempfile.gettempdir(), 'test.txt')
 
@@ -60,6 +108,66 @@ class CommandStepsMixin(object):
                 'Should fail when response is not successfull'
             )
 
+    def test_command_run__environment(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        script_path = os.path.join(directory, 'cli-bdd-greet')
+        with open(script_path, 'w') as script:
+            script.write('#!/bin/sh\necho "hello $CLI_BDD_NAME"\n')
+        os.chmod(script_path, 0o755)
+
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': 'true',
+                'timeout': None
+            }
+        )
+        environment = get_environment(context)
+        environment['CLI_BDD_NAME'] = 'gena'
+        environment.prepend('PATH', directory + os.pathsep)
+        self.execute_module_step(
+            'run_command',
+            context=context,
+            kwargs={
+                'command': 'cli-bdd-greet',
+                'timeout': None
+            }
+        )
+        assert_that(
+            get_output(context.command_response['child']),
+            equal_to('hello gena\r\n')
+        )
+        assert_that('CLI_BDD_NAME' in os.environ, equal_to(False))
+
+    def test_command_run__working_directory(self):
+        directory = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'hello.txt'), 'w') as hello:
+            hello.write('hello from the scenario\n')
+
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': 'true',
+                'timeout': None
+            }
+        )
+        context.working_directory = directory
+        self.execute_module_step(
+            'run_command',
+            context=context,
+            kwargs={
+                'command': 'cat hello.txt',
+                'timeout': None
+            }
+        )
+        assert_that(
+            get_output(context.command_response['child']),
+            equal_to('hello from the scenario\r\n')
+        )
+        assert_that(os.getcwd(), is_not(equal_to(directory)))
+
     def test_run_command_interactively(self):
         file_path = os.path.join(tempfile.gettempdir(), 'test_interactive.txt')
         with open(file_path, 'wr') as ff:
@@ -152,6 +260,127 @@ class CommandStepsMixin(object):
                         'error for invalid dialog match "%s"' % matcher
                     )
 
+    def test_run_command_in_background(self):
+        context = self.execute_module_step(
+            'run_command_in_background',
+            kwargs={
+                'command': 'echo "started"; sleep 1; echo "done"',
+                'name': 'slow',
+            }
+        )
+        self.execute_module_step(
+            'run_command_in_background',
+            context=context,
+            kwargs={
+                'command': 'echo "fast"',
+                'name': 'fast',
+            }
+        )
+
+        self.execute_module_step(
+            'command_output_should_contain_text_within',
+            context=context,
+            kwargs={
+                'name': 'slow',
+                'output': 'output',
+                'text': 'started',
+                'timeout': '5'
+            }
+        )
+        assert_that(
+            context.background_commands['slow'].isalive(),
+            equal_to(True)
+        )
+
+        self.execute_module_step(
+            'wait_for_background_commands',
+            context=context,
+            kwargs={'timeout': None}
+        )
+        self.execute_module_step(
+            'command_output_should_contain_text',
+            context=context,
+            kwargs={
+                'name': 'slow',
+                'output': 'output',
+                'exactly': True
+            },
+            text='started\ndone\n'
+        )
+        self.execute_module_step(
+            'command_exit_status_should_be',
+            context=context,
+            kwargs={
+                'name': 'fast',
+                'exit_status': '0'
+            }
+        )
+
+        try:
+            self.execute_module_step(
+                'command_exit_status_should_be',
+                context=context,
+                kwargs={
+                    'name': 'missing',
+                    'exit_status': '0'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to('There is no background command "missing"')
+            )
+        else:
+            raise AssertionError("Should fail")
+
+    def test_run_command_in_background__stopped_with_scenario(self):
+        context = self.execute_module_step(
+            'run_command_in_background',
+            kwargs={
+                'command': 'sleep 30',
+                'name': 'server',
+            }
+        )
+        server = context.background_commands['server']
+        assert_that(server.isalive(), equal_to(True))
+
+        self.finish_scenario(context)
+        # the command of the previous scenario is gone
+        assert_that(server.isalive(), equal_to(False))
+        assert_that(server.signalstatus, equal_to(signal.SIGKILL))
+        assert_that(context.background_commands, equal_to({}))
+
+    def test_wait_for_background_commands__timeout(self):
+        context = self.execute_module_step(
+            'run_command_in_background',
+            kwargs={
+                'command': 'sleep 5',
+                'name': 'sleeper',
+            }
+        )
+        try:
+            self.execute_module_step(
+                'wait_for_background_commands',
+                context=context,
+                kwargs={'timeout': '0.1'}
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    'Background commands did not finish in 0.1 seconds: '
+                    '"sleeper"'
+                )
+            )
+        else:
+            raise AssertionError("Should fail")
+
+        stop_background_commands(context.background_commands.values())
+        assert_that(
+            context.background_commands['sleeper'].signalstatus,
+            equal_to(signal.SIGKILL)
+        )
+
     def test_output_should_contain_text__stdout(self):
         context = self.execute_module_step(
             'run_command',
@@ -333,156 +562,457 @@ class CommandStepsMixin(object):
             text='No such file or directory'
         )
 
-    def test_output_should_contain_lines__stdout(self):
-        context = self.execute_module_step(
-            'run_command',
-            kwargs={
-                'command': 'echo "hello\nworld\n"',
-                'timeout': 30
-            }
-        )
-
-        # stdout contains lines
-        self.execute_module_step(
-            'output_should_contain_lines',
-            context=context,
-            kwargs={
-                'output': 'output',
-                'count': '2'
-            }
-        )
-
-        # stdout does not contain lines
+    def test_output_should_contain_text__pipe_backend(self):
+        settings.NON_INTERACTIVE_BACKEND = 'pipe'
         try:
+            context = self.execute_module_step(
+                'run_command',
+                context=Mock(spec=[]),
+                kwargs={
+                    'command': 'echo "hello"; echo "world" >&2',
+                    'timeout': 30
+                }
+            )
+        finally:
+            settings.NON_INTERACTIVE_BACKEND = 'pty'
+
+        for output, text, should_not in (
+            ('stdout', 'hello\n', None),
+            ('stdout', 'world', 'not'),
+            ('stderr', 'world\n', None),
+            ('stderr', 'hello', 'not'),
+            ('output', 'hello\nworld\n', None),
+        ):
             self.execute_module_step(
-                'output_should_contain_lines',
+                'output_should_contain_text',
                 context=context,
                 kwargs={
-                    'output': 'output',
-                    'should_not': 'not',
-                    'count': '2'
-                }
+                    'output': output,
+                    'should_not': should_not,
+                },
+                text=text
             )
-        except AssertionError as e:
-            assert_that(
-                str(e),
-                equal_to(
-                    '\n'
-                    'Expected: not <2>\n'
-                    '     but: was <2>\n'
-                )
+
+    def test_output_should_contain_text__truncated(self):
+        settings.OUTPUT_MAX_SIZE = 5
+        try:
+            context = self.execute_module_step(
+                'run_command',
+                kwargs={
+                    'command': 'echo "hello world"',
+                    'timeout': 30
+                }
             )
-        else:
-            raise AssertionError("stdout contains exact number of lines")
+        finally:
+            settings.OUTPUT_MAX_SIZE = None
 
-        # stdout contains at least lines
         self.execute_module_step(
-            'output_should_contain_lines',
+            'output_should_contain_text',
             context=context,
             kwargs={
                 'output': 'output',
-                'comparison': ' at least',
-                'count': '1'
-            }
+            },
+            text='hello'
         )
-
-        # stdout does not contain at least lines
         try:
             self.execute_module_step(
-                'output_should_contain_lines',
+                'output_should_contain_text',
                 context=context,
                 kwargs={
                     'output': 'output',
-                    'comparison': ' at least',
-                    'count': '3'
-                }
+                },
+                text='world'
             )
         except AssertionError as e:
             assert_that(
-                str(e),
-                equal_to(
-                    '\n'
-                    'Expected: a value greater than or equal to <3>\n'
-                    '     but: was <2>\n'
-                )
+                str(e).endswith(
+                    '(output was truncated to 5 of 13 bytes)'
+                ),
+                equal_to(True)
             )
         else:
-            raise AssertionError("stdout contains less than 3 lines")
+            raise AssertionError("Should fail")
 
-        # stdout contains up to lines
+    def test_output_should_contain_text_within(self):
+        context = self.execute_module_step(
+            'run_command_interactively',
+            kwargs={
+                'command': 'echo "started"; read answer; echo "$answer"',
+            }
+        )
+
+        # passes without waiting for the command to finish
         self.execute_module_step(
-            'output_should_contain_lines',
+            'output_should_contain_text_within',
             context=context,
             kwargs={
                 'output': 'output',
-                'comparison': ' up to',
-                'count': '2'
+                'text': 'started',
+                'timeout': '5'
             }
         )
-
-        # stdout does not contain up to lines
         try:
             self.execute_module_step(
-                'output_should_contain_lines',
+                'output_should_contain_text_within',
                 context=context,
                 kwargs={
                     'output': 'output',
-                    'comparison': ' up to',
-                    'count': '1'
+                    'text': 'finished',
+                    'timeout': '0.1'
                 }
             )
         except AssertionError as e:
             assert_that(
                 str(e),
                 equal_to(
-                    '\n'
-                    'Expected: a value less than or equal to <1>\n'
-                    '     but: was <2>\n'
+                    'The output does not contain "finished" within 0.1 seconds'
                 )
             )
         else:
-            raise AssertionError("stdout contains more than 1 line")
+            raise AssertionError("Should fail")
 
-        # stdout contains less than lines
+        # the read output is still available for the interactive dialogs
         self.execute_module_step(
-            'output_should_contain_lines',
+            'got_interactive_dialog',
             context=context,
             kwargs={
-                'output': 'output',
-                'comparison': ' less than',
-                'count': '3'
+                'dialog_matcher': 'started',
+                'timeout': '1'
+            },
+        )
+        self.execute_module_step(
+            'type_into_command',
+            context=context,
+            kwargs={
+                'input_': 'finished',
+            },
+        )
+        self.execute_module_step(
+            'output_should_contain_text_within',
+            context=context,
+            kwargs={
+                'output': 'stdout',
+                'text': 'finished',
+                'timeout': '5'
             }
         )
 
-        # stdout does not contain less than lines
-        try:
+    def test_output_should_contain_text_within__finished_command(self):
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': 'echo "hello"',
+                'timeout': 30
+            }
+        )
+        self.execute_module_step(
+            'output_should_contain_text_within',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'text': 'hello',
+                'timeout': '0'
+            }
+        )
+        with self.assertRaises(AssertionError):
             self.execute_module_step(
-                'output_should_contain_lines',
+                'output_should_contain_text_within',
                 context=context,
                 kwargs={
                     'output': 'output',
-                    'comparison': ' less than',
-                    'count': '2'
+                    'text': 'world',
+                    'timeout': '30'
                 }
             )
-        except AssertionError as e:
-            assert_that(
-                str(e),
-                equal_to(
-                    '\n'
-                    'Expected: a value less than <2>\n'
-                    '     but: was <2>\n'
-                )
-            )
-        else:
-            raise AssertionError("stdout contains exact 2 lines")
 
-        # stdout contains more than lines
-        self.execute_module_step(
-            'output_should_contain_lines',
-            context=context,
+    def test_output_should_contain_texts(self):
+        context = self.execute_module_step(
+            'run_command',
             kwargs={
-                'output': 'output',
+                'command': 'printf "hello\\nworld\\n"',
+                'timeout': 30
+            }
+        )
+        table = [
+            {'text': 'hello'},
+            {'text': 'o\nw'},
+            {'text': 'low'},
+            {'text': 'world'},
+            {'text': 'bye'},
+        ]
+
+        self.execute_module_step(
+            'output_should_contain_texts',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'quantifier': 'all'
+            },
+            table=table[:2] + table[3:4]
+        )
+        self.execute_module_step(
+            'output_should_contain_texts',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'quantifier': 'none'
+            },
+            table=[table[2], table[4]]
+        )
+
+        for quantifier, message in (
+            ('all', 'The output does not contain:\nlow\nbye'),
+            ('none', 'The output contains:\nhello\no\nw\nworld'),
+        ):
+            try:
+                self.execute_module_step(
+                    'output_should_contain_texts',
+                    context=context,
+                    kwargs={
+                        'output': 'output',
+                        'quantifier': quantifier
+                    },
+                    table=table
+                )
+            except AssertionError as e:
+                assert_that(str(e), equal_to(message))
+            else:
+                raise AssertionError("Should fail")
+
+    def test_output_should_match(self):
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': 'printf "3 files copied\\nDone\\n"',
+                'timeout': 30
+            }
+        )
+
+        for kwargs in (
+            {'pattern': '\\d+ files? copied'},
+            {'pattern': '^done$', 'flags': 'mi'},
+            {'pattern': 'copied.Done', 'flags': 's'},
+            {'pattern': 'error', 'should_not': 'not'},
+        ):
+            kwargs['output'] = 'output'
+            self.execute_module_step(
+                'output_should_match',
+                context=context,
+                kwargs=kwargs
+            )
+
+        for kwargs, message in (
+            (
+                {'pattern': '^done$'},
+                'The output does not match /^done$/'
+            ),
+            (
+                {'pattern': '\\d+', 'should_not': 'not'},
+                'The output matches /\\d+/: "3"'
+            ),
+        ):
+            kwargs['output'] = 'output'
+            try:
+                self.execute_module_step(
+                    'output_should_match',
+                    context=context,
+                    kwargs=kwargs
+                )
+            except AssertionError as e:
+                assert_that(str(e), equal_to(message))
+            else:
+                raise AssertionError("Should fail")
+
+    def test_every_output_line_should_match(self):
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': 'printf "a=1\\nb=2\\nc=x\\n\\nD=4\\n"',
+                'timeout': 30
+            }
+        )
+
+        self.execute_module_step(
+            'every_output_line_should_match',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'pattern': '(^[a-z]=.|)',
+                'flags': 'i'
+            }
+        )
+        try:
+            self.execute_module_step(
+                'every_output_line_should_match',
+                context=context,
+                kwargs={
+                    'output': 'output',
+                    'pattern': '[a-z]=\\d'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    '3 lines of the output do not match /[a-z]=\\d/:\n'
+                    '3: c=x\n'
+                    '4: \n'
+                    '5: D=4'
+                )
+            )
+        else:
+            raise AssertionError("Should fail")
+
+    def test_output_should_contain_lines__stdout(self):
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': 'echo "hello\nworld\n"',
+                'timeout': 30
+            }
+        )
+
+        # stdout contains lines
+        self.execute_module_step(
+            'output_should_contain_lines',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'count': '2'
+            }
+        )
+
+        # stdout does not contain lines
+        try:
+            self.execute_module_step(
+                'output_should_contain_lines',
+                context=context,
+                kwargs={
+                    'output': 'output',
+                    'should_not': 'not',
+                    'count': '2'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    '\n'
+                    'Expected: not <2>\n'
+                    '     but: was <2>\n'
+                )
+            )
+        else:
+            raise AssertionError("stdout contains exact number of lines")
+
+        # stdout contains at least lines
+        self.execute_module_step(
+            'output_should_contain_lines',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'comparison': ' at least',
+                'count': '1'
+            }
+        )
+
+        # stdout does not contain at least lines
+        try:
+            self.execute_module_step(
+                'output_should_contain_lines',
+                context=context,
+                kwargs={
+                    'output': 'output',
+                    'comparison': ' at least',
+                    'count': '3'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    '\n'
+                    'Expected: a value greater than or equal to <3>\n'
+                    '     but: was <2>\n'
+                )
+            )
+        else:
+            raise AssertionError("stdout contains less than 3 lines")
+
+        # stdout contains up to lines
+        self.execute_module_step(
+            'output_should_contain_lines',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'comparison': ' up to',
+                'count': '2'
+            }
+        )
+
+        # stdout does not contain up to lines
+        try:
+            self.execute_module_step(
+                'output_should_contain_lines',
+                context=context,
+                kwargs={
+                    'output': 'output',
+                    'comparison': ' up to',
+                    'count': '1'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    '\n'
+                    'Expected: a value less than or equal to <1>\n'
+                    '     but: was <2>\n'
+                )
+            )
+        else:
+            raise AssertionError("stdout contains more than 1 line")
+
+        # stdout contains less than lines
+        self.execute_module_step(
+            'output_should_contain_lines',
+            context=context,
+            kwargs={
+                'output': 'output',
+                'comparison': ' less than',
+                'count': '3'
+            }
+        )
+
+        # stdout does not contain less than lines
+        try:
+            self.execute_module_step(
+                'output_should_contain_lines',
+                context=context,
+                kwargs={
+                    'output': 'output',
+                    'comparison': ' less than',
+                    'count': '2'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    '\n'
+                    'Expected: a value less than <2>\n'
+                    '     but: was <2>\n'
+                )
+            )
+        else:
+            raise AssertionError("stdout contains exact 2 lines")
+
+        # stdout contains more than lines
+        self.execute_module_step(
+            'output_should_contain_lines',
+            context=context,
+            kwargs={
+                'output': 'output',
                 'comparison': ' more than',
                 'count': '1'
             }
@@ -549,108 +1079,835 @@ class CommandStepsMixin(object):
                     'should_not': 'not',
                     'exit_status': '1'
                 }
-            )
-        except AssertionError:
-            pass
-        else:
-            raise AssertionError("exit status equals 1")
-
-
-class TestCommandStepsSentenceRegex(StepsSentenceRegexTestMixin, TestCase):
-    steps = base_steps
-    step_experiments = {
-        'run_command': [
+            )
+        except AssertionError:
+            pass
+        else:
+            raise AssertionError("exit status equals 1")
+
+    def test_run_commands_concurrently(self):
+        started = time.time()
+        context = self.execute_module_step(
+            'run_commands_concurrently',
+            kwargs={
+                'workers': '4'
+            },
+            table=[
+                {'command': 'sleep 0.3; echo %s' % i}
+                for i in range(4)
+            ]
+        )
+        assert_that(time.time() - started, less_than(1.2))
+        results = context.concurrent_commands
+        assert_that(
+            [result['command'] for result in results],
+            equal_to(['sleep 0.3; echo %s' % i for i in range(4)])
+        )
+        for i, result in enumerate(results):
+            assert_that(result['child'].logfile_read.getvalue().strip(),
+                        equal_to(str(i)))
+            assert_that(result['duration'], greater_than(0.25))
+        self.execute_module_step(
+            'all_commands_should_exit_with',
+            context=context,
+            kwargs={
+                'exit_status': '0'
+            }
+        )
+
+        context = self.execute_module_step(
+            'run_commands_concurrently',
+            table=[
+                {'command': 'echo fine'},
+                {'command': 'echo oops; exit 3'},
+            ]
+        )
+        try:
+            self.execute_module_step(
+                'all_commands_should_exit_with',
+                context=context,
+                kwargs={
+                    'exit_status': '0'
+                }
+            )
+        except AssertionError as e:
+            message = str(e)
+            assert_that(
+                message,
+                starts_with(
+                    '1 of 2 commands did not exit with 0:\n'
+                    '`echo oops; exit 3` exited with 3 in '
+                )
+            )
+            assert_that(message, ends_with(' seconds:\noops'))
+        else:
+            raise AssertionError("Should fail")
+
+    def test_command_resource_usage(self):
+        context = self.execute_module_step(
+            'run_command',
+            kwargs={
+                'command': (
+                    '%s -c "import time; t = time.time()\n'
+                    'while time.time() - t < 0.2: pass"'
+                ) % sys.executable,
+                'timeout': 30
+            }
+        )
+        usage = context.command_response['usage']
+        assert_that(usage['wall_time'], greater_than(0.2))
+        # the busy loop competes for the CPU with the other tests, so only
+        # some CPU time is certain
+        assert_that(usage['user_time'] + usage['system_time'],
+                    greater_than(0))
+
+        self.execute_module_step(
+            'command_should_finish_in',
+            context=context,
+            kwargs={
+                'seconds': '10'
+            }
+        )
+        self.execute_module_step(
+            'command_should_use_cpu_time',
+            context=context,
+            kwargs={
+                'seconds': '10'
+            }
+        )
+        self.execute_module_step(
+            'command_should_use_memory',
+            context=context,
+            kwargs={
+                'size': '1',
+                'unit': 'GB'
+            }
+        )
+
+        for func_name, kwargs, message in (
+            (
+                'command_should_finish_in',
+                {'seconds': '0.1'},
+                'The command took '
+            ),
+            (
+                'command_should_use_cpu_time',
+                {'seconds': '0.01'},
+                'The command used '
+            ),
+            (
+                'command_should_use_memory',
+                {'size': '100', 'unit': 'KB'},
+                'The command used '
+            ),
+        ):
+            try:
+                self.execute_module_step(
+                    func_name,
+                    context=context,
+                    kwargs=kwargs
+                )
+            except AssertionError as e:
+                assert_that(str(e), starts_with(message))
+            else:
+                raise AssertionError("Should fail")
+
+    def test_command_resource_usage__interactive(self):
+        context = self.execute_module_step(
+            'run_command_interactively',
+            kwargs={
+                'command': 'echo hello'
+            }
+        )
+        assert_that(
+            'usage' in context.command_response,
+            equal_to(False)
+        )
+        self.execute_module_step(
+            'command_should_use_memory',
+            context=context,
+            kwargs={
+                'size': '1',
+                'unit': 'GB'
+            }
+        )
+
+    def test_command_response_time(self):
+        context = self.execute_module_step(
+            'run_command_interactively',
+            kwargs={
+                'command': (
+                    'sleep 0.2; echo "Name:"; read name; sleep 0.1; '
+                    'echo "Hello, $name"'
+                )
+            }
+        )
+        self.execute_module_step(
+            'command_should_start_responding_in',
+            context=context,
+            kwargs={
+                'seconds': '5'
+            }
+        )
+        timeline = context.command_response['timeline']
+        assert_that(timeline.get_latency('spawn'), greater_than(0.15))
+
+        self.execute_module_step(
+            'got_interactive_dialog',
+            context=context,
+            kwargs={
+                'dialog_matcher': 'Name:',
+                'timeout': '1'
+            }
+        )
+        self.execute_module_step(
+            'type_into_command',
+            context=context,
+            kwargs={
+                'input_': 'Bob'
+            }
+        )
+        try:
+            self.execute_module_step(
+                'command_should_respond_to_input_in',
+                context=context,
+                kwargs={
+                    'seconds': '0.01'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to('The command did not output anything in 0.01 seconds')
+            )
+        else:
+            raise AssertionError("Should fail")
+        self.execute_module_step(
+            'command_should_respond_to_input_in',
+            context=context,
+            kwargs={
+                'seconds': '5'
+            }
+        )
+        assert_that(timeline.get_latency('input'), greater_than(0.05))
+        assert_that(
+            [(name, detail) for name, _, detail in timeline.events],
+            equal_to([
+                ('spawn', None),
+                ('output', None),
+                ('dialog', 'Name:'),
+                ('input', 'Bob'),
+                ('output', None),
+            ])
+        )
+
+        try:
+            self.execute_module_step(
+                'command_should_respond_to_input_in',
+                context=context,
+                kwargs={
+                    'seconds': '0.05'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                starts_with('The command responded in 0.')
+            )
+        else:
+            raise AssertionError("Should fail")
+
+    def test_benchmark_command__no_runs(self):
+        try:
+            self.execute_module_step(
+                'benchmark_command',
+                kwargs={
+                    'command': 'echo done',
+                    'runs': '0'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    'The command should be benchmarked at least once, got 0 '
+                    'runs'
+                )
+            )
+        else:
+            raise AssertionError("Should fail")
+
+    def test_benchmark_command(self):
+        context = self.execute_module_step(
+            'benchmark_command',
+            kwargs={
+                'command': 'sleep 0.01; echo done',
+                'runs': '5',
+                'warmup_runs': '2'
+            }
+        )
+        assert_that(len(context.benchmark['samples']), equal_to(5))
+        assert_that(
+            context.benchmark['statistics']['min'],
+            greater_than(0.01)
+        )
+        assert_that(
+            context.command_response['child'].logfile_read.getvalue(),
+            equal_to('done\r\n')
+        )
+
+        self.execute_module_step(
+            'run_time_should_be_less_than',
+            context=context,
+            kwargs={
+                'statistic': 'median',
+                'duration': '5',
+                'unit': 'seconds'
+            }
+        )
+        try:
+            self.execute_module_step(
+                'run_time_should_be_less_than',
+                context=context,
+                kwargs={
+                    'statistic': 'p95',
+                    'duration': '10',
+                    'unit': 'ms'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                starts_with(
+                    'The p95 run time of `sleep 0.01; echo done` is '
+                )
+            )
+            assert_that(str(e), contains_string('(5 runs: min '))
+        else:
+            raise AssertionError("Should fail")
+
+    def test_command_should_not_be_slower_than_baseline(self):
+        directory = tempfile.mkdtemp()
+        settings.BASELINES_PATH = os.path.join(directory, 'baselines.json')
+        settings.BASELINE_SAMPLES = 3
+        try:
+            context = self.execute_module_step(
+                'run_command',
+                kwargs={
+                    'command': 'sleep 0.02',
+                    'timeout': 30
+                }
+            )
+            context.feature = Mock()
+            context.feature.name = 'Performance'
+            context.scenario = Mock(feature=context.feature)
+            context.scenario.name = 'Sleep'
+
+            try:
+                self.execute_module_step(
+                    'command_should_not_be_slower_than_baseline',
+                    context=context,
+                    kwargs={
+                        'percent': '10'
+                    }
+                )
+            except AssertionError as e:
+                assert_that(
+                    str(e),
+                    starts_with('There is no baseline of `sleep 0.02` in ')
+                )
+            else:
+                raise AssertionError("Should fail")
+
+            settings.UPDATE_BASELINES = True
+            self.execute_module_step(
+                'command_should_not_be_slower_than_baseline',
+                context=context,
+                kwargs={
+                    'percent': '10'
+                }
+            )
+            settings.UPDATE_BASELINES = False
+            baseline = get_baseline_store().get(
+                'Performance',
+                'Sleep',
+                'sleep 0.02'
+            )
+            assert_that(len(baseline['samples']), equal_to(3))
+
+            self.execute_module_step(
+                'command_should_not_be_slower_than_baseline',
+                context=context,
+                kwargs={
+                    'percent': '1000'
+                }
+            )
+
+            get_baseline_store().set(
+                'Performance',
+                'Sleep',
+                'sleep 0.02',
+                [0.001] * 3
+            )
+            try:
+                self.execute_module_step(
+                    'command_should_not_be_slower_than_baseline',
+                    context=context,
+                    kwargs={
+                        'percent': '10'
+                    }
+                )
+            except AssertionError as e:
+                assert_that(
+                    str(e),
+                    contains_string(
+                        'The command `sleep 0.02` is '
+                    )
+                )
+                assert_that(
+                    str(e),
+                    contains_string('slower than the baseline: median ')
+                )
+            else:
+                raise AssertionError("Should fail")
+        finally:
+            settings.BASELINES_PATH = 'performance_baselines.json'
+            settings.BASELINE_SAMPLES = 5
+            settings.UPDATE_BASELINES = False
+            shutil.rmtree(directory)
+
+    def test_command_should_not_be_slower_than_baseline__scenario(self):
+        directory = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        settings.BASELINES_PATH = os.path.join(directory, 'baselines.json')
+        settings.BASELINE_SAMPLES = 3
+        settings.UPDATE_BASELINES = True
+        try:
+            context = self.execute_module_step(
+                'run_command',
+                kwargs={
+                    'command': 'true',
+                    'timeout': None
+                }
+            )
+            context.feature = Mock()
+            context.feature.name = 'Performance'
+            context.scenario = Mock(feature=context.feature)
+            context.scenario.name = 'Scenario'
+            get_environment(context)['CLI_BDD_NAME'] = 'gena'
+            context.working_directory = directory
+            self.execute_module_step(
+                'run_command',
+                context=context,
+                kwargs={
+                    'command': 'echo "$CLI_BDD_NAME" >> runs.log',
+                    'timeout': None
+                }
+            )
+            self.execute_module_step(
+                'command_should_not_be_slower_than_baseline',
+                context=context,
+                kwargs={
+                    'percent': '10'
+                }
+            )
+        finally:
+            settings.BASELINES_PATH = 'performance_baselines.json'
+            settings.BASELINE_SAMPLES = 5
+            settings.UPDATE_BASELINES = False
+
+        # the runs of the baseline step are in the same scenario
+        with open(os.path.join(directory, 'runs.log')) as runs:
+            assert_that(runs.read(), equal_to('gena\n' * 3))
+
+    def test_compare_commands__no_runs(self):
+        try:
+            self.execute_module_step(
+                'compare_commands',
+                kwargs={
+                    'old_command': 'echo old',
+                    'new_command': 'echo new',
+                    'runs': '0'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                equal_to(
+                    'The commands should be compared over at least one run, '
+                    'got 0 runs'
+                )
+            )
+        else:
+            raise AssertionError("Should fail")
+
+    def test_compare_commands(self):
+        context = self.execute_module_step(
+            'compare_commands',
+            kwargs={
+                'old_command': 'sleep 0.05; echo old',
+                'new_command': 'echo new',
+                'runs': '10'
+            }
+        )
+        assert_that(len(context.comparison['old_samples']), equal_to(10))
+        assert_that(len(context.comparison['new_samples']), equal_to(10))
+        assert_that(
+            context.command_response['child'].logfile_read.getvalue(),
+            equal_to('new\r\n')
+        )
+        self.execute_module_step(
+            'new_command_should_be_fast',
+            context=context,
+            kwargs={
+                'comparison': 'at least as fast'
+            }
+        )
+        self.execute_module_step(
+            'new_command_should_be_fast',
+            context=context,
+            kwargs={
+                'comparison': 'faster'
+            }
+        )
+
+        context.comparison['old_samples'], context.comparison[
+            'new_samples'
+        ] = context.comparison['new_samples'], context.comparison[
+            'old_samples'
+        ]
+        try:
+            self.execute_module_step(
+                'new_command_should_be_fast',
+                context=context,
+                kwargs={
+                    'comparison': 'at least as fast'
+                }
+            )
+        except AssertionError as e:
+            assert_that(
+                str(e),
+                starts_with(
+                    'The new command `echo new` is slower than the old one '
+                    '`sleep 0.05; echo old`: median '
+                )
+            )
+            assert_that(str(e), contains_string(' over 10 runs each (p = '))
+        else:
+            raise AssertionError("Should fail")
+
+    def test_stream_through_command(self):
+        context = self.execute_module_step(
+            'stream_through_command',
+            kwargs={
+                'size': '2',
+                'unit': 'MB',
+                'command': 'wc -c; echo done >&2'
+            }
+        )
+        child = context.command_response['child']
+        assert_that(child.input_size, equal_to(2 * 1024 * 1024))
+        self.execute_module_step(
+            'exit_status_should_be',
+            context=context,
+            kwargs={
+                'exit_status': '0'
+            }
+        )
+        self.execute_module_step(
+            'output_should_contain_text',
+            context=context,
+            kwargs={
+                'output': 'stderr'
+            },
+            text='done'
+        )
+        self.execute_module_step(
+            'throughput_should_be_at_least',
+            context=context,
+            kwargs={
+                'rate': '1',
+                'unit': 'KB'
+            }
+        )
+        try:
+            self.execute_module_step(
+                'throughput_should_be_at_least',
+                context=context,
+                kwargs={
+                    'rate': '1000',
+                    'unit': 'GB'
+                }
+            )
+        except AssertionError as e:
+            assert_that(str(e), starts_with('The throughput is '))
+            assert_that(
+                str(e),
+                contains_string('(2097152 bytes in, 8 bytes out in ')
+            )
+        else:
+            raise AssertionError("Should fail")
+
+    def test_stream_through_command__file(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            input_file.write('a\n')
+            input_file.flush()
+            context = self.execute_module_step(
+                'stream_through_command',
+                kwargs={
+                    'size': '10',
+                    'unit': 'bytes',
+                    'path': input_file.name,
+                    'command': 'sort | uniq -c >&2'
+                }
+            )
+        self.execute_module_step(
+            'output_should_contain_text',
+            context=context,
+            kwargs={
+                'output': 'stderr'
+            },
+            text='5 a'
+        )
+
+
+class TestCommandStepsSentenceRegex(StepsSentenceRegexTestMixin, TestCase):
+    steps = base_steps
+    step_experiments = {
+        'start_shell_session': [
+            {
+                'value': 'a shell session',
+                'expected': {
+                    'kwargs': {}
+                }
+            }
+        ],
+        'run_command': [
+            {
+                'value': 'I run `sosisa`',
+                'expected': {
+                    'kwargs': {
+                        'command': 'sosisa',
+                        'timeout': None
+                    }
+                }
+            }
+        ],
+        'successfully_run_command': [
+            {
+                'value': 'I successfully run `sosisa`',
+                'expected': {
+                    'kwargs': {
+                        'command': 'sosisa'
+                    }
+                }
+            }
+        ],
+        'run_command_interactively': [
+            {
+                'value': 'I run `sosisa` interactively',
+                'expected': {
+                    'kwargs': {
+                        'command': 'sosisa'
+                    }
+                }
+            }
+        ],
+        'type_into_command': [
+            {
+                'value': 'I type "sosisa"',
+                'expected': {
+                    'kwargs': {
+                        'input_': 'sosisa'
+                    }
+                }
+            }
+        ],
+        'got_interactive_dialog': [
+            {
+                'value': (
+                    'I got "Password:" for interactive dialog in 1 second'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'dialog_matcher': 'Password:',
+                        'timeout': '1'
+                    }
+                }
+            },
+            {
+                'value': (
+                    'I got "Name .*: " for interactive dialog in 0.05 seconds'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'dialog_matcher': 'Name .*: ',
+                        'timeout': '0.05'
+                    }
+                }
+            },
+            {
+                'value': 'I got "Login:" for interactive dialog',
+                'expected': {
+                    'kwargs': {
+                        'dialog_matcher': 'Login:',
+                        'timeout': None
+                    }
+                }
+            },
+        ],
+        'output_should_contain_text': [
+            {
+                'value': 'the output should contain',
+                'expected': {
+                    'kwargs': {
+                        'output': 'output',
+                        'should_not': None,
+                        'exactly': None
+                    }
+                }
+            },
+            {
+                'value': 'the stderr should not contain exactly',
+                'expected': {
+                    'kwargs': {
+                        'output': 'stderr',
+                        'should_not': 'not',
+                        'exactly': 'exactly'
+                    }
+                }
+            },
+        ],
+        'run_command_in_background': [
+            {
+                'value': 'I run `make serve` in the background as "server"',
+                'expected': {
+                    'kwargs': {
+                        'command': 'make serve',
+                        'name': 'server'
+                    }
+                }
+            },
+        ],
+        'wait_for_background_commands': [
             {
-                'value': 'I run `sosisa`',
+                'value': 'I wait for all background commands',
                 'expected': {
                     'kwargs': {
-                        'command': 'sosisa',
                         'timeout': None
                     }
                 }
-            }
-        ],
-        'successfully_run_command': [
+            },
             {
-                'value': 'I successfully run `sosisa`',
+                'value': 'I wait for all background commands in 1.5 seconds',
                 'expected': {
                     'kwargs': {
-                        'command': 'sosisa'
+                        'timeout': '1.5'
                     }
                 }
-            }
+            },
         ],
-        'run_command_interactively': [
+        'command_output_should_contain_text': [
             {
-                'value': 'I run `sosisa` interactively',
+                'value': 'the command "server" stderr should not contain',
                 'expected': {
                     'kwargs': {
-                        'command': 'sosisa'
+                        'name': 'server',
+                        'output': 'stderr',
+                        'should_not': 'not',
+                        'exactly': None
                     }
                 }
-            }
+            },
         ],
-        'type_into_command': [
+        'command_exit_status_should_be': [
             {
-                'value': 'I type "sosisa"',
+                'value': 'the command "client" exit status should be 0',
                 'expected': {
                     'kwargs': {
-                        'input_': 'sosisa'
+                        'name': 'client',
+                        'should_not': None,
+                        'exit_status': '0'
                     }
                 }
-            }
+            },
         ],
-        'got_interactive_dialog': [
+        'output_should_contain_text_within': [
             {
-                'value': (
-                    'I got "Password:" for interactive dialog in 1 second'
-                ),
+                'value': 'the output should contain "ready" within 2 seconds',
                 'expected': {
                     'kwargs': {
-                        'dialog_matcher': 'Password:',
-                        'timeout': '1'
+                        'output': 'output',
+                        'text': 'ready',
+                        'timeout': '2'
                     }
                 }
             },
             {
                 'value': (
-                    'I got "Name .*: " for interactive dialog in 0.05 seconds'
+                    'the stderr should contain "GET /" within 0.5 second'
                 ),
                 'expected': {
                     'kwargs': {
-                        'dialog_matcher': 'Name .*: ',
-                        'timeout': '0.05'
+                        'output': 'stderr',
+                        'text': 'GET /',
+                        'timeout': '0.5'
                     }
                 }
             },
+        ],
+        'output_should_contain_texts': [
             {
-                'value': 'I got "Login:" for interactive dialog',
+                'value': 'the output should contain all of',
                 'expected': {
                     'kwargs': {
-                        'dialog_matcher': 'Login:',
-                        'timeout': None
+                        'output': 'output',
+                        'quantifier': 'all'
+                    }
+                }
+            },
+            {
+                'value': 'the stderr should contain none of',
+                'expected': {
+                    'kwargs': {
+                        'output': 'stderr',
+                        'quantifier': 'none'
                     }
                 }
             },
         ],
-        'output_should_contain_text': [
+        'output_should_match': [
             {
-                'value': 'the output should contain',
+                'value': 'the output should match /\\d+ files/',
                 'expected': {
                     'kwargs': {
                         'output': 'output',
                         'should_not': None,
-                        'exactly': None
+                        'pattern': '\\d+ files',
+                        'flags': ''
                     }
                 }
             },
             {
-                'value': 'the stderr should not contain exactly',
+                'value': 'the stderr should not match /a/b/ims',
                 'expected': {
                     'kwargs': {
                         'output': 'stderr',
                         'should_not': 'not',
-                        'exactly': 'exactly'
+                        'pattern': 'a/b',
+                        'flags': 'ims'
+                    }
+                }
+            },
+        ],
+        'every_output_line_should_match': [
+            {
+                'value': 'every line of the stdout should match /\\w+/i',
+                'expected': {
+                    'kwargs': {
+                        'output': 'stdout',
+                        'pattern': '\\w+',
+                        'flags': 'i'
                     }
                 }
             },
@@ -690,6 +1947,248 @@ class TestCommandStepsSentenceRegex(StepsSentenceRegexTestMixin, TestCase):
                 }
             },
         ],
+        'run_commands_concurrently': [
+            {
+                'value': 'I run the following commands concurrently',
+                'expected': {
+                    'kwargs': {
+                        'workers': None
+                    }
+                }
+            },
+            {
+                'value': (
+                    'I run the following commands concurrently with 1 worker'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'workers': '1'
+                    }
+                }
+            },
+        ],
+        'all_commands_should_exit_with': [
+            {
+                'value': 'all commands should exit with 0',
+                'expected': {
+                    'kwargs': {
+                        'exit_status': '0'
+                    }
+                }
+            },
+        ],
+        'command_should_finish_in': [
+            {
+                'value': 'the command should finish in less than 2 seconds',
+                'expected': {
+                    'kwargs': {
+                        'seconds': '2'
+                    }
+                }
+            },
+            {
+                'value': 'the command should finish in less than 0.5 second',
+                'expected': {
+                    'kwargs': {
+                        'seconds': '0.5'
+                    }
+                }
+            },
+        ],
+        'command_should_use_cpu_time': [
+            {
+                'value': (
+                    'the command should use less than 1.5 seconds of CPU time'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'seconds': '1.5'
+                    }
+                }
+            },
+        ],
+        'command_should_use_memory': [
+            {
+                'value': 'the command should use less than 200 MB of memory',
+                'expected': {
+                    'kwargs': {
+                        'size': '200',
+                        'unit': 'MB'
+                    }
+                }
+            },
+            {
+                'value': 'the command should use less than 0.5 GB of memory',
+                'expected': {
+                    'kwargs': {
+                        'size': '0.5',
+                        'unit': 'GB'
+                    }
+                }
+            },
+        ],
+        'command_should_start_responding_in': [
+            {
+                'value': (
+                    'the command should start responding in less than '
+                    '0.5 seconds'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'seconds': '0.5'
+                    }
+                }
+            },
+        ],
+        'command_should_respond_to_input_in': [
+            {
+                'value': (
+                    'the command should respond to the input in less than '
+                    '1 second'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'seconds': '1'
+                    }
+                }
+            },
+        ],
+        'benchmark_command': [
+            {
+                'value': 'I benchmark `mytool` 50 times with 5 warmup runs',
+                'expected': {
+                    'kwargs': {
+                        'command': 'mytool',
+                        'runs': '50',
+                        'warmup_runs': '5'
+                    }
+                }
+            },
+            {
+                'value': 'I benchmark `mytool --help` 1 time',
+                'expected': {
+                    'kwargs': {
+                        'command': 'mytool --help',
+                        'runs': '1',
+                        'warmup_runs': None
+                    }
+                }
+            },
+        ],
+        'run_time_should_be_less_than': [
+            {
+                'value': 'the median run time should be less than 120 ms',
+                'expected': {
+                    'kwargs': {
+                        'statistic': 'median',
+                        'duration': '120',
+                        'unit': 'ms'
+                    }
+                }
+            },
+            {
+                'value': 'the p95 run time should be less than 0.2 seconds',
+                'expected': {
+                    'kwargs': {
+                        'statistic': 'p95',
+                        'duration': '0.2',
+                        'unit': 'seconds'
+                    }
+                }
+            },
+        ],
+        'command_should_not_be_slower_than_baseline': [
+            {
+                'value': (
+                    'the command should not be more than 10% slower than '
+                    'baseline'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'percent': '10'
+                    }
+                }
+            },
+            {
+                'value': (
+                    'the command should not be more than 2.5% slower than '
+                    'the baseline'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'percent': '2.5'
+                    }
+                }
+            },
+        ],
+        'compare_commands': [
+            {
+                'value': (
+                    'I compare `old/tool --fast` against `new/tool --fast` '
+                    'over 30 interleaved runs'
+                ),
+                'expected': {
+                    'kwargs': {
+                        'old_command': 'old/tool --fast',
+                        'new_command': 'new/tool --fast',
+                        'runs': '30'
+                    }
+                }
+            },
+        ],
+        'new_command_should_be_fast': [
+            {
+                'value': 'the new command should be at least as fast',
+                'expected': {
+                    'kwargs': {
+                        'comparison': 'at least as fast'
+                    }
+                }
+            },
+            {
+                'value': 'the new command should be faster',
+                'expected': {
+                    'kwargs': {
+                        'comparison': 'faster'
+                    }
+                }
+            },
+        ],
+        'stream_through_command': [
+            {
+                'value': 'I stream 500 MB through `mytool convert`',
+                'expected': {
+                    'kwargs': {
+                        'size': '500',
+                        'unit': 'MB',
+                        'path': None,
+                        'command': 'mytool convert'
+                    }
+                }
+            },
+            {
+                'value': 'I stream 1.5 GB of "a b.csv" through `mytool`',
+                'expected': {
+                    'kwargs': {
+                        'size': '1.5',
+                        'unit': 'GB',
+                        'path': 'a b.csv',
+                        'command': 'mytool'
+                    }
+                }
+            },
+        ],
+        'throughput_should_be_at_least': [
+            {
+                'value': 'the throughput should be at least 200 MB/s',
+                'expected': {
+                    'kwargs': {
+                        'rate': '200',
+                        'unit': 'MB'
+                    }
+                }
+            },
+        ],
         'exit_status_should_be': [
             {
                 'value': 'the exit status should be 1',
@@ -723,3 +2222,66 @@ class TestCommandLettuceSteps(LettuceStepsTestMixin,
                               CommandStepsMixin,
                               TestCase):
     module = lettuce_command
+
+
+class ShellPoolMixin(object):
+    def setUp(self):
+        super(ShellPoolMixin, self).setUp()
+        settings.SHELL_POOL_SIZE = 2
+
+    def tearDown(self):
+        super(ShellPoolMixin, self).tearDown()
+        settings.SHELL_POOL_SIZE = 0
+        # closes the pool of the test now, not in a spawn of another one
+        get_shell_pool()
+
+
+class TestCommandBehaveStepsWithShellPool(ShellPoolMixin,
+                                          BehaveStepsTestMixin,
+                                          CommandStepsMixin,
+                                          TestCase):
+    module = behave_command
+
+
+class ShellSessionMixin(object):
+    def setUp(self):
+        super(ShellSessionMixin, self).setUp()
+        self.session = ShellSession()
+
+    def tearDown(self):
+        super(ShellSessionMixin, self).tearDown()
+        self.session.close()
+
+    def execute_module_step(self, name, context=None, **kwargs):
+        if context is None:
+            context = Mock(spec=[])
+            context.shell_session = self.session
+        return super(ShellSessionMixin, self).execute_module_step(
+            name,
+            context=context,
+            **kwargs
+        )
+
+
+class TestCommandBehaveStepsWithShellSession(ShellSessionMixin,
+                                             BehaveStepsTestMixin,
+                                             CommandStepsMixin,
+                                             TestCase):
+    module = behave_command
+
+
+class DirectExecMixin(object):
+    def setUp(self):
+        super(DirectExecMixin, self).setUp()
+        settings.DIRECT_EXEC = True
+
+    def tearDown(self):
+        super(DirectExecMixin, self).tearDown()
+        settings.DIRECT_EXEC = False
+
+
+class TestCommandBehaveStepsWithDirectExec(DirectExecMixin,
+                                           BehaveStepsTestMixin,
+                                           CommandStepsMixin,
+                                           TestCase):
+    module = behave_command
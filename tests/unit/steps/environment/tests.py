@@ -1,10 +1,13 @@
 import os
-from copy import deepcopy
 
 from hamcrest import assert_that, equal_to, has_entries
 
 from cli_bdd.behave.steps import environment as behave_environment
-from cli_bdd.core.steps.environment import base_steps
+from cli_bdd.core.steps.environment import (
+    base_steps,
+    get_command_env,
+    get_environment
+)
 from cli_bdd.lettuce.steps import environment as lettuce_environment
 from testutils import (
     BehaveStepsTestMixin,
@@ -17,74 +20,84 @@ from testutils import (
 class EnvironmentStepsMixin(object):
     def setUp(self):
         super(EnvironmentStepsMixin, self).setUp()
-        self.original_environ = deepcopy(os.environ)
+        self.original_environ = os.environ.copy()
 
     def tearDown(self):
         super(EnvironmentStepsMixin, self).tearDown()
-        os.environ = self.original_environ
+        # the steps change the environment of the scenario only
+        assert_that(os.environ.copy(), equal_to(self.original_environ))
 
     def test_set_the_environment_variable(self):
         assert_that('hello' in os.environ, equal_to(False))
-        self.execute_module_step(
+        context = self.execute_module_step(
             'set_the_environment_variable',
             kwargs={
                 'variable': 'hello',
                 'value': 'world'
             }
         )
-        assert_that(os.environ.get('hello'), equal_to('world'))
+        assert_that(get_environment(context).get('hello'), equal_to('world'))
+        assert_that('hello' in os.environ, equal_to(False))
 
     def test_append_to_the_environment_variable(self):
         assert_that('hello' in os.environ, equal_to(False))
 
         # no env variable
-        self.execute_module_step(
+        context = self.execute_module_step(
             'append_to_the_environment_variable',
             kwargs={
                 'variable': 'hello',
                 'value': 'world'
             }
         )
-        assert_that(os.environ.get('hello'), equal_to('world'))
+        assert_that(get_environment(context).get('hello'), equal_to('world'))
 
         # with env variable
         self.execute_module_step(
             'append_to_the_environment_variable',
+            context=context,
             kwargs={
                 'variable': 'hello',
                 'value': 'amigo'
             }
         )
-        assert_that(os.environ.get('hello'), equal_to('worldamigo'))
+        assert_that(
+            get_environment(context).get('hello'),
+            equal_to('worldamigo')
+        )
 
     def test_prepend_to_the_environment_variable(self):
         assert_that('hello' in os.environ, equal_to(False))
 
         # no env variable
-        self.execute_module_step(
+        context = self.execute_module_step(
             'prepend_to_the_environment_variable',
             kwargs={
                 'variable': 'hello',
                 'value': 'world'
             }
         )
-        assert_that(os.environ.get('hello'), equal_to('world'))
+        assert_that(get_environment(context).get('hello'), equal_to('world'))
 
         # with env variable
         self.execute_module_step(
             'prepend_to_the_environment_variable',
+            context=context,
             kwargs={
                 'variable': 'hello',
                 'value': 'amigo'
             }
         )
-        assert_that(os.environ.get('hello'), equal_to('amigoworld'))
+        assert_that(
+            get_environment(context).get('hello'),
+            equal_to('amigoworld')
+        )
 
     def test_set_the_environment_variables(self):
         assert_that('hello_one' in os.environ, equal_to(False))
         assert_that('hello_two' in os.environ, equal_to(False))
 
-        self.execute_module_step(
+        context = self.execute_module_step(
             'set_the_environment_variables',
             table=[
                 {
@@ -98,7 +111,7 @@ class EnvironmentStepsMixin(object):
             ]
         )
         assert_that(
-            os.environ,
+            get_command_env(context),
             has_entries({
                 'hello_one': 'world_one',
                 'hello_two': 'world_two',
@@ -110,7 +123,7 @@ class EnvironmentStepsMixin(object):
         assert_that('hello_two' in os.environ, equal_to(False))
 
         # no env variables
-        self.execute_module_step(
+        context = self.execute_module_step(
             'append_the_values_to_the_environment_variables',
             table=[
                 {
@@ -124,7 +137,7 @@ class EnvironmentStepsMixin(object):
             ]
         )
         assert_that(
-            os.environ,
+            get_command_env(context),
             has_entries({
                 'hello_one': 'world_one',
                 'hello_two': 'world_two',
@@ -134,6 +147,7 @@ class EnvironmentStepsMixin(object):
         # with env variables
         self.execute_module_step(
             'append_the_values_to_the_environment_variables',
+            context=context,
             table=[
                 {
                     'variable': 'hello_one',
@@ -146,7 +160,7 @@ class EnvironmentStepsMixin(object):
             ]
         )
         assert_that(
-            os.environ,
+            get_command_env(context),
             has_entries({
                 'hello_one': 'world_oneplus_one',
                 'hello_two': 'world_twoplus_two',
@@ -158,7 +172,7 @@ class EnvironmentStepsMixin(object):
         assert_that('hello_two' in os.environ, equal_to(False))
 
         # no env variables
-        self.execute_module_step(
+        context = self.execute_module_step(
             'prepend_the_values_to_the_environment_variables',
             table=[
                 {
@@ -172,7 +186,7 @@ class EnvironmentStepsMixin(object):
             ]
         )
         assert_that(
-            os.environ,
+            get_command_env(context),
             has_entries({
                 'hello_one': 'world_one',
                 'hello_two': 'world_two',
@@ -182,6 +196,7 @@ class EnvironmentStepsMixin(object):
         # with env variables
         self.execute_module_step(
             'prepend_the_values_to_the_environment_variables',
+            context=context,
             table=[
                 {
                     'variable': 'hello_one',
@@ -194,13 +209,58 @@ class EnvironmentStepsMixin(object):
             ]
         )
         assert_that(
-            os.environ,
+            get_command_env(context),
             has_entries({
                 'hello_one': 'plus_oneworld_one',
                 'hello_two': 'plus_twoworld_two',
             })
         )
 
+    def test_scenarios_have_own_environments(self):
+        first = self.execute_module_step(
+            'set_the_environment_variable',
+            kwargs={
+                'variable': 'hello',
+                'value': 'first'
+            }
+        )
+        second = self.execute_module_step(
+            'set_the_environment_variable',
+            kwargs={
+                'variable': 'hello',
+                'value': 'second'
+            }
+        )
+        assert_that(get_command_env(first)['hello'], equal_to('first'))
+        assert_that(get_command_env(second)['hello'], equal_to('second'))
+
+    def test_next_scenario(self):
+        # the scenarios share the context, like `world` of lettuce
+        context = self.execute_module_step(
+            'set_the_environment_variable',
+            kwargs={
+                'variable': 'hello',
+                'value': 'world'
+            }
+        )
+        environment = get_environment(context)
+        self.finish_scenario(context)
+        assert_that(environment.changed, equal_to(False))
+        assert_that(get_command_env(context), equal_to(None))
+
+        self.execute_module_step(
+            'set_the_environment_variable',
+            context=context,
+            kwargs={
+                'variable': 'name',
+                'value': 'gena'
+            }
+        )
+        assert_that('hello' in get_command_env(context), equal_to(False))
+        assert_that(get_command_env(context)['name'], equal_to('gena'))
+        self.finish_scenario(context)
+        assert_that(get_command_env(context), equal_to(None))
+
 
 class TestEnvironmentStepsSentenceRegex(StepsSentenceRegexTestMixin, TestCase):
     steps = base_steps
@@ -5,7 +5,11 @@ import tempfile
 from hamcrest import assert_that, calling, equal_to, is_not, raises
 
 from cli_bdd.behave.steps import file as behave_file
-from cli_bdd.core.steps.file import base_steps
+from cli_bdd.core.steps.file import (
+    base_steps,
+    get_command_cwd,
+    get_working_directory
+)
 from cli_bdd.lettuce.steps import file as lettuce_file
 from testutils import (
     BehaveStepsTestMixin,
@@ -194,18 +198,98 @@ class FileStepsMixin(object):
 
     def test_change_directory(self):
         old_path = os.getcwd()
-        try:
-            dir_path = os.path.realpath('/tmp/')
-            self.execute_module_step(
+        dir_path = os.path.realpath('/tmp/')
+        context = self.execute_module_step(
+            'change_directory',
+            kwargs={
+                'dir_path': dir_path
+            }
+        )
+        assert_that(context.working_directory, equal_to(dir_path))
+        assert_that(os.getcwd(), equal_to(old_path))
+
+        # relative to the working directory of the scenario
+        sub_path = tempfile.mkdtemp(dir=dir_path)
+        self.addCleanup(shutil.rmtree, sub_path)
+        self.execute_module_step(
+            'change_directory',
+            context=context,
+            kwargs={
+                'dir_path': os.path.basename(sub_path)
+            }
+        )
+        assert_that(context.working_directory, equal_to(sub_path))
+
+        assert_that(
+            calling(self.execute_module_step).with_args(
                 'change_directory',
+                context=context,
                 kwargs={
-                    'dir_path': dir_path
+                    'dir_path': 'missing'
                 }
-            )
+            ),
+            raises(OSError)
+        )
+        assert_that(context.working_directory, equal_to(sub_path))
 
-            assert_that(os.getcwd(), equal_to(dir_path))
-        finally:
-            os.chdir(old_path)
+    def test_change_directory__next_scenario(self):
+        # the scenarios share the context, like `world` of lettuce
+        context = self.execute_module_step(
+            'change_directory',
+            kwargs={
+                'dir_path': '/tmp/'
+            }
+        )
+        self.finish_scenario(context)
+        assert_that(get_command_cwd(context), equal_to(None))
+        assert_that(get_working_directory(context), equal_to(os.getcwd()))
+
+    def test_relative_paths(self):
+        dir_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dir_path)
+        context = self.execute_module_step(
+            'change_directory',
+            kwargs={
+                'dir_path': dir_path
+            }
+        )
+        self.execute_module_step(
+            'create_directory',
+            context=context,
+            kwargs={
+                'dir_path': 'sub'
+            }
+        )
+        self.execute_module_step(
+            'create_file_with_content',
+            context=context,
+            kwargs={
+                'file_path': 'sub/file.txt',
+                'file_content': 'hello'
+            }
+        )
+        self.execute_module_step(
+            'copy_file_or_directory',
+            context=context,
+            kwargs={
+                'file_or_directory': 'file',
+                'source': 'sub/file.txt',
+                'destination': 'copy.txt'
+            }
+        )
+        self.execute_module_step(
+            'check_file_or_directory_exist',
+            context=context,
+            kwargs={
+                'file_or_directory': 'file',
+                'path': 'copy.txt'
+            }
+        )
+        assert_that(
+            open(os.path.join(dir_path, 'copy.txt')).read(),
+            equal_to('hello')
+        )
+        assert_that(os.path.exists('copy.txt'), equal_to(False))
 
     def test_create_file_with_content(self):
         file_path = os.path.join(tempfile.gettempdir(), 'file.txt')
@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+import pexpect
+from hamcrest import assert_that, equal_to, greater_than
+
+from cli_bdd.core.throughput import (
+    SYNTHETIC_LINE,
+    StreamedCommand,
+    generate_input
+)
+from testutils import TestCase
+
+
+class TestGenerateInput(TestCase):
+    def test_synthetic(self):
+        chunks = list(generate_input(1000, chunk_size=300))
+        assert_that(
+            [len(chunk) for chunk in chunks],
+            equal_to([248] * 4 + [8])
+        )
+        assert_that(
+            ''.join(chunks),
+            equal_to((SYNTHETIC_LINE * 20)[:1000])
+        )
+
+    def test_file(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            input_file.write('abcde')
+            input_file.flush()
+            assert_that(
+                list(generate_input(12, input_file.name, chunk_size=3)),
+                equal_to(['abc', 'de', 'abc', 'de', 'ab'])
+            )
+
+    def test_empty_file(self):
+        with tempfile.NamedTemporaryFile() as input_file:
+            try:
+                list(generate_input(12, input_file.name))
+            except ValueError as e:
+                assert_that(
+                    str(e),
+                    equal_to('Input file "%s" is empty' % input_file.name)
+                )
+            else:
+                raise AssertionError("Should fail")
+
+
+class TestStreamedCommand(TestCase):
+    def test_stream(self):
+        size = 10 * 1024 * 1024
+        command = StreamedCommand('cat; echo done >&2').stream(
+            generate_input(size)
+        )
+        assert_that(command.exitstatus, equal_to(0))
+        assert_that(command.input_size, equal_to(size))
+        assert_that(command.output_size, equal_to(size))
+        assert_that(command.logfile_read.getvalue(), equal_to(''))
+        assert_that(command.logfile_stderr.getvalue(), equal_to('done\n'))
+        assert_that(command.throughput, greater_than(0))
+
+    def test_stream__input_closed(self):
+        command = StreamedCommand('head -c 10; exit 3').stream(
+            generate_input(50 * 1024 * 1024)
+        )
+        assert_that(command.exitstatus, equal_to(3))
+        assert_that(command.output_size, equal_to(10))
+
+    def test_stream__timeout(self):
+        command = StreamedCommand('sleep 5')
+        try:
+            command.stream(generate_input(10), timeout=0.2)
+        except pexpect.TIMEOUT:
+            pass
+        else:
+            raise AssertionError("Should fail")
+        assert_that(command.signalstatus, equal_to(9))
+        assert_that(os.path.exists('/proc/%s' % command.pid), equal_to(False))
@@ -0,0 +1,37 @@
+from hamcrest import assert_that, equal_to
+
+from cli_bdd.core.timeline import TimedOutputBuffer, Timeline
+from testutils import TestCase
+
+
+class TestTimeline(TestCase):
+    def test_get_latency(self):
+        timeline = Timeline(spawn_time=10)
+        assert_that(timeline.awaiting_output, equal_to(True))
+        assert_that(timeline.get_latency('spawn'), equal_to(None))
+
+        timeline.record('output', timestamp=10.5)
+        timeline.record('dialog', 'Name:', timestamp=10.6)
+        timeline.record('input', 'Bob', timestamp=11)
+        assert_that(timeline.get_latency('spawn'), equal_to(0.5))
+        assert_that(timeline.get_latency('input'), equal_to(None))
+
+        timeline.record('output', timestamp=11.25)
+        assert_that(timeline.get_latency('input'), equal_to(0.25))
+        assert_that(timeline.get_latency('dialog'), equal_to(11.25 - 10.6))
+        assert_that(timeline.awaiting_output, equal_to(False))
+
+    def test_timed_output_buffer(self):
+        timeline = Timeline()
+        buffer_ = TimedOutputBuffer(timeline)
+        buffer_.write('')
+        assert_that(timeline.awaiting_output, equal_to(True))
+        buffer_.write('Name: ')
+        buffer_.write('> ')
+        timeline.record('input', 'Bob')
+        buffer_.write('Hello, Bob')
+        assert_that(
+            [name for name, _, _ in timeline.events],
+            equal_to(['spawn', 'output', 'input', 'output'])
+        )
+        assert_that(buffer_.getvalue(), equal_to('Name: > Hello, Bob'))
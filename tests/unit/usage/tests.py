@@ -0,0 +1,80 @@
+import sys
+
+from hamcrest import assert_that, equal_to, greater_than, less_than
+
+from cli_bdd.core.process import PipeProcess
+from cli_bdd.core.usage import (
+    MAX_RSS_UNIT,
+    AccountedSpawn,
+    get_resource_usage,
+    make_rusage
+)
+from testutils import TestCase
+
+# burns CPU in a descendant of the shell, which waits for it
+BURN_CPU_COMMAND = (
+    '%s -c "import time\n'
+    'while time.clock() < 0.3: pass"; exit 3'
+) % sys.executable
+ALLOCATE_COMMAND = '%s -c "s = \'x\' * (64 * 1024 * 1024)"' % (
+    sys.executable
+)
+
+
+class TestAccountedSpawn(TestCase):
+    def test_rusage(self):
+        child = AccountedSpawn('/bin/sh', ['-c', BURN_CPU_COMMAND])
+        assert_that(child.rusage, equal_to(None))
+        child.expect_exact(child.delimiter)
+        child.wait()
+        assert_that(child.exitstatus, equal_to(3))
+        assert_that(
+            child.rusage.ru_utime + child.rusage.ru_stime,
+            greater_than(0.2)
+        )
+
+    def test_rusage__isalive(self):
+        child = AccountedSpawn('/bin/sh', ['-c', ALLOCATE_COMMAND])
+        child.expect_exact(child.delimiter)
+        assert_that(child.isalive(), equal_to(False))
+        assert_that(
+            child.rusage.ru_maxrss * MAX_RSS_UNIT,
+            greater_than(64 * 1024 * 1024)
+        )
+        assert_that(child.wait(), equal_to(0))
+
+
+class TestPipeProcessUsage(TestCase):
+    def test_rusage(self):
+        process = PipeProcess(BURN_CPU_COMMAND)
+        assert_that(process.wait(), equal_to(3))
+        assert_that(
+            process.rusage.ru_utime + process.rusage.ru_stime,
+            greater_than(0.2)
+        )
+
+
+class TestGetResourceUsage(TestCase):
+    def test_get_resource_usage(self):
+        assert_that(
+            get_resource_usage(1.5, make_rusage(0.25, 0.5, 100)),
+            equal_to({
+                'wall_time': 1.5,
+                'user_time': 0.25,
+                'system_time': 0.5,
+                'max_rss': 100 * MAX_RSS_UNIT,
+            })
+        )
+        assert_that(
+            get_resource_usage(1.5),
+            equal_to({
+                'wall_time': 1.5,
+                'user_time': None,
+                'system_time': None,
+                'max_rss': None,
+            })
+        )
+        assert_that(
+            get_resource_usage(0, make_rusage(0, 0, 1))['max_rss'],
+            less_than(4096)
+        )